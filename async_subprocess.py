@@ -0,0 +1,85 @@
+"""Asyncio subprocess helpers shared by the radio managers."""
+import asyncio
+import os
+import subprocess
+import time
+from metrics import metrics
+
+DEFAULT_TIMEOUT = 10  # Seconds before a helper command is killed
+CANCEL_POLL_INTERVAL = 0.1  # How often run_sync checks its cancel event
+
+
+async def kill_process(proc):
+    """Kill a child process and reap it."""
+    if proc.returncode is None:
+        try:
+            proc.kill()
+        except ProcessLookupError:
+            pass
+    await proc.wait()
+
+
+async def run_command(argv, timeout=DEFAULT_TIMEOUT):
+    """
+    Run a command on the event loop.
+
+    Behaves like subprocess.run(argv, capture_output=True, text=True,
+    check=True, timeout=timeout): returns a CompletedProcess and raises
+    CalledProcessError, TimeoutExpired or FileNotFoundError. The child is
+    killed if the timeout passes or the calling task is cancelled.
+
+    Each run is timed as `cmd.<tool>`, with `.timeouts` and `.failures` counters.
+    """
+    name = f'cmd.{os.path.basename(argv[0])}'
+    start = time.monotonic()
+    try:
+        proc = await asyncio.create_subprocess_exec(
+            *argv,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+    except FileNotFoundError:
+        metrics.increment(f'{name}.failures')
+        raise
+    try:
+        stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout)
+    except asyncio.TimeoutError:
+        await kill_process(proc)
+        metrics.increment(f'{name}.timeouts')
+        raise subprocess.TimeoutExpired(argv, timeout)
+    except asyncio.CancelledError:
+        await kill_process(proc)
+        raise
+    finally:
+        metrics.observe(name, time.monotonic() - start)
+
+    stdout = stdout.decode('utf-8', 'replace')
+    stderr = stderr.decode('utf-8', 'replace')
+    if proc.returncode:
+        metrics.increment(f'{name}.failures')
+        raise subprocess.CalledProcessError(proc.returncode, argv, stdout, stderr)
+    return subprocess.CompletedProcess(argv, proc.returncode, stdout, stderr)
+
+
+def run_sync(coro, cancel=None):
+    """
+    Run a coroutine to completion from synchronous code on a private event loop.
+
+    Args:
+        coro: Coroutine to run
+        cancel: Optional threading.Event; once set the coroutine is cancelled
+            and asyncio.CancelledError is raised
+    """
+    if cancel is None:
+        return asyncio.run(coro)
+
+    async def watched():
+        task = asyncio.ensure_future(coro)
+        while not task.done():
+            if cancel.is_set():
+                task.cancel()
+                break
+            await asyncio.wait({task}, timeout=CANCEL_POLL_INTERVAL)
+        return await task
+
+    return asyncio.run(watched())
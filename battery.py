@@ -0,0 +1,249 @@
+"""
+Battery drain accounting across sleep sessions.
+
+The battery level and power source are sampled when the system goes to
+sleep and again when it wakes. Each sleep session becomes one fixed-size
+binary record appended to ~/.sleepwatch_battery.bin, tagged with the
+radios SleepWatch turned off, so drain per hour can be compared between
+settings. The file never grows past MAX_RECORDS: when it does, the oldest
+half is dropped in one atomic rewrite.
+"""
+import logging
+import re
+import statistics
+import struct
+import subprocess
+import threading
+import time
+from collections import namedtuple
+from pathlib import Path
+from async_subprocess import run_command, run_sync
+from metrics import metrics
+from write_behind import atomic_write_bytes
+
+logger = logging.getLogger(__name__)
+
+BATTERY_FILE = Path.home() / '.sleepwatch_battery.bin'
+MAGIC = b'SWB1'
+# Sleep and wake time (epoch seconds), battery % at each, flags
+RECORD = struct.Struct('<IIBBB')
+MAX_RECORDS = 4096  # About 45 KB, years of nightly sessions
+ROLLING_WINDOW = 30 * 24 * 60 * 60  # Seconds of history the stats cover
+MIN_SESSION = 30 * 60  # Shorter sessions are too coarse for 1% battery steps
+OVERNIGHT_HOURS = 8
+
+# Record flags
+WIFI_OFF = 1
+BLUETOOTH_OFF = 2
+AC_AT_SLEEP = 4
+AC_AT_WAKE = 8
+
+MODES = {
+    WIFI_OFF | BLUETOOTH_OFF: 'wifi+bluetooth off',
+    WIFI_OFF: 'wifi off',
+    BLUETOOTH_OFF: 'bluetooth off',
+    0: 'radios on',
+}
+
+BatterySample = namedtuple('BatterySample', ['time', 'percent', 'on_ac'])
+Session = namedtuple('Session', ['sleep_at', 'wake_at', 'start_percent', 'end_percent', 'flags'])
+
+
+def parse_pmset(output):
+    """
+    Parse `pmset -g batt` output into (percent, on_ac).
+
+    Returns None on machines without a battery.
+    """
+    percent = re.search(r'(\d+)%', output)
+    if not percent:
+        return None
+    return int(percent.group(1)), "'AC Power'" in output
+
+
+def sample_battery():
+    """Read the battery with pmset. Returns a BatterySample or None."""
+    try:
+        result = run_sync(run_command(['pmset', '-g', 'batt'], timeout=5))
+    except (subprocess.CalledProcessError, subprocess.TimeoutExpired, FileNotFoundError) as e:
+        logger.warning("Battery sample failed: %s", e)
+        return None
+    parsed = parse_pmset(result.stdout)
+    if parsed is None:
+        return None
+    return BatterySample(time.time(), *parsed)
+
+
+class BatteryLog:
+    """Append-only, size-bounded file of Session records."""
+
+    def __init__(self, path=BATTERY_FILE, max_records=MAX_RECORDS):
+        self.path = Path(path)
+        self.max_records = max_records
+        self._lock = threading.Lock()
+
+    def _read(self):
+        """Raw record bytes, ignoring a torn final record."""
+        try:
+            data = self.path.read_bytes()
+        except FileNotFoundError:
+            return b''
+        if not data.startswith(MAGIC):
+            logger.warning("Ignoring unrecognized battery log %s", self.path)
+            return b''
+        body = memoryview(data)[len(MAGIC):]
+        return body[:len(body) - len(body) % RECORD.size]
+
+    def sessions(self):
+        """All stored sessions, oldest first."""
+        with self._lock:
+            body = self._read()
+        return [Session(*fields) for fields in RECORD.iter_unpack(body)]
+
+    def append(self, session):
+        """Append one session, dropping the oldest half when the file is full."""
+        record = RECORD.pack(
+            int(session.sleep_at), int(session.wake_at),
+            session.start_percent, session.end_percent, session.flags
+        )
+        with self._lock:
+            try:
+                with open(self.path, 'rb') as f:
+                    valid = f.read(len(MAGIC)) == MAGIC
+                size = self.path.stat().st_size
+            except FileNotFoundError:
+                valid, size = False, 0
+            count, torn = divmod(size - len(MAGIC), RECORD.size) if valid else (0, 0)
+
+            if not valid or count >= self.max_records:
+                # New (or unreadable) file, or full: rewrite keeping the newest records
+                body = self._read()
+                keep = min(len(body) // RECORD.size, self.max_records // 2)
+                atomic_write_bytes(self.path, MAGIC + bytes(body[len(body) - keep * RECORD.size:]) + record)
+                return
+            with open(self.path, 'r+b') as f:
+                # Overwrite a torn record left by a crash, if any
+                f.seek(size - torn)
+                f.write(record)
+                f.truncate()
+
+
+class BatteryMonitor:
+    """
+    Pairs sleep and wake battery samples into stored sessions.
+
+    Args:
+        sampler: Callable returning a BatterySample or None (defaults to
+            pmset; replace it to test or simulate)
+        log: BatteryLog to store sessions in
+    """
+
+    def __init__(self, sampler=sample_battery, log=None):
+        self.sampler = sampler
+        self.log = log or BatteryLog()
+        self._lock = threading.Lock()
+        self._wakes = 0  # Wakes seen, to tell which sleep a sample belongs to
+        self._pending = None  # (sample, flags) taken at sleep
+
+    def sample_at_sleep(self):
+        """
+        Sample for a sleep session (run before the radios go off, e.g. as a
+        sleep pipeline capture). Returns a value for on_sleep().
+        """
+        with self._lock:
+            wakes = self._wakes
+        return wakes, self.sampler()
+
+    def on_sleep(self, captured, wifi_off, bluetooth_off):
+        """Start a session from sample_at_sleep()'s result (None if it missed the deadline)."""
+        with self._lock:
+            self._pending = None
+            if captured is None:
+                return
+            wakes, sample = captured
+            if sample is None or wakes != self._wakes:
+                # Taken before a wake that came after it: not this sleep's sample
+                return
+            flags = (WIFI_OFF if wifi_off else 0) | (BLUETOOTH_OFF if bluetooth_off else 0)
+            if sample.on_ac:
+                flags |= AC_AT_SLEEP
+            self._pending = (sample, flags)
+
+    def on_wake(self):
+        """
+        End the current session (call on the wake path; doesn't block).
+        Returns a value for finish_session().
+        """
+        with self._lock:
+            self._wakes += 1
+            pending, self._pending = self._pending, None
+        return pending
+
+    def finish_session(self, pending):
+        """Sample at wake and store the session. Returns the Session or None."""
+        if pending is None:
+            return None
+        sample = self.sampler()
+        if sample is None:
+            return None
+        start, flags = pending
+        if sample.on_ac:
+            flags |= AC_AT_WAKE
+        session = Session(start.time, sample.time, start.percent, sample.percent, flags)
+        try:
+            self.log.append(session)
+        except OSError as e:
+            logger.warning("Failed to store battery session: %s", e)
+        rate = drain_per_hour(session)
+        if rate is not None:
+            mode = MODES[flags & 3]
+            logger.info("Battery drain while asleep: %.2f%%/h over %.1fh (%s)",
+                        rate, (session.wake_at - session.sleep_at) / 3600, mode)
+            # Exported with the other metrics, for collecting across machines
+            metrics.observe(f"battery.drain_per_hour.{mode.replace('+', '_').replace(' ', '_')}", rate)
+        return session
+
+    def stats(self, window=ROLLING_WINDOW, now=None):
+        """Drain stats for the recent sessions (see drain_stats)."""
+        return drain_stats(self.log.sessions(), window=window, now=now)
+
+
+def drain_per_hour(session):
+    """Percent per hour lost during a session, or None if it isn't comparable."""
+    duration = session.wake_at - session.sleep_at
+    if session.flags & (AC_AT_SLEEP | AC_AT_WAKE) or duration < MIN_SESSION:
+        return None
+    return max(0, session.start_percent - session.end_percent) / (duration / 3600)
+
+
+def drain_stats(sessions, window=ROLLING_WINDOW, now=None):
+    """
+    Rolling drain per hour, split by which radios were turned off.
+
+    Only sessions on battery the whole time and at least MIN_SESSION long
+    count. Returns {mode: {'sessions', 'hours', 'mean', 'median',
+    'overnight'}} where rates are % per hour, 'mean' is weighted by
+    duration and 'overnight' is the median over OVERNIGHT_HOURS.
+    """
+    since = (now or time.time()) - window
+    rates = {}
+    for session in sessions:
+        if session.wake_at < since:
+            continue
+        rate = drain_per_hour(session)
+        if rate is not None:
+            hours = (session.wake_at - session.sleep_at) / 3600
+            rates.setdefault(MODES[session.flags & 3], []).append((rate, hours))
+
+    stats = {}
+    for mode, samples in rates.items():
+        hours = sum(h for _, h in samples)
+        median = statistics.median(rate for rate, _ in samples)
+        stats[mode] = {
+            'sessions': len(samples),
+            'hours': round(hours, 1),
+            'mean': round(sum(rate * h for rate, h in samples) / hours, 2),
+            'median': round(median, 2),
+            'overnight': round(median * OVERNIGHT_HOURS, 1),
+        }
+    return stats
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for the WiFi/Bluetooth managers and full sleep/wake cycles.
+
+The cycles run the app's own transitions (transitions.Transitions) on
+MacRadioBackend, the same path SleepWatchApp takes.
+
+Fake networksetup, blueutil and ifconfig executables (see shim.py) are put
+first on PATH, so this runs on plain Linux without any radios. Each
+scenario configures the fakes' latency, output size and failure rate,
+then every operation is run --iterations times.
+
+Results are compared with baselines.json: an operation fails when its p50
+is more than --tolerance slower than the stored p50 (and by at least
+MIN_REGRESSION seconds, to ignore noise on very fast operations).
+
+    python benchmarks/bench.py                     # run and check
+    python benchmarks/bench.py --update-baselines  # store new baselines
+"""
+import argparse
+import atexit
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+REPO_DIR = BENCH_DIR.parent
+BASELINES_FILE = BENCH_DIR / 'baselines.json'
+DEFAULT_ITERATIONS = 10
+DEFAULT_TOLERANCE = 0.5  # Allowed p50 slowdown as a fraction of the baseline
+MIN_REGRESSION = 0.005  # Seconds; smaller slowdowns are never reported
+
+# Shim settings per scenario (see shim.DEFAULTS)
+SCENARIOS = {
+    'fast': {'paired_devices': 10},
+    'large': {'paired_devices': 500, 'connected_devices': 20, 'preferred_networks': 50},
+    'slow': {'latency': 0.05, 'jitter': 0.01, 'connect_latency': 0.1},
+    'flaky': {'failure_rate': 0.2},
+}
+
+FAVORITES = 3  # Devices reconnected on each wake
+
+# The app writes state under $HOME; keep the benchmark's state out of the user's home
+_workdir = Path(tempfile.mkdtemp(prefix='sleepwatch-bench-'))
+atexit.register(shutil.rmtree, _workdir, ignore_errors=True)
+os.environ['HOME'] = str(_workdir)
+os.environ['SLEEPWATCH_SHIM_CONFIG'] = str(_workdir / 'shim.json')
+sys.path.insert(0, str(REPO_DIR))
+
+from async_subprocess import run_sync  # noqa: E402
+from bluetooth_manager import BluetoothManager  # noqa: E402
+from config import DEFAULT_CONFIG  # noqa: E402
+from device_stats import DeviceStats  # noqa: E402
+from metrics import Metrics  # noqa: E402
+from radio_backend import MacRadioBackend  # noqa: E402
+from state import StateStore  # noqa: E402
+from transitions import Transitions  # noqa: E402
+from wifi_manager import WiFiManager  # noqa: E402
+from wifi_rejoin import WiFiRejoiner  # noqa: E402
+
+
+def install_shims():
+    """Put wrapper executables for the fake tools first on PATH."""
+    bin_dir = _workdir / 'bin'
+    bin_dir.mkdir()
+    for tool in ('networksetup', 'blueutil', 'ifconfig'):
+        wrapper = bin_dir / tool
+        wrapper.write_text(f'#!/bin/sh\nexec "{sys.executable}" "{BENCH_DIR / "shim.py"}" {tool} "$@"\n')
+        wrapper.chmod(0o755)
+    os.environ['PATH'] = f"{bin_dir}{os.pathsep}{os.environ.get('PATH', '')}"
+
+
+def configure(settings):
+    """Apply a scenario's shim settings and reset the fake radios."""
+    with open(os.environ['SLEEPWATCH_SHIM_CONFIG'], 'w') as f:
+        json.dump(settings, f)
+    state_file = _workdir / 'shim_state.json'
+    if state_file.exists():
+        state_file.unlink()
+
+
+def favorite_addresses():
+    """Addresses the shim gives its first paired devices."""
+    return [f'00:11:22:33:{i // 256:02x}:{i % 256:02x}' for i in range(FAVORITES)]
+
+
+def new_transitions():
+    """Transitions on the (fake) real radios, as SleepWatchApp sets them up, with fresh learned state."""
+    radios = MacRadioBackend()
+    store = StateStore(path=None)
+    config = {**DEFAULT_CONFIG, 'favorite_devices': favorite_addresses(), 'reconnect_deadline': 10,
+              'wifi_rejoin_budget': 10}
+    return Transitions(radios, config, WiFiRejoiner(radios, store=store), DeviceStats(store=store),
+                       store=store, registry=Metrics())
+
+
+def sleep_cycle(transitions):
+    """What SleepWatchApp.on_system_sleep does to the radios."""
+    run_sync(transitions.sleep())
+
+
+def wake_cycle(transitions):
+    """What SleepWatchApp.on_system_wake does: power on, then run each reconnect on its own thread."""
+    run_sync(transitions.power_on())
+    reconnects = transitions.reconnects()
+    with ThreadPoolExecutor(max_workers=max(1, len(reconnects))) as pool:
+        for future in [pool.submit(run_sync, reconnect()) for _, reconnect in reconnects]:
+            future.result()
+
+
+def operations(transitions):
+    """(name, callable) for every benchmarked operation."""
+    return [
+        ('wifi.get_power_state', WiFiManager.get_power_state),
+        ('wifi.get_current_network', WiFiManager.get_current_network),
+        ('wifi.set_power', lambda: WiFiManager.set_power(True)),
+        ('wifi.get_preferred_networks', WiFiManager.get_preferred_networks),
+        ('bluetooth.get_power_state', BluetoothManager.get_power_state),
+        ('bluetooth.set_power', lambda: BluetoothManager.set_power(True)),
+        ('bluetooth.get_paired_devices', BluetoothManager.get_paired_devices),
+        ('bluetooth.get_connected_devices', BluetoothManager.get_connected_devices),
+        ('bluetooth.reconnect', lambda: run_sync(transitions.reconnect_bluetooth())),
+        ('cycle.sleep', lambda: sleep_cycle(transitions)),
+        ('cycle.wake', lambda: wake_cycle(transitions)),
+    ]
+
+
+def run_scenario(name, settings, iterations):
+    """Run every operation; returns {operation: summary}."""
+    configure(settings)
+    timings = Metrics()
+    results = {}
+    for op_name, op in operations(new_transitions()):
+        started = time.monotonic()
+        for _ in range(iterations):
+            try:
+                with timings.timer(op_name):
+                    op()
+            except Exception:
+                pass  # Counted as <op>.errors
+        total = time.monotonic() - started
+        summary = timings.snapshot()['histograms'][op_name]
+        summary['ops_per_second'] = round(iterations / total, 2) if total else None
+        summary['errors'] = timings.snapshot()['counters'].get(f'{op_name}.errors', 0)
+        results[op_name] = summary
+        print(f"  {name:<6} {op_name:<32} p50 {summary['p50'] * 1000:8.1f} ms  "
+              f"p95 {summary['p95'] * 1000:8.1f} ms  {summary['ops_per_second']:8.2f} ops/s"
+              + (f"  errors {summary['errors']}" if summary['errors'] else ""))
+    return results
+
+
+def check(results, baselines, tolerance):
+    """List of regression messages."""
+    regressions = []
+    for scenario, operations_ in results.items():
+        for op_name, summary in operations_.items():
+            baseline = baselines.get(scenario, {}).get(op_name)
+            if baseline is None:
+                continue
+            slowdown = summary['p50'] - baseline['p50']
+            if summary['p50'] > baseline['p50'] * (1 + tolerance) and slowdown > MIN_REGRESSION:
+                regressions.append(
+                    f"{scenario} {op_name}: p50 {summary['p50'] * 1000:.1f} ms "
+                    f"vs baseline {baseline['p50'] * 1000:.1f} ms"
+                )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=DEFAULT_ITERATIONS)
+    parser.add_argument('--scenario', action='append', choices=sorted(SCENARIOS),
+                        help='Scenario to run (repeatable; default all)')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument('--baselines', type=Path, default=BASELINES_FILE)
+    parser.add_argument('--update-baselines', action='store_true',
+                        help='Store these results as the new baselines instead of checking')
+    parser.add_argument('--output', type=Path, help='Also write the full results as JSON')
+    args = parser.parse_args()
+    # The flaky scenario makes the app log failed power-ons and reconnects
+    logging.basicConfig(level=logging.ERROR)
+
+    install_shims()
+    results = {}
+    for name in args.scenario or SCENARIOS:
+        results[name] = run_scenario(name, SCENARIOS[name], args.iterations)
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+
+    if args.update_baselines:
+        baselines = json.loads(args.baselines.read_text()) if args.baselines.exists() else {}
+        for scenario, operations_ in results.items():
+            baselines[scenario] = {op: {'p50': s['p50'], 'p95': s['p95']} for op, s in operations_.items()}
+        args.baselines.write_text(json.dumps(baselines, indent=2, sort_keys=True) + '\n')
+        print(f"Baselines written to {args.baselines}")
+        return 0
+
+    if not args.baselines.exists():
+        print(f"No baselines at {args.baselines}; run with --update-baselines first")
+        return 0
+    regressions = check(results, json.loads(args.baselines.read_text()), args.tolerance)
+    for message in regressions:
+        print(f"REGRESSION {message}")
+    print("OK" if not regressions else f"{len(regressions)} regression(s)")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
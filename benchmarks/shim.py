@@ -0,0 +1,175 @@
+"""
+Fake networksetup, blueutil and ifconfig for the benchmarks.
+
+Invoked as `shim.py <tool> <args...>` by the wrappers bench.py puts on
+PATH. Behaviour comes from the JSON file named by $SLEEPWATCH_SHIM_CONFIG
+(see DEFAULTS); radio power and the current network are kept in a state
+file next to it so that sleep/wake cycles behave like the real tools.
+"""
+import fcntl
+import json
+import os
+import random
+import sys
+import time
+
+DEFAULTS = {
+    'latency': 0.0,  # Seconds added to every invocation
+    'jitter': 0.0,  # Extra random latency, up to this many seconds
+    'failure_rate': 0.0,  # Chance that an invocation exits with an error
+    'connect_latency': 0.0,  # Seconds per blueutil --connect
+    'paired_devices': 10,  # Size of the blueutil --paired list
+    'connected_devices': 2,  # How many of the paired devices are connected
+    'preferred_networks': 5,  # Size of the preferred network list
+    'autojoin': True,  # Rejoin the last network as soon as WiFi is powered on
+}
+
+DEVICE_NAMES = ['Magic Keyboard', 'Magic Mouse', 'AirPods Pro', 'Headphones', 'Speaker', 'Sensor']
+
+
+def load_config():
+    """Shim settings merged over the defaults."""
+    config = dict(DEFAULTS)
+    path = os.environ.get('SLEEPWATCH_SHIM_CONFIG')
+    if path:
+        with open(path) as f:
+            config.update(json.load(f))
+    return config
+
+
+def state_path():
+    """File holding radio power and the current network between invocations."""
+    return os.path.join(os.path.dirname(os.environ.get('SLEEPWATCH_SHIM_CONFIG', '.')), 'shim_state.json')
+
+
+def load_state():
+    try:
+        with open(state_path()) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {'wifi': True, 'bluetooth': True, 'ssid': 'Network 0', 'last_ssid': 'Network 0'}
+
+
+def update_state(state, **changes):
+    """
+    Apply changes to the state file. Invocations run concurrently (both
+    radios power on at once on wake), so the file is re-read under a lock
+    and replaced atomically rather than overwritten with a stale copy.
+    """
+    state.update(changes)
+    path = state_path()
+    with open(path + '.lock', 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        current = load_state()
+        current.update(changes)
+        with open(path + '.tmp', 'w') as f:
+            json.dump(current, f)
+        os.replace(path + '.tmp', path)
+
+
+def fail(message):
+    sys.stderr.write(message + '\n')
+    sys.exit(1)
+
+
+def device_address(index):
+    return f'00:11:22:33:{index // 256:02x}:{index % 256:02x}'
+
+
+def paired_devices(config, connected_only=False):
+    """blueutil-style device dicts."""
+    devices = []
+    for i in range(config['paired_devices']):
+        connected = i < config['connected_devices']
+        if connected_only and not connected:
+            continue
+        devices.append({
+            'address': device_address(i),
+            'name': f'{DEVICE_NAMES[i % len(DEVICE_NAMES)]} {i}',
+            'connected': connected,
+            'favourite': False,
+            'paired': True,
+            'slave': False,
+            'recentAccessDate': '2024-01-01T00:00:00Z',
+        })
+    return devices
+
+
+def networksetup(config, state, args):
+    command = args[0] if args else ''
+    if command == '-listallhardwareports':
+        print('Hardware Port: Ethernet\nDevice: en1\nEthernet Address: aa:bb\n')
+        print('Hardware Port: Wi-Fi\nDevice: en0\nEthernet Address: cc:dd')
+    elif command == '-getairportpower':
+        print(f"Wi-Fi Power ({args[1]}): {'On' if state['wifi'] else 'Off'}")
+    elif command == '-setairportpower':
+        on = args[2] == 'on'
+        update_state(state, wifi=on, ssid=state['last_ssid'] if on and config['autojoin'] else None)
+    elif command == '-getairportnetwork':
+        if state['wifi'] and state.get('ssid'):
+            print(f"Current Wi-Fi Network: {state['ssid']}")
+        else:
+            print("You are not associated with an AirPort network.")
+    elif command == '-setairportnetwork':
+        update_state(state, ssid=args[2], last_ssid=args[2])
+    elif command == '-listpreferredwirelessnetworks':
+        print(f"Preferred networks on {args[1]}:")
+        for i in range(config['preferred_networks']):
+            print(f"\tNetwork {i}")
+    else:
+        fail(f"Unknown command {command}")
+
+
+def blueutil(config, state, args):
+    i = 0
+    as_json = '--format' in args and 'json' in args
+    while i < len(args):
+        flag = args[i]
+        value = args[i + 1] if i + 1 < len(args) and not args[i + 1].startswith('--') else None
+        if flag == '--help':
+            print("Usage: blueutil [options]\n  --power\n  --paired\n  --connected\n"
+                  "  --connect ID\n  --disconnect ID\n  --is-connected ID\n  --format FORMAT")
+        elif flag == '--power':
+            if value is None:
+                print('1' if state['bluetooth'] else '0')
+            else:
+                update_state(state, bluetooth=value == '1')
+        elif flag in ('--paired', '--connected'):
+            devices = paired_devices(config, connected_only=flag == '--connected')
+            if as_json:
+                print(json.dumps(devices))
+            else:
+                for device in devices:
+                    print(f"address: {device['address']}, name: \"{device['name']}\"")
+        elif flag == '--connect':
+            time.sleep(config['connect_latency'])
+            if random.random() < config['failure_rate']:
+                fail(f"Failed to connect {value}")
+        elif flag == '--is-connected':
+            print('1')  # Block-buffered to the pipe, like blueutil's stdio
+        elif flag in ('--disconnect', '--format'):
+            pass
+        else:
+            fail(f"Unknown option {flag}")
+        i += 2 if value is not None else 1
+
+
+def ifconfig(config, state, args):
+    flags = 'UP,BROADCAST,SMART,RUNNING,SIMPLEX,MULTICAST' if state['wifi'] else 'BROADCAST,SIMPLEX,MULTICAST'
+    print(f"{args[0] if args else 'en0'}: flags=8863<{flags}> mtu 1500")
+
+
+TOOLS = {'networksetup': networksetup, 'blueutil': blueutil, 'ifconfig': ifconfig}
+
+
+def main():
+    tool, args = sys.argv[1], sys.argv[2:]
+    config = load_config()
+    time.sleep(config['latency'] + random.uniform(0, config['jitter']))
+    if '--help' not in args and random.random() < config['failure_rate']:
+        fail(f"{tool}: simulated failure")
+    TOOLS[tool](config, load_state(), args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Replay sleep/wake traces through the simulator (see simulator.py).
+
+Runs a synthetic trace (or a recorded one with --trace) through the app's
+transition handling against simulated radios under a virtual clock, then
+prints the sleep/wake timings, reconnect outcomes and the replay speed. Exits non-zero if any race.*
+counter is set, so it can gate changes to the transition logic.
+
+    python benchmarks/simulate.py --cycles 5000
+    python benchmarks/simulate.py --flap-rate 0.5 --awake 30   # lid flapping
+    python benchmarks/simulate.py --trace ~/Library/Logs/SleepWatch/sleepwatch.jsonl
+"""
+import argparse
+import json
+import logging
+import sys
+import time
+from pathlib import Path
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_DIR))
+
+from metrics import Metrics  # noqa: E402
+from simulator import (  # noqa: E402
+    DEFAULT_SLEEP_GRACE, Orchestrator, SimulatedDevice, SimulatedRadios,
+    load_trace, replay, synthetic_trace
+)
+
+DEVICE_NAMES = ['Magic Keyboard', 'Magic Mouse', 'AirPods Pro', 'Headphones', 'Speaker', 'Sensor']
+HISTORY = 1000000  # Keep every sample: percentiles over the whole run
+
+
+def make_devices(count, presence, failure_rate):
+    return [
+        SimulatedDevice(
+            f'00:11:22:33:{i // 256:02x}:{i % 256:02x}',
+            f'{DEVICE_NAMES[i % len(DEVICE_NAMES)]} {i}',
+            presence=presence,
+            failure_rate=failure_rate,
+        )
+        for i in range(count)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--trace', type=Path, help='Recorded trace or SleepWatch JSON log to replay')
+    parser.add_argument('--cycles', type=int, default=1000, help='Synthetic sleep/wake cycles')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--awake', type=float, default=8 * 60 * 60, help='Mean seconds awake')
+    parser.add_argument('--asleep', type=float, default=4 * 60 * 60, help='Mean seconds asleep')
+    parser.add_argument('--flap-rate', type=float, default=0.05, help='Share of cycles that are lid flaps')
+    parser.add_argument('--devices', type=int, default=3, help='Favorite devices')
+    parser.add_argument('--presence', type=float, default=0.9, help='Chance a device is in range on wake')
+    parser.add_argument('--failure-rate', type=float, default=0.05, help='Chance a device connect fails')
+    parser.add_argument('--autojoin-rate', type=float, default=0.9)
+    parser.add_argument('--sleep-grace', type=float, default=DEFAULT_SLEEP_GRACE)
+    parser.add_argument('--config', type=json.loads, default={},
+                        help='JSON object of config overrides, e.g. \'{"reconnect_concurrency": 1}\'')
+    parser.add_argument('--output', type=Path, help='Also write the metrics snapshot as JSON')
+    args = parser.parse_args()
+    # The app logs every failed reconnect; thousands of cycles would drown the summary
+    logging.basicConfig(level=logging.ERROR)
+
+    if args.trace:
+        trace = load_trace(args.trace)
+        if not trace:
+            print(f"No sleep/wake events in {args.trace}")
+            return 1
+    else:
+        trace = synthetic_trace(args.cycles, seed=args.seed, awake=args.awake,
+                                asleep=args.asleep, flap_rate=args.flap_rate)
+    devices = make_devices(args.devices, args.presence, args.failure_rate)
+    config = {'favorite_devices': [d.address for d in devices], **args.config}
+
+    def orchestrator():
+        registry = Metrics(history=HISTORY)
+        radios = SimulatedRadios(devices, autojoin_rate=args.autojoin_rate, seed=args.seed, registry=registry)
+        return Orchestrator(radios, config, registry=registry)
+
+    started = time.perf_counter()
+    snapshot = replay(trace, orchestrator, sleep_grace=args.sleep_grace)
+    elapsed = time.perf_counter() - started
+
+    wakes = snapshot['counters'].get('trace.wake', 0)
+    simulated = trace[-1][0] if trace else 0
+    print(f"{len(trace)} events ({wakes} wakes, {simulated / 86400:.1f} simulated days) "
+          f"in {elapsed:.2f}s: {wakes / elapsed:.0f} cycles/s")
+    for name, summary in snapshot['histograms'].items():
+        print(f"  {name:<28} n={summary['count']:<7} p50 {summary['p50']:7.2f}s  "
+              f"p95 {summary['p95']:7.2f}s  p99 {summary['p99']:7.2f}s  max {summary['max']:7.2f}s")
+    for name, count in snapshot['counters'].items():
+        if not name.startswith('trace.'):
+            print(f"  {name:<28} {count}")
+
+    if args.output:
+        args.output.write_text(json.dumps(snapshot, indent=2))
+
+    races = {name: count for name, count in snapshot['counters'].items() if name.startswith('race.')}
+    print("RACES " + ", ".join(f"{n}={c}" for n, c in races.items()) if races else "OK, no races")
+    return 1 if races else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,141 +1,280 @@
 """Bluetooth device management."""
+import asyncio
 import subprocess
 import json
-import os
-import shutil
+import discovery
+import readiness
+from async_subprocess import DEFAULT_TIMEOUT, run_sync
+from blueutil_executor import default_executor as blueutil
+from metrics import metrics
+
+# Reconnect priority tiers - lower tiers are connected first
+TIER_INPUT = 0
+TIER_AUDIO = 1
+TIER_OTHER = 2
+
+# Name fragments used to guess a device's tier (blueutil does not report device class)
+INPUT_KEYWORDS = ('keyboard', 'mouse', 'trackpad', 'magic', 'controller', 'gamepad')
+AUDIO_KEYWORDS = ('airpods', 'headphone', 'headset', 'buds', 'beats', 'speaker', 'soundbar')
+
+DEFAULT_CONNECT_TIMEOUT = 10
+
 
 class BluetoothError(Exception):
     """Bluetooth operation error."""
     pass
 
 class BluetoothManager:
-    """Manages Bluetooth state and device connections."""
-    
+    """
+    Manages Bluetooth state and device connections.
+
+    Every operation has an async variant (`*_async`) built on asyncio
+    subprocesses with a timeout; cancelling the awaiting task kills the
+    blueutil process. The synchronous methods are thin wrappers around them.
+    """
+
     @staticmethod
     def is_brew_installed():
         """Check if Homebrew is installed."""
-        return bool(shutil.which('brew'))
+        return discovery.find_tool('brew') is not None
 
     @staticmethod
     def is_blueutil_installed():
         """Check if blueutil is installed and accessible."""
-        return bool(shutil.which('blueutil'))
-    
+        return blueutil.is_available()
+
     @staticmethod
     def get_blueutil_path():
         """Get the full path to blueutil."""
-        # Check common homebrew locations
-        paths = [
-            shutil.which('blueutil'),  # Check PATH first
-            '/usr/local/bin/blueutil',  # Intel Mac homebrew
-            '/opt/homebrew/bin/blueutil',  # Apple Silicon homebrew
-        ]
-        for path in paths:
-            if path and os.path.exists(path):
-                return path
-        return '/usr/local/bin/blueutil'  # fallback
-
-    @staticmethod
-    def get_power_state():
+        return blueutil.path
+
+    @staticmethod
+    @metrics.timed('bluetooth.get_power_state', failed=lambda on: on is None)
+    async def get_power_state_async(timeout=DEFAULT_TIMEOUT):
         """Get current Bluetooth power state (True = on, False = off)."""
-        blueutil = BluetoothManager.get_blueutil_path()
-        if not os.path.exists(blueutil):
+        if not blueutil.is_available():
             raise BluetoothError("blueutil not installed")
-            
+
         try:
-            result = subprocess.run(
-                [blueutil, '--power'],
-                capture_output=True,
-                text=True,
-                encoding='utf-8',
-                check=True
-            )
+            result = await blueutil.run_async('--power', timeout=timeout)
             return result.stdout.strip() == '1'
-        except (subprocess.CalledProcessError, FileNotFoundError):
+        except (subprocess.CalledProcessError, subprocess.TimeoutExpired, FileNotFoundError):
             return None
 
     @staticmethod
-    def set_power(state):
+    def get_power_state(timeout=DEFAULT_TIMEOUT):
+        """Get current Bluetooth power state (True = on, False = off)."""
+        return run_sync(BluetoothManager.get_power_state_async(timeout))
+
+    @staticmethod
+    @metrics.timed('bluetooth.set_power', failed=lambda ok: not ok)
+    async def set_power_async(state, timeout=DEFAULT_TIMEOUT):
         """Set Bluetooth power state (True = on, False = off)."""
-        blueutil = BluetoothManager.get_blueutil_path()
-        if not os.path.exists(blueutil):
+        if not blueutil.is_available():
             raise BluetoothError("blueutil not installed")
-            
+
         try:
-            subprocess.run(
-                [blueutil, '--power', '1' if state else '0'],
-                check=True,
-                capture_output=True
-            )
+            await blueutil.run_async('--power', '1' if state else '0', timeout=timeout)
             return True
-        except (subprocess.CalledProcessError, FileNotFoundError):
+        except (subprocess.CalledProcessError, subprocess.TimeoutExpired, FileNotFoundError):
             return False
 
     @staticmethod
-    def get_paired_devices():
+    def set_power(state, timeout=DEFAULT_TIMEOUT):
+        """Set Bluetooth power state (True = on, False = off)."""
+        return run_sync(BluetoothManager.set_power_async(state, timeout))
+
+    @staticmethod
+    async def _is_ready_async():
+        """Readiness probe: blueutil reports the controller powered on."""
+        try:
+            return await BluetoothManager.get_power_state_async()
+        except BluetoothError:
+            return False
+
+    @staticmethod
+    async def wait_until_ready_async(timeout=readiness.DEFAULT_TIMEOUT):
+        """Wait until the Bluetooth controller reports power on. Returns True if ready."""
+        ready, _ = await readiness.wait_until_ready_async(
+            'bluetooth', BluetoothManager._is_ready_async, timeout=timeout
+        )
+        return ready
+
+    @staticmethod
+    def wait_until_ready(timeout=readiness.DEFAULT_TIMEOUT, cancel=None):
+        """Wait until the Bluetooth controller reports power on. Returns True if ready."""
+        ready, _ = readiness.wait_until_ready(
+            'bluetooth',
+            lambda: run_sync(BluetoothManager._is_ready_async()),
+            timeout=timeout,
+            cancel=cancel
+        )
+        return ready
+
+    @staticmethod
+    @metrics.timed('bluetooth.get_paired_devices')
+    async def get_paired_devices_async(timeout=DEFAULT_TIMEOUT):
         """Get list of paired Bluetooth devices."""
-        blueutil = BluetoothManager.get_blueutil_path()
-        if not os.path.exists(blueutil):
+        if not blueutil.is_available():
             raise BluetoothError("blueutil not installed")
-            
+
         try:
-            result = subprocess.run(
-                [blueutil, '--paired', '--format', 'json'],
-                capture_output=True,
-                text=True,
-                encoding='utf-8',
-                check=True
-            )
+            result = await blueutil.run_async('--paired', '--format', 'json', timeout=timeout)
             devices = json.loads(result.stdout)
             return devices
-        except (subprocess.CalledProcessError, FileNotFoundError, json.JSONDecodeError):
+        except (subprocess.CalledProcessError, subprocess.TimeoutExpired, FileNotFoundError,
+                json.JSONDecodeError):
             return []
 
     @staticmethod
-    def get_connected_devices():
+    def get_paired_devices(timeout=DEFAULT_TIMEOUT):
+        """Get list of paired Bluetooth devices."""
+        return run_sync(BluetoothManager.get_paired_devices_async(timeout))
+
+    @staticmethod
+    @metrics.timed('bluetooth.get_connected_devices')
+    async def get_connected_devices_async(timeout=DEFAULT_TIMEOUT):
         """Get list of currently connected Bluetooth devices."""
-        devices = BluetoothManager.get_paired_devices()
-        return [d for d in devices if d.get('connected', False)]
+        if not blueutil.is_available():
+            raise BluetoothError("blueutil not installed")
+
+        if not discovery.has_capability('blueutil', '--connected'):
+            # Older blueutil without --connected
+            devices = await BluetoothManager.get_paired_devices_async(timeout)
+            return [d for d in devices if d.get('connected', False)]
+
+        try:
+            # Connected-only listing is much cheaper than the full paired list
+            result = await blueutil.run_async('--connected', '--format', 'json', timeout=timeout)
+            return json.loads(result.stdout)
+        except (subprocess.CalledProcessError, subprocess.TimeoutExpired, FileNotFoundError,
+                json.JSONDecodeError):
+            return []
+
+    @staticmethod
+    def get_connected_devices(timeout=DEFAULT_TIMEOUT):
+        """Get list of currently connected Bluetooth devices."""
+        return run_sync(BluetoothManager.get_connected_devices_async(timeout))
 
     @staticmethod
-    def connect_device(address):
+    @metrics.timed('bluetooth.connect_device', failed=lambda ok: not ok)
+    async def connect_device_async(address, timeout=DEFAULT_CONNECT_TIMEOUT):
         """Connect to a specific Bluetooth device by address."""
         try:
-            subprocess.run(
-                ['blueutil', '--connect', address],
-                check=True,
-                capture_output=True,
-                timeout=10
-            )
+            await blueutil.run_async('--connect', address, timeout=timeout)
             return True
         except (subprocess.CalledProcessError, subprocess.TimeoutExpired, FileNotFoundError):
             return False
 
     @staticmethod
-    def disconnect_device(address):
-        """Disconnect a specific Bluetooth device by address."""
+    def connect_device(address, timeout=DEFAULT_CONNECT_TIMEOUT):
+        """Connect to a specific Bluetooth device by address."""
+        return run_sync(BluetoothManager.connect_device_async(address, timeout))
+
+    @staticmethod
+    def get_device_tier(name):
+        """Guess the reconnect priority tier of a device from its name."""
+        name = (name or '').lower()
+        if any(keyword in name for keyword in INPUT_KEYWORDS):
+            return TIER_INPUT
+        if any(keyword in name for keyword in AUDIO_KEYWORDS):
+            return TIER_AUDIO
+        return TIER_OTHER
+
+    @staticmethod
+    def _new_result(device):
+        """Build an empty reconnect result for a device."""
+        return {
+            'address': device['address'],
+            'name': device.get('name') or device['address'],
+            'tier': BluetoothManager.get_device_tier(device.get('name')),
+            'outcome': 'skipped',
+            'latency': None,
+            'timeout': device.get('timeout') or DEFAULT_CONNECT_TIMEOUT,
+            'skip': bool(device.get('skip')),
+        }
+
+    @staticmethod
+    def plan_results(devices, plan=None):
+        """
+        Build the result list for a reconnect, in priority order.
+
+        Args:
+            devices: List of device dicts with an 'address' and optional 'name',
+                'timeout' (per-device connect timeout) and 'skip' (report as
+                skipped without attempting)
+            plan: Optional callable that takes the device list and returns it
+                reordered and annotated with 'timeout'/'skip'
+
+        Returns:
+            List of per-device result dicts with 'address', 'name', 'tier',
+            'outcome' ('skipped' until reconnect_results_async fills in
+            'connected', 'failed', 'timeout' or 'cancelled') and 'latency'
+            (seconds, None if never attempted).
+        """
+        devices = [d for d in devices if d.get('address')]
+        if plan:
+            devices = plan(devices)
+        # Input devices first, then audio, then everything else; ties keep caller order
+        return sorted(
+            (BluetoothManager._new_result(d) for d in devices),
+            key=lambda r: r['tier']
+        )
+
+    @staticmethod
+    async def run_lane_async(results, deadline):
+        """
+        Connect a lane of devices one after another before the loop-clock deadline.
+
+        Each device gets its own '--connect ADDR --is-connected ADDR'
+        invocation, which both connects and verifies it. Latency and the
+        per-device timeout are measured on that invocation as a whole:
+        blueutil's stdout is block-buffered when it is a pipe, so output
+        lines only arrive when it exits and can't time devices within one
+        longer invocation.
+        """
+        loop = asyncio.get_running_loop()
+        pending = list(results)
         try:
-            subprocess.run(
-                ['blueutil', '--disconnect', address],
-                check=True,
-                capture_output=True
-            )
-            return True
-        except (subprocess.CalledProcessError, FileNotFoundError):
-            return False
+            while pending and loop.time() < deadline:
+                result = pending[0]
+                started = loop.time()
+                timeout = min(result['timeout'], deadline - started)
+                try:
+                    verified = await blueutil.run_async(
+                        '--connect', result['address'], '--is-connected', result['address'],
+                        timeout=timeout
+                    )
+                    result['outcome'] = 'connected' if verified.stdout.strip() == '1' else 'failed'
+                except subprocess.TimeoutExpired:
+                    result['outcome'] = 'timeout'
+                except (subprocess.CalledProcessError, FileNotFoundError):
+                    result['outcome'] = 'failed'
+                result['latency'] = loop.time() - started
+                pending.pop(0)
+        except asyncio.CancelledError:
+            for result in pending:
+                result['outcome'] = 'cancelled'
+            raise
 
     @staticmethod
-    def reconnect_favorites(favorite_addresses):
-        """Reconnect to favorite devices."""
-        if not BluetoothManager.get_power_state():
-            BluetoothManager.set_power(True)
-            # Give Bluetooth time to power on
-            import time
-            time.sleep(1)
+    async def reconnect_results_async(results, concurrency, deadline, run_lane=None):
+        """
+        Run the reconnect for a prepared result list, filling it in place.
 
-        success_count = 0
-        for address in favorite_addresses:
-            if BluetoothManager.connect_device(address):
-                success_count += 1
+        Devices are split across at most `concurrency` lanes that run
+        concurrently on the calling event loop under one overall deadline
+        (seconds from now). run_lane(results, deadline) connects one lane's
+        devices in order before the loop-clock deadline (defaults to
+        run_lane_async; see RadioBackend.connect_lane).
+        """
+        run_lane = run_lane or BluetoothManager.run_lane_async
+        deadline_at = asyncio.get_running_loop().time() + deadline
+        attempts = [r for r in results if not r['skip']]
+        if not attempts:
+            return
 
-        return success_count
+        # Deal devices round-robin so every lane starts with the highest-priority devices
+        lane_count = max(1, min(concurrency, len(attempts)))
+        lanes = [attempts[i::lane_count] for i in range(lane_count)]
+        await asyncio.gather(*(run_lane(lane, deadline_at) for lane in lanes))
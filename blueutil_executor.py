@@ -0,0 +1,62 @@
+"""Timed blueutil command execution."""
+import os
+import time
+import discovery
+from async_subprocess import DEFAULT_TIMEOUT, run_command, run_sync
+from metrics import metrics
+
+
+class BlueutilExecutor:
+    """
+    Runs blueutil commands.
+
+    The blueutil path is resolved once and cached. Every invocation is timed
+    per command. Invocations run as asyncio subprocesses; the synchronous
+    methods wrap the async ones.
+    """
+
+    def __init__(self):
+        self._path = None
+
+    @property
+    def path(self):
+        """Full path to blueutil, resolved on first use."""
+        if self._path is None:
+            tool = discovery.find_tool('blueutil')
+            self._path = tool['path'] if tool else '/usr/local/bin/blueutil'  # fallback
+        return self._path
+
+    def is_available(self):
+        """Check if the resolved blueutil exists."""
+        return os.path.exists(self.path)
+
+    def reset(self):
+        """Forget the resolved path, e.g. after blueutil was installed."""
+        discovery.reset()
+        self._path = None
+
+    def _record(self, args, started):
+        """Record how long an invocation took under its command key."""
+        key = ' '.join(sorted({a for a in args if a.startswith('--')}))
+        metrics.observe(f'blueutil {key}', time.monotonic() - started)
+
+    async def run_async(self, *args, timeout=DEFAULT_TIMEOUT):
+        """
+        Run one blueutil invocation on the event loop.
+
+        Returns the CompletedProcess. Raises CalledProcessError on a non-zero
+        exit, TimeoutExpired on timeout and FileNotFoundError if missing.
+        """
+        started = time.monotonic()
+        try:
+            return await run_command([self.path, *args], timeout=timeout)
+        finally:
+            self._record(args, started)
+
+    def run(self, *args, timeout=DEFAULT_TIMEOUT):
+        """Run one blueutil invocation (synchronous wrapper of run_async)."""
+        return run_sync(self.run_async(*args, timeout=timeout))
+
+
+# Shared executor used by BluetoothManager
+default_executor = BlueutilExecutor()
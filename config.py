@@ -1,7 +1,19 @@
 """Configuration management for SleepWatch."""
+import copy
 import json
+import logging
 import os
+import threading
 from pathlib import Path
+from write_behind import WriteBehindSaver
+
+logger = logging.getLogger(__name__)
+
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+except ImportError:  # Optional; fall back to polling the file's mtime/size
+    Observer = None
 
 CONFIG_FILE = Path.home() / '.sleepwatch.json'
 
@@ -12,67 +24,254 @@ DEFAULT_CONFIG = {
     'auto_reconnect_bluetooth': True,
     'favorite_devices': [],
     'last_wifi_network': None,
-    'reconnect_mode': 'favorites'  # 'favorites', 'last', or 'all'
+    'reconnect_mode': 'favorites',  # 'favorites', 'last', or 'all'
+    'reconnect_concurrency': 4,  # Max Bluetooth connects in flight at once
+    'reconnect_deadline': 30,  # Seconds allowed for all Bluetooth reconnects on wake
+    'wifi_rejoin_budget': 30,  # Seconds allowed for WiFi rejoin on wake, fallbacks included
+    'sleep_deadline': 5,  # Seconds allowed for capturing state and powering off radios on sleep
+    'status_refresh_interval': 60,  # Seconds between background status refreshes for the menu
+    'metrics_interval': 60,  # Seconds between writes of ~/.sleepwatch_metrics.json
+    'metrics_port': None,  # Serve metrics on http://127.0.0.1:<port>/metrics when set
+    'update_check_interval': 21600  # Seconds a cached update check answer is used without asking GitHub
 }
 
+DEFAULT_WATCH_INTERVAL = 2  # Seconds between config file checks when polling
+
 
 class Config:
-    """Manages app configuration and preferences."""
+    """
+    Manages app configuration and preferences.
+
+    Changes are held in memory and written behind: bursts of changes are
+    coalesced into one atomic write on a background thread. Call flush()
+    before quitting.
+
+    Edits made to the file by other programs are picked up while watching
+    (see start_watching) and every changed key is published to subscribers.
+    Keys changed here but not yet written keep their in-memory value.
+    """
 
     def __init__(self):
+        self._lock = threading.RLock()
+        self._subscribers = {}
+        self._watcher = None
+        self._signature = self._file_signature()
+        self._unsaved = {}  # Key -> change number, for changes not yet on disk
+        self._changes = 0
+        self._snapshot_changes = {}  # _unsaved as of the snapshot being written
         self.config = self._load_config()
+        # Set index so is_favorite() is O(1) per menu row
+        self._favorites = set(self.config.get('favorite_devices', []))
+        self._saver = WriteBehindSaver(
+            CONFIG_FILE, self._snapshot, indent=2, on_written=self._remember_signature
+        )
+
+    @staticmethod
+    def _file_signature():
+        """Cheap change check for the config file: (mtime, size), or None if missing."""
+        try:
+            stat = os.stat(CONFIG_FILE)
+            return (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            return None
+
+    def _remember_signature(self):
+        """Record the file signature after our own write so it isn't reloaded."""
+        with self._lock:
+            self._signature = self._file_signature()
+            # Keys changed again since the snapshot are still unsaved
+            for key, change in self._snapshot_changes.items():
+                if self._unsaved.get(key) == change:
+                    del self._unsaved[key]
+
+    def _changed(self, key):
+        """Note an in-memory change to `key` (call with the lock held)."""
+        self._changes += 1
+        self._unsaved[key] = self._changes
+
+    @staticmethod
+    def _read_file():
+        """Read the config file merged over the defaults. Raises on unreadable JSON."""
+        with open(CONFIG_FILE, 'r') as f:
+            loaded = json.load(f)
+        # Merge with defaults to handle new keys
+        config = DEFAULT_CONFIG.copy()
+        config.update(loaded)
+        return config
 
     def _load_config(self):
         """Load configuration from disk or create default."""
         if CONFIG_FILE.exists():
             try:
-                with open(CONFIG_FILE, 'r') as f:
-                    loaded = json.load(f)
-                    # Merge with defaults to handle new keys
-                    config = DEFAULT_CONFIG.copy()
-                    config.update(loaded)
-                    return config
-            except (json.JSONDecodeError, IOError):
+                return self._read_file()
+            except (json.JSONDecodeError, IOError) as e:
+                # Keep the unreadable file for inspection instead of overwriting it
+                corrupt = CONFIG_FILE.with_name(CONFIG_FILE.name + '.corrupt')
+                logger.warning("Failed to load config (%s), moved to %s; using defaults", e, corrupt)
+                try:
+                    os.replace(CONFIG_FILE, corrupt)
+                except OSError:
+                    pass
                 return DEFAULT_CONFIG.copy()
         return DEFAULT_CONFIG.copy()
 
-    def save(self):
-        """Save configuration to disk."""
+    def reload_if_changed(self):
+        """
+        Reload the file if it changed on disk since it was last read or written.
+
+        Returns the list of keys whose values changed.
+        """
+        signature = self._file_signature()
+        if signature is None or signature == self._signature:
+            return []
         try:
-            with open(CONFIG_FILE, 'w') as f:
-                json.dump(self.config, f, indent=2)
-        except IOError as e:
-            print(f"Failed to save config: {e}")
+            loaded = self._read_file()
+        except (json.JSONDecodeError, IOError):
+            # Probably caught mid-write by another program; try again on the next change
+            return []
+
+        with self._lock:
+            self._signature = signature
+            # Changes still waiting for the write-behind save win over the file
+            for key in self._unsaved:
+                if key in self.config:
+                    loaded[key] = self.config[key]
+            changes = [
+                (key, self.config.get(key), value)
+                for key, value in loaded.items()
+                if self.config.get(key) != value
+            ]
+            self.config = loaded
+            self._favorites = set(loaded.get('favorite_devices', []))
+
+        for key, old, new in changes:
+            self._publish(key, old, new)
+        return [key for key, _, _ in changes]
+
+    def subscribe(self, key, callback):
+        """
+        Call callback(key, old, new) whenever `key` changes (any key if key is None).
+
+        Callbacks may run on a background thread.
+        """
+        with self._lock:
+            self._subscribers.setdefault(key, []).append(callback)
+
+    def _publish(self, key, old, new):
+        """Notify subscribers of a changed key."""
+        with self._lock:
+            callbacks = self._subscribers.get(key, []) + self._subscribers.get(None, [])
+        for callback in callbacks:
+            try:
+                callback(key, old, new)
+            except Exception:
+                logger.exception("Config subscriber failed for %s", key)
+
+    def start_watching(self, interval=DEFAULT_WATCH_INTERVAL):
+        """
+        Watch the config file for external edits.
+
+        Uses watchdog (FSEvents on macOS, inotify on Linux) when it is
+        installed, otherwise checks the file's mtime/size every `interval`
+        seconds on a background thread.
+        """
+        if self._watcher:
+            return
+        if Observer is not None:
+            config = self
+
+            class Handler(FileSystemEventHandler):
+                def on_any_event(self, event):
+                    config.reload_if_changed()
+
+            self._watcher = Observer()
+            self._watcher.schedule(Handler(), str(CONFIG_FILE.parent), recursive=False)
+            self._watcher.daemon = True
+            self._watcher.start()
+        else:
+            stop = threading.Event()
+
+            def poll():
+                while not stop.wait(interval):
+                    self.reload_if_changed()
+
+            self._watcher = stop
+            threading.Thread(target=poll, name='config-watch', daemon=True).start()
+
+    def stop_watching(self):
+        """Stop watching the config file."""
+        if isinstance(self._watcher, threading.Event):
+            self._watcher.set()
+        elif self._watcher:
+            self._watcher.stop()
+        self._watcher = None
+
+    def _snapshot(self):
+        """Copy of the configuration for the writer thread."""
+        with self._lock:
+            self._snapshot_changes = dict(self._unsaved)
+            return copy.deepcopy(self.config)
+
+    def save(self):
+        """Schedule a write-behind save to disk."""
+        self._saver.schedule()
+
+    def flush(self):
+        """Write any pending changes to disk now."""
+        self._saver.flush()
 
     def get(self, key, default=None):
         """Get a configuration value."""
-        return self.config.get(key, default)
+        with self._lock:
+            return self.config.get(key, default)
 
     def set(self, key, value):
         """Set a configuration value and save."""
-        self.config[key] = value
+        with self._lock:
+            old = self.config.get(key)
+            self.config[key] = value
+            self._changed(key)
+            if key == 'favorite_devices':
+                self._favorites = set(value)
         self.save()
+        if old != value:
+            self._publish(key, old, value)
 
     def toggle(self, key):
         """Toggle a boolean configuration value."""
-        self.config[key] = not self.config.get(key, False)
+        with self._lock:
+            old = self.config.get(key, False)
+            self.config[key] = not old
+            self._changed(key)
+            value = self.config[key]
         self.save()
-        return self.config[key]
+        self._publish(key, old, value)
+        return value
 
     def add_favorite(self, device_address):
         """Add a device to favorites."""
-        favorites = self.config.get('favorite_devices', [])
-        if device_address not in favorites:
-            favorites.append(device_address)
-            self.set('favorite_devices', favorites)
+        with self._lock:
+            if device_address in self._favorites:
+                return
+            favorites = self.config.get('favorite_devices', [])
+            self.config['favorite_devices'] = favorites + [device_address]
+            self._changed('favorite_devices')
+            self._favorites.add(device_address)
+        self.save()
+        self._publish('favorite_devices', favorites, self.config['favorite_devices'])
 
     def remove_favorite(self, device_address):
         """Remove a device from favorites."""
-        favorites = self.config.get('favorite_devices', [])
-        if device_address in favorites:
-            favorites.remove(device_address)
-            self.set('favorite_devices', favorites)
+        with self._lock:
+            if device_address not in self._favorites:
+                return
+            favorites = self.config.get('favorite_devices', [])
+            self.config['favorite_devices'] = [a for a in favorites if a != device_address]
+            self._changed('favorite_devices')
+            self._favorites.discard(device_address)
+        self.save()
+        self._publish('favorite_devices', favorites, self.config['favorite_devices'])
 
     def is_favorite(self, device_address):
         """Check if a device is in favorites."""
-        return device_address in self.config.get('favorite_devices', [])
+        return device_address in self._favorites
@@ -0,0 +1,183 @@
+"""Grouped, lazily populated Bluetooth device browser for the menu."""
+import rumps
+from Foundation import NSObject
+from bluetooth_manager import BluetoothManager, TIER_INPUT, TIER_AUDIO
+from device_menu import DeviceMenu, insert_keyed, add_keyed
+
+HEADER_KEY = 'group:header'
+FIND_KEY = 'browser:find'
+SEARCH_GROUP = 'search'
+SEARCH_LIMIT = 100  # Most matches shown in the Search Results submenu
+
+# (group id, title) in menu order; the search group is added after a search
+GROUPS = [
+    ('connected', "Connected"),
+    ('favorites', "Favorites"),
+    ('input', "Input Devices"),
+    ('audio', "Audio Devices"),
+    ('other', "Other Devices"),
+]
+
+TIER_GROUPS = {TIER_INPUT: 'input', TIER_AUDIO: 'audio'}
+
+
+class MenuOpenDelegate(NSObject):
+    """NSMenu delegate that calls `callback` just before the menu is shown."""
+
+    def menuNeedsUpdate_(self, menu):
+        self.callback()
+
+
+class DeviceBrowser:
+    """
+    Device section of the menu: one submenu per group plus a search picker.
+
+    set_devices() only re-buckets the list and updates the group titles;
+    a group's rows are (re)built when its submenu is about to open, and
+    only if its contents changed since it was last shown. Rows are
+    updated with DeviceMenu, so re-opening after a small change touches
+    only the changed rows.
+    """
+
+    def __init__(self, menu, anchor, on_click, is_favorite):
+        """
+        Args:
+            menu: rumps menu the browser lives in
+            anchor: Key of the item the group submenus are placed after
+            on_click: Called with the device address when a device is clicked
+            is_favorite: Callable(address) -> bool for the checkmarks
+        """
+        self.menu = menu
+        self.anchor = anchor
+        self.on_click = on_click
+        self.is_favorite = is_favorite
+        self._devices = []
+        self._groups = {}  # group id -> list of DeviceRecords
+        self._items = {}  # group id -> submenu MenuItem
+        self._rows = {}  # group id -> DeviceMenu
+        self._dirty = set()
+        self._delegates = []  # Keep the ObjC delegates alive
+        self._tiers = {}  # address -> tier, guessed once per device
+        self._message = "No devices"
+        self._search = None  # (query, matches) of the last search
+        self._built = False
+
+    def _key(self, group):
+        """Menu key for a group submenu."""
+        return f'group:{group}'
+
+    def build(self):
+        """Add the group submenus and the search item after the anchor."""
+        if self.anchor not in self.menu:
+            return
+        after = self.anchor
+        for group, _ in GROUPS:
+            self._add_group(group, after)
+            after = self._key(group)
+        insert_keyed(self.menu, FIND_KEY, rumps.MenuItem("  Find Device...", callback=self.find_device), after)
+        self._built = True
+        self._refresh_titles()
+
+    def _add_group(self, group, after):
+        """Create an empty group submenu that populates itself when opened."""
+        item = rumps.MenuItem(self._key(group))
+        insert_keyed(self.menu, self._key(group), item, after)
+        add_keyed(item, HEADER_KEY, rumps.MenuItem("", callback=None))
+        self._items[group] = item
+        self._rows[group] = DeviceMenu(item, HEADER_KEY, self.on_click)
+        self._dirty.add(group)
+
+        delegate = MenuOpenDelegate.alloc().init()
+        delegate.callback = lambda: self._populate(group)
+        item._menuitem.submenu().setDelegate_(delegate)
+        self._delegates.append(delegate)
+
+    def _tier_group(self, device):
+        """Type group of a device."""
+        tier = self._tiers.get(device.address)
+        if tier is None:
+            tier = self._tiers[device.address] = BluetoothManager.get_device_tier(device.name)
+        return TIER_GROUPS.get(tier, 'other')
+
+    def set_devices(self, devices, message="No devices"):
+        """
+        Show a new device list (connected first, then by name).
+
+        Args:
+            devices: DeviceRecords
+            message: Shown in groups with no devices
+        """
+        self._devices = sorted(devices, key=lambda d: (not d.connected, d.name.lower()))
+        self._message = message
+        groups = {group: [] for group, _ in GROUPS}
+        for device in self._devices:
+            if device.connected:
+                groups['connected'].append(device)
+            if self.is_favorite(device.address):
+                groups['favorites'].append(device)
+            groups[self._tier_group(device)].append(device)
+        if self._search:
+            groups[SEARCH_GROUP] = self._match(self._search)
+        self._groups = groups
+        # Favorite and connection flags can change in any group, so every group re-diffs on open
+        self._dirty.update(groups)
+        self._refresh_titles()
+
+    def _refresh_titles(self):
+        """Show the device count in each group title."""
+        if not self._built or self.anchor not in self.menu:
+            return
+        for group, title in GROUPS + [(SEARCH_GROUP, None)]:
+            item = self._items.get(group)
+            if item is None:
+                continue
+            if group == SEARCH_GROUP:
+                title = f'Search: "{self._search}"'
+            item.title = f"  {title} ({len(self._groups.get(group, []))})"
+
+    def _populate(self, group):
+        """Bring a group's rows up to date (called just before it opens)."""
+        if group not in self._dirty:
+            return
+        self._dirty.discard(group)
+        devices = self._groups.get(group, [])
+        item = self._items[group]
+        header = item[HEADER_KEY]
+        if not devices:
+            header.title = self._message
+        elif group == SEARCH_GROUP and len(devices) > SEARCH_LIMIT:
+            header.title = f"Showing {SEARCH_LIMIT} of {len(devices)} matches"
+        else:
+            header.title = "Click a device to toggle favorite"
+        self._rows[group].update(devices[:SEARCH_LIMIT] if group == SEARCH_GROUP else devices, self.is_favorite)
+
+    def _match(self, query):
+        """Devices whose name or address contains the query (case-insensitive)."""
+        query = query.lower()
+        return [d for d in self._devices if query in d.name.lower() or query in d.address.lower()]
+
+    def find_device(self, sender):
+        """Ask for a search term and show the matches in a Search Results submenu."""
+        response = rumps.Window(
+            title="Find Device",
+            message="Show devices whose name or address contains:",
+            default_text=self._search or "",
+            ok="Search",
+            cancel="Cancel",
+            dimensions=(260, 24)
+        ).run()
+        query = response.text.strip()
+        if not response.clicked or not query:
+            return
+
+        matches = self._match(query)
+        if not matches:
+            rumps.alert("Find Device", f'No devices match "{query}".')
+            return
+
+        self._search = query
+        if SEARCH_GROUP not in self._items:
+            self._add_group(SEARCH_GROUP, self._key(GROUPS[-1][0]))
+        self._groups[SEARCH_GROUP] = matches
+        self._dirty.add(SEARCH_GROUP)
+        self._refresh_titles()
@@ -0,0 +1,127 @@
+"""Incrementally updated Bluetooth device section of the menu."""
+import rumps
+
+
+def insert_keyed(menu, key, item, after):
+    """
+    Insert an item after `after` under a stable key instead of its title.
+
+    rumps keys items by their title when inserting, so the item briefly
+    carries the key as its title. Its visible title can then change freely
+    without breaking lookups or deletes.
+    """
+    title = item.title
+    item.title = key
+    menu.insert_after(after, item)
+    item.title = title
+
+
+def add_keyed(menu, key, item):
+    """Append an item under a stable key (see insert_keyed)."""
+    title = item.title
+    item.title = key
+    menu.add(item)
+    item.title = title
+
+
+class DeviceMenu:
+    """
+    Keeps the device rows under an anchor item in sync with a device list.
+
+    Rows are added to the menu under stable keys derived from the device
+    address, and the controller holds a direct handle to each one. update()
+    diffs the new list against the rows already shown and only adds,
+    removes, moves or retitles the rows that changed.
+    """
+
+    def __init__(self, menu, anchor, on_click):
+        """
+        Args:
+            menu: rumps menu the rows live in
+            anchor: Key of the item the rows are placed after
+            on_click: Called with the device address when a row is clicked
+        """
+        self.menu = menu
+        self.anchor = anchor
+        self.on_click = on_click
+        self._items = {}  # address -> MenuItem
+        self._rows = {}  # address -> (title, state) currently shown
+        self._order = []  # addresses in menu order
+
+    @staticmethod
+    def _key(address):
+        """Menu key for a device row."""
+        return f'device:{address}'
+
+    @staticmethod
+    def row_for(device, is_favorite):
+        """(title, state) shown for a device."""
+        status_icon = "🟢 " if device.connected else ""
+        return f"{status_icon}{device.name}", is_favorite
+
+    def _remove(self, key):
+        """Remove an item by key if it is still in the menu."""
+        if key in self.menu:
+            del self.menu[key]
+
+    def _forget(self):
+        """Drop all handles (the menu was rebuilt without our rows)."""
+        self._items.clear()
+        self._rows.clear()
+        self._order = []
+
+    def update(self, devices, is_favorite):
+        """
+        Show `devices` in order, changing only rows that differ.
+
+        Args:
+            devices: DeviceRecords in display order
+            is_favorite: Callable(address) -> bool for the checkmark
+        """
+        if self.anchor not in self.menu:
+            self._forget()
+            return
+
+        wanted = {}
+        for device in devices:
+            wanted.setdefault(device.address, self.row_for(device, is_favorite(device.address)))
+        order = list(wanted)
+
+        # Removed devices
+        for address in [a for a in self._order if a not in wanted]:
+            self._remove(self._key(address))
+            del self._items[address]
+            del self._rows[address]
+        current = [a for a in self._order if a in wanted]
+
+        # Walk the wanted order; rows already in place are kept, others are (re)inserted
+        position = 0
+        after = self.anchor
+        for address in order:
+            title, state = wanted[address]
+            key = self._key(address)
+            if position < len(current) and current[position] == address:
+                position += 1
+            else:
+                item = self._items.get(address)
+                if item is None:
+                    item = rumps.MenuItem(title, callback=lambda sender, addr=address: self.on_click(addr))
+                    item.state = state
+                    self._items[address] = item
+                    self._rows[address] = (title, state)
+                else:
+                    self._remove(key)
+                    current.remove(address)
+                insert_keyed(self.menu, key, item, after)
+
+            # Changed name, connection or favorite state: update the row in place
+            if self._rows[address] != (title, state):
+                item = self._items[address]
+                if item.title != title:
+                    item.title = title
+                if item.state != state:
+                    item.state = state
+                self._rows[address] = (title, state)
+            after = key
+
+        self._order = order
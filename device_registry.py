@@ -0,0 +1,105 @@
+"""In-memory registry of paired Bluetooth devices."""
+import threading
+import time
+from collections import namedtuple
+from bluetooth_manager import BluetoothManager, BluetoothError
+from state import state
+
+DEFAULT_TTL = 60  # Seconds before the paired list is fetched again
+
+# Compact per-device record
+DeviceRecord = namedtuple('DeviceRecord', ['address', 'name', 'connected'])
+
+
+class DeviceRegistry:
+    """
+    Caches paired Bluetooth devices keyed by address.
+
+    The paired list is re-read from blueutil only when older than the TTL or
+    after invalidate(). The last known list is saved as a snapshot so the
+    menu can show devices immediately at launch.
+    """
+
+    def __init__(self, ttl=DEFAULT_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._devices = {}
+        self._fetched_at = 0  # Snapshot data always counts as stale
+        self._refreshing = None
+        self._load_snapshot()
+
+    @staticmethod
+    def _to_record(device):
+        """Convert a blueutil device dict to a DeviceRecord."""
+        return DeviceRecord(
+            device.get('address', ''),
+            device.get('name') or 'Unknown',
+            bool(device.get('connected', False))
+        )
+
+    def _load_snapshot(self):
+        """Load the last saved device list."""
+        snapshot = state.get('devices') or []
+        try:
+            self._devices = {entry[0]: DeviceRecord(*entry) for entry in snapshot}
+        except TypeError:
+            self._devices = {}
+
+    def _save_snapshot(self):
+        """Save the current device list as compact rows."""
+        with self._lock:
+            rows = [list(record) for record in self._devices.values()]
+        state.set('devices', rows)
+
+    def is_stale(self):
+        """Check if the cached list is older than the TTL."""
+        return time.monotonic() - self._fetched_at > self.ttl
+
+    def invalidate(self):
+        """Mark the cache stale (sleep/wake, power changes)."""
+        self._fetched_at = 0
+
+    def refresh(self):
+        """Re-read the paired list from blueutil. Raises BluetoothError if blueutil is missing."""
+        devices = BluetoothManager.get_paired_devices()
+        records = [self._to_record(d) for d in devices if d.get('address')]
+        with self._lock:
+            self._devices = {r.address: r for r in records}
+            self._fetched_at = time.monotonic()
+        self._save_snapshot()
+        return records
+
+    def refresh_async(self, callback=None):
+        """Refresh in a background thread, then call callback(records) if given."""
+        with self._lock:
+            if self._refreshing and self._refreshing.is_alive():
+                return self._refreshing
+
+            def run():
+                try:
+                    records = self.refresh()
+                except BluetoothError:
+                    return
+                if callback:
+                    callback(records)
+
+            self._refreshing = threading.Thread(target=run, daemon=True)
+            self._refreshing.start()
+            return self._refreshing
+
+    def get_devices(self, allow_stale=False):
+        """
+        Get all paired devices.
+
+        Args:
+            allow_stale: Return cached/snapshot data without refreshing
+        """
+        if not allow_stale and self.is_stale():
+            return self.refresh()
+        with self._lock:
+            return list(self._devices.values())
+
+    def get(self, address):
+        """Get the cached record for an address (None if unknown)."""
+        with self._lock:
+            return self._devices.get(address)
@@ -0,0 +1,126 @@
+"""Per-device Bluetooth reconnect history used to plan wake reconnects."""
+import copy
+import statistics
+import threading
+import time
+from bluetooth_manager import DEFAULT_CONNECT_TIMEOUT
+from state import state
+
+HISTORY = 20  # Outcomes/latencies remembered per device
+MIN_SAMPLES = 3  # Samples needed before timeouts are tuned
+MIN_TIMEOUT = 2  # Never shorten a connect timeout below this (seconds)
+LATENCY_MARGIN = 3  # Timeout = median latency * margin + 1s
+FAILURE_THRESHOLD = 3  # Consecutive failures before a device is skipped
+MAX_SKIP_WAKES = 16  # Longest a failing device is skipped, in wakes
+
+
+class DeviceStats:
+    """
+    Tracks reconnect success rate, median latency and last-seen time per device.
+
+    Devices that keep failing trip a circuit breaker: they are skipped for a
+    number of wakes that doubles on each further failure, then tried once
+    again (a success closes the breaker).
+    """
+
+    def __init__(self, store=state):
+        self.store = store
+        self._lock = threading.Lock()
+        self.devices = store.get('device_stats') or {}
+
+    def _entry(self, address):
+        """Get or create the stats entry for a device."""
+        return self.devices.setdefault(address, {
+            'outcomes': [],
+            'latencies': [],
+            'last_seen': None,
+            'failures': 0,
+            'skip': 0,
+            'penalty': 1,
+        })
+
+    def _save(self):
+        """Persist stats to the state file."""
+        with self._lock:
+            snapshot = copy.deepcopy(self.devices)
+        self.store.set('device_stats', snapshot)
+
+    def success_rate(self, address):
+        """Fraction of recent attempts that connected (None if never attempted)."""
+        outcomes = self.devices.get(address, {}).get('outcomes')
+        return sum(outcomes) / len(outcomes) if outcomes else None
+
+    def median_latency(self, address):
+        """Median connect latency of recent successes in seconds (None if unknown)."""
+        latencies = self.devices.get(address, {}).get('latencies')
+        return statistics.median(latencies) if latencies else None
+
+    def connect_timeout(self, address):
+        """Connect timeout for a device, shortened for devices that are reliably fast."""
+        latencies = self.devices.get(address, {}).get('latencies', [])
+        if len(latencies) < MIN_SAMPLES or (self.success_rate(address) or 0) < 0.8:
+            return DEFAULT_CONNECT_TIMEOUT
+        tuned = statistics.median(latencies) * LATENCY_MARGIN + 1
+        return max(MIN_TIMEOUT, min(DEFAULT_CONNECT_TIMEOUT, tuned))
+
+    def plan(self, devices):
+        """
+        Order devices and set per-device timeouts for a reconnect.
+
+        Intended as the `plan` callable of BluetoothManager.plan_results.
+        Most reliable, fastest devices come first; devices with an open
+        circuit breaker are marked to skip. Each call counts as one wake.
+        """
+        def sort_key(device):
+            address = device['address']
+            rate = self.success_rate(address)
+            latency = self.median_latency(address)
+            return (
+                -(rate if rate is not None else 0.5),  # Unknown devices in the middle
+                latency if latency is not None else DEFAULT_CONNECT_TIMEOUT,
+            )
+
+        planned = []
+        with self._lock:
+            for device in sorted(devices, key=sort_key):
+                entry = self._entry(device['address'])
+                skip = entry['skip'] > 0
+                if skip:
+                    entry['skip'] -= 1
+                planned.append(dict(
+                    device,
+                    timeout=self.connect_timeout(device['address']),
+                    skip=skip
+                ))
+        return planned
+
+    def record(self, report):
+        """Update stats from a reconnect report (see BluetoothManager.plan_results) and save."""
+        now = time.time()
+        with self._lock:
+            for result in report:
+                if result['outcome'] in ('skipped', 'cancelled'):
+                    continue
+                entry = self._entry(result['address'])
+                connected = result['outcome'] == 'connected'
+                entry['outcomes'] = (entry['outcomes'] + [1 if connected else 0])[-HISTORY:]
+                if connected:
+                    entry['latencies'] = (entry['latencies'] + [round(result['latency'], 3)])[-HISTORY:]
+                    entry['last_seen'] = now
+                    entry['failures'] = 0
+                    entry['penalty'] = 1
+                else:
+                    entry['failures'] += 1
+                    if entry['failures'] >= FAILURE_THRESHOLD:
+                        # Open the breaker, backing off further on each failed retry
+                        entry['skip'] = entry['penalty']
+                        entry['penalty'] = min(entry['penalty'] * 2, MAX_SKIP_WAKES)
+        self._save()
+
+    def mark_seen(self, addresses):
+        """Record that devices were seen connected (e.g. just before sleep)."""
+        now = time.time()
+        with self._lock:
+            for address in addresses:
+                self._entry(address)['last_seen'] = now
+        self._save()
@@ -0,0 +1,149 @@
+"""Cached discovery of the WiFi interface and helper tools."""
+import os
+import re
+import shutil
+import subprocess
+import threading
+from state import state
+
+DEFAULT_WIFI_INTERFACE = 'en0'  # Default WiFi interface on most Macs
+
+# macOS rewrites this file whenever network interfaces change
+NETWORK_INTERFACES_PLIST = '/Library/Preferences/SystemConfiguration/NetworkInterfaces.plist'
+
+# Extra locations checked after PATH (homebrew on Intel and Apple Silicon)
+TOOL_PATHS = {
+    'blueutil': ['/usr/local/bin/blueutil', '/opt/homebrew/bin/blueutil'],
+    'brew': ['/usr/local/bin/brew', '/opt/homebrew/bin/brew'],
+}
+
+# Optional blueutil flags whose support is detected from --help
+BLUEUTIL_CAPABILITIES = ['--connected', '--is-connected', '--wait-connect']
+
+_lock = threading.Lock()
+_cache = {}
+
+
+def _mtime(path):
+    """File modification time, or None if it doesn't exist."""
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        return None
+
+
+def _save(key, value):
+    """Store a discovery result in memory and in the state file."""
+    with _lock:
+        _cache[key] = value
+        persisted = dict(state.get('discovery') or {})
+        persisted[key] = value
+    state.set('discovery', persisted)
+
+
+def _cached(key, is_valid):
+    """Return a remembered result if it still passes validation."""
+    with _lock:
+        if key in _cache:
+            return _cache[key]
+    value = (state.get('discovery') or {}).get(key)
+    if value is not None and is_valid(value):
+        with _lock:
+            _cache[key] = value
+        return value
+    return None
+
+
+def detect_wifi_interface():
+    """Find the Wi-Fi device from networksetup's hardware port list (e.g. 'en1')."""
+    try:
+        result = subprocess.run(
+            ['networksetup', '-listallhardwareports'],
+            capture_output=True,
+            text=True,
+            check=True,
+            timeout=10
+        )
+        # Output blocks look like: "Hardware Port: Wi-Fi\nDevice: en0\n..."
+        match = re.search(
+            r'Hardware Port: (?:Wi-Fi|AirPort)\s*\nDevice: (\S+)', result.stdout
+        )
+        if match:
+            return match.group(1)
+    except (subprocess.CalledProcessError, subprocess.TimeoutExpired, FileNotFoundError):
+        pass
+    return None
+
+
+def get_wifi_interface():
+    """WiFi interface name, re-detected only when the interface list changed."""
+    entry = _cached(
+        'wifi_interface',
+        lambda value: value.get('mtime') == _mtime(NETWORK_INTERFACES_PLIST)
+    )
+    if entry:
+        return entry['device']
+
+    device = detect_wifi_interface()
+    if not device:
+        # Don't remember a failed detection
+        return DEFAULT_WIFI_INTERFACE
+    _save('wifi_interface', {'device': device, 'mtime': _mtime(NETWORK_INTERFACES_PLIST)})
+    return device
+
+
+def _detect_capabilities(name, path):
+    """Detect which optional flags a tool supports."""
+    if name != 'blueutil':
+        return []
+    try:
+        result = subprocess.run(
+            [path, '--help'],
+            capture_output=True,
+            text=True,
+            timeout=5
+        )
+    except (subprocess.TimeoutExpired, OSError):
+        return []
+    help_text = result.stdout + result.stderr
+    return [flag for flag in BLUEUTIL_CAPABILITIES if flag in help_text]
+
+
+def find_tool(name):
+    """
+    Resolve a helper tool.
+
+    Returns a dict with 'path' and 'capabilities', or None if the tool isn't
+    installed. A remembered path is reused while the binary's mtime is
+    unchanged; missing tools are looked up again on the next launch.
+    """
+    key = f'tool:{name}'
+    entry = _cached(key, lambda value: value.get('mtime') == _mtime(value.get('path', '')))
+    if entry:
+        return entry
+
+    found = shutil.which(name)
+    candidates = ([found] if found else []) + TOOL_PATHS.get(name, [])
+    path = next((p for p in candidates if os.path.exists(p)), None)
+    if not path:
+        return None
+
+    entry = {
+        'path': path,
+        'mtime': _mtime(path),
+        'capabilities': _detect_capabilities(name, path),
+    }
+    _save(key, entry)
+    return entry
+
+
+def has_capability(name, flag):
+    """Check if an installed tool supports an optional flag."""
+    tool = find_tool(name)
+    return bool(tool) and flag in tool['capabilities']
+
+
+def reset():
+    """Forget everything discovered in this process (e.g. after installing a tool)."""
+    with _lock:
+        _cache.clear()
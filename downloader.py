@@ -0,0 +1,203 @@
+"""
+Resumable, verified downloads of release archives.
+
+The archive is streamed to `<dest>.part` in fixed-size chunks and hashed
+as it is written, so memory use is bounded and the file is never read
+back for verification. A dropped connection is resumed with an HTTP Range
+request (guarded by If-Range so a changed file restarts from scratch);
+a partial file left by an earlier run is resumed the same way after its
+bytes are hashed once. The file only gets its final name once the
+SHA-256 matches the published one.
+"""
+import hashlib
+import http.client
+import logging
+import re
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+from metrics import metrics
+from state import state
+
+logger = logging.getLogger(__name__)
+
+DOWNLOAD_DIR = Path.home() / 'Downloads'
+CHUNK_SIZE = 64 * 1024
+MAX_ATTEMPTS = 5  # Consecutive failed attempts without progress before giving up
+RETRY_DELAY = 1  # Seconds, multiplied by the attempt number
+REQUEST_TIMEOUT = 15
+
+_CONTENT_RANGE = re.compile(r'bytes (?:(\d+)-\d+|\*)/(\d+|\*)')
+_SHA256 = re.compile(r'\b[0-9a-fA-F]{64}\b')
+
+
+class DownloadError(Exception):
+    """Raised when a download can't be completed or fails verification."""
+
+
+def fetch_published_sha256(url, filename=None, timeout=REQUEST_TIMEOUT):
+    """
+    Read a SHA-256 from a published checksum file (`sha256sum` format).
+
+    With several entries, the one for `filename` is used.
+    """
+    req = urllib.request.Request(url, headers={'User-Agent': 'SleepWatch'})
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as response:
+            text = response.read(64 * 1024).decode(errors='replace')
+    except (OSError, http.client.HTTPException) as e:
+        raise DownloadError(f"Could not fetch checksum: {e}") from e
+    for line in text.splitlines():
+        match = _SHA256.search(line)
+        if match and (filename is None or line.rstrip().endswith(filename)):
+            return match.group(0).lower()
+    # A single bare digest doesn't name its file
+    match = _SHA256.search(text)
+    if not match:
+        raise DownloadError("Checksum file has no SHA-256")
+    return match.group(0).lower()
+
+
+class Download:
+    """
+    Download one file with resume and SHA-256 verification.
+
+    Args:
+        url: File URL
+        dest: Final path; data goes to `<dest>.part` until verified
+        sha256: Expected hex digest
+        on_progress: Optional callable(done_bytes, total_bytes or None)
+    """
+
+    def __init__(self, url, dest, sha256, on_progress=None, chunk_size=CHUNK_SIZE,
+                 attempts=MAX_ATTEMPTS, timeout=REQUEST_TIMEOUT):
+        self.url = url
+        self.dest = Path(dest)
+        self.part = self.dest.with_name(self.dest.name + '.part')
+        self.sha256 = sha256.lower()
+        self.on_progress = on_progress
+        self.chunk_size = chunk_size
+        self.attempts = attempts
+        self.timeout = timeout
+        self.done = 0
+        self.total = None
+        self._hasher = hashlib.sha256()
+        self._validators = {}  # ETag/Last-Modified of the file being resumed
+
+    def run(self):
+        """Download and verify; returns the final path. Raises DownloadError."""
+        with metrics.timer('update.download'):
+            self._resume_partial()
+            failures = 0
+            while True:
+                before = self.done
+                try:
+                    self._fetch()
+                    break
+                except (OSError, http.client.HTTPException) as e:
+                    # Progress resets the count: only a stuck download gives up
+                    failures = 1 if self.done > before else failures + 1
+                    if failures >= self.attempts:
+                        raise DownloadError(f"Download failed: {e}") from e
+                    metrics.increment('update.download.retries')
+                    logger.warning("Download interrupted at %d bytes (%s), retrying", self.done, e)
+                    time.sleep(RETRY_DELAY * failures)
+            return self._finish()
+
+    def _resume_partial(self):
+        """Pick up a partial file from an earlier run of the same URL."""
+        saved = state.get('update_download') or {}
+        if saved.get('url') != self.url or not self.part.exists():
+            self._restart()
+            return
+        self._validators = saved.get('validators', {})
+        with open(self.part, 'rb') as f:
+            for chunk in iter(lambda: f.read(self.chunk_size), b''):
+                self._hasher.update(chunk)
+                self.done += len(chunk)
+        logger.info("Resuming download of %s at %d bytes", self.url, self.done)
+
+    def _restart(self):
+        """Throw away partial data and start from byte 0."""
+        self.part.unlink(missing_ok=True)
+        self.done = 0
+        self._hasher = hashlib.sha256()
+        self._validators = {}
+        state.set('update_download', {'url': self.url})
+
+    def _request(self):
+        headers = {'User-Agent': 'SleepWatch'}
+        if self.done:
+            headers['Range'] = f'bytes={self.done}-'
+            validator = self._validators.get('etag') or self._validators.get('last_modified')
+            if validator:
+                headers['If-Range'] = validator
+        return urllib.request.Request(self.url, headers=headers)
+
+    def _fetch(self):
+        """One request, appending to the partial file from the current offset."""
+        try:
+            response = urllib.request.urlopen(self._request(), timeout=self.timeout)
+        except urllib.error.HTTPError as e:
+            if e.code == 416 and self.done:
+                # Nothing left past our offset: complete if the sizes agree
+                match = _CONTENT_RANGE.match(e.headers.get('Content-Range') or '')
+                if match and match.group(2) == str(self.done):
+                    self.total = self.done
+                    return
+                self._restart()
+            if e.code < 500 and e.code not in (408, 416, 429):
+                raise DownloadError(f"Download failed: HTTP {e.code}") from e
+            raise
+
+        with response:
+            if response.status == 206:
+                match = _CONTENT_RANGE.match(response.headers.get('Content-Range') or '')
+                if not match or match.group(1) is None or int(match.group(1)) != self.done:
+                    self._restart()
+                    raise ConnectionError("Unexpected Content-Range")
+                self.total = int(match.group(2)) if match.group(2) != '*' else None
+                metrics.increment('update.download.resumes')
+            else:
+                # Full body: the server ignored the range or the file changed
+                if self.done:
+                    logger.info("Server sent the whole file, restarting download")
+                    self._restart()
+                length = response.headers.get('Content-Length')
+                self.total = int(length) if length and length.isdigit() else None
+
+            validators = {
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+            }
+            if validators != self._validators:
+                self._validators = validators
+                state.set('update_download', {'url': self.url, 'validators': validators})
+
+            with open(self.part, 'ab') as f:
+                while True:
+                    chunk = response.read(self.chunk_size)
+                    if not chunk:
+                        break
+                    f.write(chunk)
+                    self._hasher.update(chunk)
+                    self.done += len(chunk)
+                    if self.on_progress:
+                        self.on_progress(self.done, self.total)
+
+        if self.total is not None and self.done < self.total:
+            # http.client returns a short body instead of raising when the peer closes
+            raise ConnectionError(f"Connection closed at {self.done} of {self.total} bytes")
+
+    def _finish(self):
+        """Verify the digest and move the file into place."""
+        digest = self._hasher.hexdigest()
+        state.set('update_download', None)
+        if digest != self.sha256:
+            self.part.unlink(missing_ok=True)
+            metrics.increment('update.download.hash_mismatches')
+            raise DownloadError(f"SHA-256 mismatch: expected {self.sha256}, got {digest}")
+        self.part.replace(self.dest)
+        logger.info("Downloaded and verified %s (%d bytes)", self.dest, self.done)
+        return self.dest
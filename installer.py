@@ -0,0 +1,113 @@
+"""
+blueutil/Homebrew install flows.
+
+Imported only when blueutil is missing, so it stays off the startup path.
+"""
+import logging
+import os
+import subprocess
+import sys
+import time
+import rumps
+from bluetooth_manager import BluetoothManager
+
+logger = logging.getLogger(__name__)
+
+
+def prompt_install_on_launch():
+    """Offer to install blueutil at launch, restarting the app when done."""
+    # Show dialog asking user to install
+    response = rumps.alert(
+        "blueutil Required",
+        "SleepWatch needs blueutil for Bluetooth features.\n\n"
+        "Terminal will open to install it via Homebrew.\n"
+        "This may take a few minutes.\n\n"
+        "The app will start after installation completes.",
+        ok="Install Now",
+        cancel="Skip (Limited Features)"
+    )
+
+    if response == 1:  # Install clicked
+        # Get app path for restart (check if running from app bundle)
+        if getattr(sys, 'frozen', False):
+            # Running from py2app bundle
+            app_path = os.path.abspath(os.path.join(os.path.dirname(sys.executable), '..', '..'))
+        elif os.path.exists('/Applications/SleepWatch.app'):
+            app_path = '/Applications/SleepWatch.app'
+        else:
+            app_path = '/Applications/SleepWatch.app'  # Default fallback
+
+        # Open Terminal with install command that restarts the app
+        if not BluetoothManager.is_brew_installed():
+            script = f'''
+tell application "Terminal"
+    activate
+    set currentTab to do script "echo 'Installing Homebrew...' && /bin/bash -c \\"$(curl -fsSL https://raw.githubusercontent.com/Homebrew/install/HEAD/install.sh)\\" && echo '\\nInstalling blueutil...' && brew install blueutil && echo '\\nInstallation complete! Restarting SleepWatch...' && sleep 1 && open '{app_path}' && exit"
+end tell
+'''
+        else:
+            script = f'''
+tell application "Terminal"
+    activate
+    set currentTab to do script "echo 'Installing blueutil...' && brew install blueutil && echo '\\nInstallation complete! Restarting SleepWatch...' && sleep 1 && open '{app_path}' && exit"
+end tell
+'''
+        try:
+            subprocess.run(['osascript', '-e', script], check=True)
+            # Quit this instance since we're restarting
+            time.sleep(2)  # Give Terminal time to start
+            rumps.quit_application()
+        except Exception as e:
+            logger.error("Error opening Terminal: %s", e)
+
+
+def install_blueutil():
+    """Install blueutil using Homebrew."""
+    # Check if Homebrew is installed first
+    if not BluetoothManager.is_brew_installed():
+        response = rumps.alert(
+            "Homebrew Required",
+            "blueutil requires Homebrew to install.\n\n"
+            "Terminal will open to install Homebrew first, then blueutil.\n\n"
+            "This may take a few minutes.",
+            ok="Install",
+            cancel="Cancel"
+        )
+        if response != 1:
+            return
+
+        # Open Terminal to install Homebrew first, then blueutil
+        script = '''
+tell application "Terminal"
+    activate
+    do script "echo 'Installing Homebrew...' && /bin/bash -c \\"$(curl -fsSL https://raw.githubusercontent.com/Homebrew/install/HEAD/install.sh)\\" && echo '\\nInstalling blueutil...' && brew install blueutil && echo '\\nInstallation complete! You can close this window.' && exit"
+end tell
+'''
+    else:
+        # Just install blueutil
+        response = rumps.alert(
+            "Install blueutil",
+            "Terminal will open to install blueutil.\n\n"
+            "The window will close automatically when done.",
+            ok="Install",
+            cancel="Cancel"
+        )
+        if response != 1:
+            return
+
+        script = '''
+tell application "Terminal"
+    activate
+    do script "echo 'Installing blueutil...' && brew install blueutil && echo '\\nInstallation complete! You can close this window.' && exit"
+end tell
+'''
+
+    try:
+        subprocess.run(['osascript', '-e', script], check=True)
+        rumps.notification(
+            "Installing blueutil",
+            "Terminal is open",
+            "Please wait for installation to complete, then restart SleepWatch."
+        )
+    except Exception as e:
+        rumps.alert("Error", f"Failed to open Terminal:\n{e}")
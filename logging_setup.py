@@ -0,0 +1,171 @@
+"""
+Logging for SleepWatch.
+
+Callers only put records on an in-memory queue (QueueHandler), so logging
+never blocks the sleep/wake paths. A listener thread then delivers them
+to the local syslog in batches, to a size-rotated JSON-lines file and to
+a ring buffer of recent events that the menu can show.
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+
+LOG_DIR = Path.home() / 'Library' / 'Logs' / 'SleepWatch'
+LOG_FILE = LOG_DIR / 'sleepwatch.jsonl'
+LOG_FILE_MAX_BYTES = 1024 * 1024  # Rotate the JSONL file at this size
+LOG_FILE_BACKUPS = 3
+SYSLOG_SOCKETS = ('/var/run/syslog', '/dev/log')  # macOS, Linux
+SYSLOG_BATCH_SIZE = 50  # Records buffered before syslog delivery
+SYSLOG_BATCH_INTERVAL = 2  # Seconds a record may wait for its batch
+RECENT_EVENTS = 200  # Records kept in memory for the menu
+
+_listener = None
+_recent = None
+
+
+class JSONFormatter(logging.Formatter):
+    """Formats a record as one JSON object per line."""
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry)
+
+
+class BatchingHandler(logging.handlers.MemoryHandler):
+    """
+    Buffers records and hands them to the target in batches.
+
+    A batch is delivered when it is full, when it is older than `interval`
+    seconds, or right away for errors.
+    """
+
+    def __init__(self, target, capacity=SYSLOG_BATCH_SIZE, interval=SYSLOG_BATCH_INTERVAL):
+        super().__init__(capacity, flushLevel=logging.ERROR, target=target, flushOnClose=True)
+        self.interval = interval
+        self._first_buffered = None
+        self._timer = None
+
+    def shouldFlush(self, record):
+        # Called with the handler lock held, after the record is buffered
+        if self._first_buffered is None:
+            self._first_buffered = time.monotonic()
+            # Deliver a batch that stays partial once it is `interval` old
+            self._timer = threading.Timer(self.interval, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+        return (super().shouldFlush(record)
+                or time.monotonic() - self._first_buffered >= self.interval)
+
+    def flush(self):
+        with self.lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            super().flush()
+            self._first_buffered = None
+
+
+class RingBufferHandler(logging.Handler):
+    """Keeps the most recent formatted records in memory."""
+
+    def __init__(self, capacity=RECENT_EVENTS):
+        super().__init__()
+        self.lines = deque(maxlen=capacity)
+
+    def emit(self, record):
+        self.lines.append(self.format(record))
+
+
+def _syslog_handler():
+    """Handler for the local syslog socket, or None if there is none."""
+    for address in SYSLOG_SOCKETS:
+        if os.path.exists(address):
+            try:
+                handler = logging.handlers.SysLogHandler(address=address)
+            except OSError:
+                continue
+            handler.ident = 'SleepWatch: '
+            return BatchingHandler(handler)
+    return None
+
+
+def setup_logging(level=logging.INFO, log_file=LOG_FILE):
+    """
+    Route all logging through the queue and start the listener thread.
+
+    Safe to call more than once; later calls do nothing.
+    """
+    global _listener, _recent
+    if _listener is not None:
+        return
+
+    handlers = []
+    file_error = None
+
+    console = logging.StreamHandler(sys.stdout)
+    console.setFormatter(logging.Formatter('[SleepWatch] %(message)s'))
+    handlers.append(console)
+
+    try:
+        Path(log_file).parent.mkdir(parents=True, exist_ok=True)
+        file_handler = logging.handlers.RotatingFileHandler(
+            log_file, maxBytes=LOG_FILE_MAX_BYTES, backupCount=LOG_FILE_BACKUPS
+        )
+        file_handler.setFormatter(JSONFormatter())
+        handlers.append(file_handler)
+    except OSError as e:
+        file_error = e
+
+    syslog = _syslog_handler()
+    if syslog:
+        handlers.append(syslog)
+
+    _recent = RingBufferHandler()
+    _recent.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(message)s', '%H:%M:%S'))
+    handlers.append(_recent)
+
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+    if file_error:
+        logging.getLogger(__name__).warning("Log file disabled: %s", file_error)
+
+
+def shutdown_logging():
+    """Deliver queued records and stop the listener thread."""
+    global _listener
+    if _listener is None:
+        return
+    _listener.stop()
+    for handler in _listener.handlers:
+        handler.flush()
+    _listener = None
+
+
+def recent_events():
+    """Recent log lines, oldest first (empty before setup_logging)."""
+    if _recent is None:
+        return []
+    return list(_recent.lines)
@@ -0,0 +1,227 @@
+"""
+Latency histograms, counters and process stats for SleepWatch.
+
+Every radio operation and transition phase is timed into a rolling
+window per metric name; snapshot() reports p50/p95/p99 for each along
+with the counters and the process's own memory and CPU use. The snapshot
+is written to a JSON file and can also be served on localhost.
+"""
+import asyncio
+import functools
+import json
+import logging
+import math
+import os
+import resource
+import sys
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from pathlib import Path
+from write_behind import atomic_write_json
+
+logger = logging.getLogger(__name__)
+
+METRICS_FILE = Path.home() / '.sleepwatch_metrics.json'
+HISTORY = 500  # Samples kept per histogram
+DEFAULT_EXPORT_INTERVAL = 60  # Seconds between snapshot file writes
+PERCENTILES = (50, 95, 99)
+
+
+def _percentile(ordered, percent):
+    """Nearest-rank percentile of an already sorted list."""
+    index = max(0, math.ceil(percent / 100 * len(ordered)) - 1)
+    return ordered[index]
+
+
+class Metrics:
+    """Thread-safe registry of rolling latency histograms and counters."""
+
+    def __init__(self, history=HISTORY):
+        self._lock = threading.Lock()
+        self._histograms = defaultdict(lambda: deque(maxlen=history))
+        self._counters = defaultdict(int)
+        self._started = time.time()
+        self._last_cpu = None  # (wall, cpu) at the previous snapshot
+
+    def observe(self, name, seconds):
+        """Add a duration sample to a histogram."""
+        with self._lock:
+            self._histograms[name].append(seconds)
+
+    def increment(self, name, amount=1):
+        """Add to a counter."""
+        with self._lock:
+            self._counters[name] += amount
+
+    @contextmanager
+    def timer(self, name):
+        """Time the enclosed block; exceptions count as `<name>.errors`."""
+        start = time.monotonic()
+        try:
+            yield
+        except Exception:
+            self.increment(f'{name}.errors')
+            raise
+        finally:
+            self.observe(name, time.monotonic() - start)
+
+    def timed(self, name, failed=None):
+        """
+        Decorator timing every call of a function or coroutine function.
+
+        Args:
+            name: Histogram name
+            failed: Optional callable(result) -> bool; True counts as `<name>.failures`
+        """
+        def decorate(func):
+            if asyncio.iscoroutinefunction(func):
+                @functools.wraps(func)
+                async def wrapper(*args, **kwargs):
+                    with self.timer(name):
+                        result = await func(*args, **kwargs)
+                    if failed and failed(result):
+                        self.increment(f'{name}.failures')
+                    return result
+            else:
+                @functools.wraps(func)
+                def wrapper(*args, **kwargs):
+                    with self.timer(name):
+                        result = func(*args, **kwargs)
+                    if failed and failed(result):
+                        self.increment(f'{name}.failures')
+                    return result
+            return wrapper
+        return decorate
+
+    def _process_stats(self):
+        """RSS and CPU use of this process."""
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        cpu = usage.ru_utime + usage.ru_stime
+        now = time.monotonic()
+        cpu_percent = None
+        if self._last_cpu:
+            wall = now - self._last_cpu[0]
+            if wall > 0:
+                cpu_percent = round(100 * (cpu - self._last_cpu[1]) / wall, 1)
+        self._last_cpu = (now, cpu)
+
+        # ru_maxrss is bytes on macOS and kilobytes on Linux
+        max_rss = usage.ru_maxrss if sys.platform == 'darwin' else usage.ru_maxrss * 1024
+        stats = {'max_rss_bytes': max_rss, 'cpu_seconds': round(cpu, 3), 'cpu_percent': cpu_percent}
+        try:
+            # Current RSS where procfs exists (not on macOS)
+            with open('/proc/self/statm') as f:
+                stats['rss_bytes'] = int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+        except (OSError, ValueError, IndexError):
+            stats['rss_bytes'] = None
+        return stats
+
+    def snapshot(self):
+        """All metrics as a JSON-serializable dict."""
+        with self._lock:
+            histograms = {name: sorted(samples) for name, samples in self._histograms.items() if samples}
+            counters = dict(self._counters)
+            process = self._process_stats()
+
+        summaries = {}
+        for name, ordered in sorted(histograms.items()):
+            summary = {'count': len(ordered), 'max': round(ordered[-1], 4)}
+            for percent in PERCENTILES:
+                summary[f'p{percent}'] = round(_percentile(ordered, percent), 4)
+            summaries[name] = summary
+
+        return {
+            'time': time.time(),
+            'uptime': round(time.time() - self._started, 1),
+            'histograms': summaries,
+            'counters': dict(sorted(counters.items())),
+            'process': process,
+        }
+
+    def write_snapshot(self, path=METRICS_FILE):
+        """Write the snapshot to a JSON file atomically."""
+        try:
+            atomic_write_json(path, self.snapshot(), indent=2)
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning("Failed to write metrics to %s: %s", path, e)
+
+
+class MetricsExporter:
+    """
+    Writes the metrics snapshot file periodically and, if a port is given,
+    serves the snapshot as JSON on http://127.0.0.1:<port>/metrics.
+    """
+
+    def __init__(self, registry, interval=DEFAULT_EXPORT_INTERVAL, port=None, path=METRICS_FILE):
+        self.registry = registry
+        self.interval = interval
+        self.port = port
+        self.path = path
+        self._stopped = threading.Event()
+        self._wakeup = threading.Event()
+        self._server = None
+
+    def start(self):
+        """Start the file writer thread and the optional HTTP endpoint."""
+        self._stopped.clear()
+        threading.Thread(target=self._run, name='metrics', daemon=True).start()
+        if self.port:
+            self._start_server()
+
+    def write_soon(self):
+        """Write the snapshot now on the writer thread (e.g. after a transition)."""
+        self._wakeup.set()
+
+    def _run(self):
+        """Write the snapshot every interval or when asked, until stopped."""
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            if self._stopped.is_set():
+                break
+            self.registry.write_snapshot(self.path)
+
+    def _start_server(self):
+        """Serve snapshots on localhost only."""
+        # Imported here so the HTTP stack is only loaded when the endpoint is enabled
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        registry = self.registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.rstrip('/') not in ('', '/metrics'):
+                    self.send_error(404)
+                    return
+                body = json.dumps(registry.snapshot()).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logger.debug("metrics endpoint: " + format, *args)
+
+        try:
+            self._server = ThreadingHTTPServer(('127.0.0.1', self.port), Handler)
+        except OSError as e:
+            logger.warning("Metrics endpoint disabled, port %s unavailable: %s", self.port, e)
+            return
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name='metrics-http', daemon=True).start()
+        logger.info("Serving metrics on http://127.0.0.1:%s/metrics", self.port)
+
+    def stop(self):
+        """Stop exporting and write a final snapshot."""
+        self._stopped.set()
+        self._wakeup.set()
+        if self._server:
+            self._server.shutdown()
+            self._server = None
+        self.registry.write_snapshot(self.path)
+
+
+# Shared registry for the whole app
+metrics = Metrics()
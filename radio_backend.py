@@ -0,0 +1,140 @@
+"""
+Radio backends: the WiFi/Bluetooth operations sleep/wake handling needs.
+
+RadioBackend is the interface; MacRadioBackend runs the real
+networksetup/blueutil operations and simulator.SimulatedRadios models
+them in-process. All operations are coroutines so one event loop can
+drive both radios at once, and sleep/wake handling (see transitions)
+runs unchanged on either.
+"""
+import asyncio
+from abc import ABC, abstractmethod
+from bluetooth_manager import BluetoothManager, BluetoothError
+from wifi_manager import WiFiManager
+
+
+class RadioBackend(ABC):
+    """Interface of a radio backend. Every method is a coroutine."""
+
+    @abstractmethod
+    async def power_state(self):
+        """(wifi_on, bluetooth_on)."""
+
+    @abstractmethod
+    async def set_wifi_power(self, on):
+        """Power WiFi on or off. Returns True on success."""
+
+    @abstractmethod
+    async def wifi_ready(self):
+        """True once WiFi is powered on and its interface is up."""
+
+    @abstractmethod
+    async def current_network(self):
+        """SSID of the joined network, or None."""
+
+    @abstractmethod
+    async def preferred_networks(self):
+        """Saved networks in the system's preferred order."""
+
+    @abstractmethod
+    async def join_network(self, ssid, timeout):
+        """Explicitly join a network. Returns True on success."""
+
+    @abstractmethod
+    async def set_bluetooth_power(self, on):
+        """Power Bluetooth on or off. Returns True on success."""
+
+    @abstractmethod
+    async def bluetooth_ready(self):
+        """True once the Bluetooth controller reports power on."""
+
+    @abstractmethod
+    async def paired_devices(self):
+        """Paired devices as dicts with 'address' and 'name'."""
+
+    @abstractmethod
+    async def connected_devices(self):
+        """Connected devices as dicts with 'address' and 'name'."""
+
+    @abstractmethod
+    async def connect_device(self, address, timeout):
+        """Connect one device. Returns True if it is connected."""
+
+    async def connect_lane(self, results, deadline):
+        """
+        Connect a lane of reconnect results (see BluetoothManager.plan_results)
+        one after another until the loop-clock deadline, filling in each
+        'outcome' and 'latency'. Devices not reached stay 'skipped'; on
+        cancellation the rest of the lane is marked 'cancelled'.
+        """
+        loop = asyncio.get_running_loop()
+        pending = list(results)
+        try:
+            while pending and loop.time() < deadline:
+                result = pending[0]
+                started = loop.time()
+                timeout = min(result['timeout'], deadline - started)
+                connected = await self.connect_device(result['address'], timeout)
+                pending.pop(0)
+                result['latency'] = loop.time() - started
+                if connected:
+                    result['outcome'] = 'connected'
+                else:
+                    result['outcome'] = 'timeout' if result['latency'] >= timeout else 'failed'
+        except asyncio.CancelledError:
+            for result in pending:
+                result['outcome'] = 'cancelled'
+            raise
+
+
+class MacRadioBackend(RadioBackend):
+    """The real radios, through WiFiManager and BluetoothManager."""
+
+    async def power_state(self):
+        try:
+            bluetooth = await BluetoothManager.get_power_state_async()
+        except BluetoothError:
+            bluetooth = None
+        return await WiFiManager.get_power_state_async(), bluetooth
+
+    async def set_wifi_power(self, on):
+        return await WiFiManager.set_power_async(on)
+
+    async def wifi_ready(self):
+        return await WiFiManager._is_ready_async()
+
+    async def current_network(self):
+        return await WiFiManager.get_current_network_async()
+
+    async def preferred_networks(self):
+        return await WiFiManager.get_preferred_networks_async()
+
+    async def join_network(self, ssid, timeout):
+        return await WiFiManager.connect_to_network_async(ssid, timeout=timeout)
+
+    async def set_bluetooth_power(self, on):
+        return await BluetoothManager.set_power_async(on)
+
+    async def bluetooth_ready(self):
+        return await BluetoothManager._is_ready_async()
+
+    async def paired_devices(self):
+        try:
+            devices = await BluetoothManager.get_paired_devices_async()
+        except BluetoothError:
+            return []
+        return [{'address': d.get('address'), 'name': d.get('name')} for d in devices]
+
+    async def connected_devices(self):
+        try:
+            devices = await BluetoothManager.get_connected_devices_async()
+        except BluetoothError:
+            return []
+        return [{'address': d.get('address'), 'name': d.get('name')} for d in devices]
+
+    async def connect_device(self, address, timeout):
+        return await BluetoothManager.connect_device_async(address, timeout=timeout)
+
+    async def connect_lane(self, results, deadline):
+        # Connects and verifies each device in one blueutil invocation
+        await BluetoothManager.run_lane_async(results, deadline)
@@ -0,0 +1,128 @@
+"""Wait for radio hardware to become ready instead of sleeping a fixed time."""
+import asyncio
+import logging
+import statistics
+import threading
+import time
+from metrics import metrics
+from state import state
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIMEOUT = 10  # Seconds before giving up on a radio
+MIN_INTERVAL = 0.05  # First poll interval
+MAX_INTERVAL = 1.0  # Poll interval cap
+BACKOFF = 1.5  # Poll interval growth per attempt
+HISTORY = 20  # Ready times remembered per radio
+
+_lock = threading.Lock()  # WiFi and Bluetooth waits can finish at the same time
+
+
+def typical_ready_time(name, store=state):
+    """Median time-to-ready learned for a radio on this machine (None if unknown)."""
+    samples = (store.get('readiness') or {}).get(name, {}).get('samples', [])
+    return statistics.median(samples) if samples else None
+
+
+def _record(name, elapsed, ready, store):
+    """Remember how long a wait took."""
+    with _lock:
+        readiness = store.get('readiness') or {}
+        entry = readiness.setdefault(name, {'samples': [], 'timeouts': 0})
+        if ready:
+            entry['samples'] = (entry['samples'] + [round(elapsed, 3)])[-HISTORY:]
+        else:
+            entry['timeouts'] += 1
+        entry['last'] = round(elapsed, 3)
+        store.set('readiness', readiness)
+
+
+def _sleep(seconds, cancel):
+    """Sleep, returning early (True) if the cancel event is set."""
+    if cancel:
+        return cancel.wait(max(0, seconds))
+    time.sleep(max(0, seconds))
+    return False
+
+
+def _poll_delays(name, store):
+    """
+    Delays between probes.
+
+    The first check is immediate. If the radio isn't ready yet, the next
+    check is held back until shortly before the learned typical
+    time-to-ready, then polling continues with a growing interval.
+    """
+    typical = typical_ready_time(name, store)
+    yield typical * 0.8 if typical else MIN_INTERVAL
+    interval = MIN_INTERVAL
+    while True:
+        yield interval
+        interval = min(interval * BACKOFF, MAX_INTERVAL)
+
+
+def _finish(name, elapsed, ready, store):
+    """Record and report a completed wait."""
+    _record(name, elapsed, ready, store)
+    metrics.observe(f'{name}.ready', elapsed)
+    if not ready:
+        metrics.increment(f'{name}.ready.timeouts')
+    logger.info("%s ready: %s after %.2fs", name, ready, elapsed)
+    return ready, elapsed
+
+
+def wait_until_ready(name, probe, timeout=DEFAULT_TIMEOUT, cancel=None, store=state):
+    """
+    Poll probe() with adaptive backoff until it returns True or the timeout passes.
+
+    Args:
+        name: Radio name used to learn timings ('wifi', 'bluetooth')
+        probe: Callable returning True once the hardware is ready
+        timeout: Seconds to wait before giving up
+        cancel: Optional threading.Event that stops waiting early
+        store: StateStore the learned timings are kept in
+
+    Returns:
+        (ready, elapsed) - whether the probe succeeded and seconds waited
+    """
+    start = time.monotonic()
+    deadline = start + timeout
+    delays = _poll_delays(name, store)
+
+    if probe():
+        # Already ready: says nothing about how long power-on takes
+        return True, time.monotonic() - start
+    ready = False
+    while not ready:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        if _sleep(min(next(delays), remaining), cancel):
+            # Cancelled waits say nothing about the hardware, so don't learn from them
+            return False, time.monotonic() - start
+        ready = bool(probe())
+
+    return _finish(name, time.monotonic() - start, ready, store)
+
+
+async def wait_until_ready_async(name, probe, timeout=DEFAULT_TIMEOUT, store=state):
+    """
+    Async variant of wait_until_ready; probe is a coroutine function.
+    Cancel the calling task to stop waiting early.
+    """
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    deadline = start + timeout
+    delays = _poll_delays(name, store)
+
+    if await probe():
+        return True, loop.time() - start
+    ready = False
+    while not ready:
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            break
+        await asyncio.sleep(min(next(delays), remaining))
+        ready = bool(await probe())
+
+    return _finish(name, loop.time() - start, ready, store)
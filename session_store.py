@@ -0,0 +1,312 @@
+"""
+Persistent history of sleep/wake transitions.
+
+Every transition is one JSON line appended to ~/.sleepwatch_history/log.jsonl.
+Two kinds of index make queries cheap without reading the log:
+
+- time.idx: (time, log offset) for every record, in time order
+- devices/<address>.idx: the same, for records that mention a device
+
+Index entries are fixed size, so a time range is found by binary search
+on the file and only the matching log lines are read. Indexes are
+derived data: a crash between writing a log line and its index entries
+is repaired on the next open, and missing indexes are rebuilt from the
+log. Compaction rewrites the log without expired or damaged records and
+rebuilds the indexes; it runs every COMPACT_EVERY appends and on open
+when the oldest record has expired.
+"""
+import json
+import logging
+import os
+import shutil
+import struct
+import threading
+import time
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+HISTORY_DIR = Path.home() / '.sleepwatch_history'
+ENTRY = struct.Struct('<dQ')  # Record time, byte offset in the log
+DEFAULT_RETENTION = 5 * 365 * 24 * 60 * 60  # Seconds of history kept by compaction
+COMPACT_EVERY = 1000  # Appends between compactions
+
+
+def _device_key(address):
+    """Index file name for a device address."""
+    return address.replace(':', '').replace('-', '').lower()
+
+
+def _addresses(record):
+    """Device addresses a record mentions."""
+    devices = record.get('devices')
+    if not isinstance(devices, list):
+        return set()
+    return {d['address'] for d in devices if isinstance(d, dict) and d.get('address')}
+
+
+def _record_time(record):
+    """A parsed record's time, or None if it has no usable one."""
+    when = record.get('time') if isinstance(record, dict) else None
+    if isinstance(when, bool) or not isinstance(when, (int, float)):
+        return None
+    return when
+
+
+class _Index:
+    """A file of ENTRY records sorted by time."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def _count(self, f):
+        return os.fstat(f.fileno()).st_size // ENTRY.size
+
+    def _entry(self, f, i):
+        f.seek(i * ENTRY.size)
+        return ENTRY.unpack(f.read(ENTRY.size))
+
+    def append(self, when, offset):
+        with open(self.path, 'ab') as f:
+            f.write(ENTRY.pack(when, offset))
+
+    def last(self):
+        """The newest entry, or None."""
+        try:
+            with open(self.path, 'rb') as f:
+                count = self._count(f)
+                return self._entry(f, count - 1) if count else None
+        except FileNotFoundError:
+            return None
+
+    def repair(self):
+        """Drop a torn trailing entry."""
+        try:
+            size = self.path.stat().st_size
+        except FileNotFoundError:
+            return
+        if size % ENTRY.size:
+            with open(self.path, 'r+b') as f:
+                f.truncate(size - size % ENTRY.size)
+
+    def offsets(self, since=None, until=None):
+        """Log offsets of records with since <= time < until, oldest first."""
+        try:
+            f = open(self.path, 'rb')
+        except FileNotFoundError:
+            return
+        with f:
+            count = self._count(f)
+            # Binary search for the first entry at or after `since`
+            lo, hi = 0, count
+            if since is not None:
+                while lo < hi:
+                    mid = (lo + hi) // 2
+                    if self._entry(f, mid)[0] < since:
+                        lo = mid + 1
+                    else:
+                        hi = mid
+            f.seek(lo * ENTRY.size)
+            for when, offset in ENTRY.iter_unpack(f.read((count - lo) * ENTRY.size)):
+                if until is not None and when >= until:
+                    return
+                yield offset
+
+
+class SessionStore:
+    """
+    Append-only transition log with time and per-device indexes.
+
+    Records are dicts with at least 'time' (epoch seconds) and optionally
+    'devices' (list of dicts with 'address'). A record written late (a wake
+    whose reconnects finished after the next sleep) is indexed at the time
+    of the newest record before it, keeping the indexes sorted. Thread-safe.
+    """
+
+    def __init__(self, path=HISTORY_DIR, retention=DEFAULT_RETENTION, compact_every=COMPACT_EVERY):
+        self.path = Path(path)
+        self.retention = retention
+        self.compact_every = compact_every
+        self.log_path = self.path / 'log.jsonl'
+        self.devices_dir = self.path / 'devices'
+        self.time_index = _Index(self.path / 'time.idx')
+        self._lock = threading.RLock()
+        self._appends = 0
+        self._compacting = False
+        self._last_time = 0.0  # Newest indexed time
+        self._open()
+        # The append count restarts with the app, so retention is also checked here
+        if self._oldest_expired():
+            self._compact_soon()
+
+    def _oldest_expired(self):
+        """Whether the first record in the log is past the retention period."""
+        if not self.retention:
+            return False
+        with open(self.log_path, 'rb') as f:
+            line = f.readline()
+        try:
+            when = _record_time(json.loads(line))
+        except ValueError:
+            when = None
+        if when is None:
+            # Empty log, or a damaged first record that compaction drops
+            return bool(line)
+        return when < time.time() - self.retention
+
+    def _compact_soon(self):
+        """Start a compaction on a background thread unless one is running."""
+        with self._lock:
+            if self._compacting:
+                return
+            self._appends = 0
+            self._compacting = True
+        threading.Thread(target=self.compact, name='history-compact', daemon=True).start()
+
+    def _device_index(self, address):
+        return _Index(self.devices_dir / f'{_device_key(address)}.idx')
+
+    def _open(self):
+        """Create the store or bring its indexes up to date with the log."""
+        self.devices_dir.mkdir(parents=True, exist_ok=True)
+        self.log_path.touch(exist_ok=True)
+        if not self.time_index.path.exists():
+            self._rebuild_indexes()
+            return
+        self.time_index.repair()
+        for path in self.devices_dir.glob('*.idx'):
+            _Index(path).repair()
+        last = self.time_index.last()
+        if last:
+            self._last_time = last[0]
+        self._index_tail(last[1] if last else None)
+
+    def _index_tail(self, last_offset):
+        """Index log records after `last_offset` (None: the whole log); drop a torn last line."""
+        rebuilding = last_offset is None
+        with open(self.log_path, 'r+b') as f:
+            if last_offset is not None:
+                f.seek(last_offset)
+                f.readline()
+            while True:
+                offset = f.tell()
+                line = f.readline()
+                if not line:
+                    break
+                if not line.endswith(b'\n'):
+                    logger.warning("Dropping incomplete history record at %d", offset)
+                    f.truncate(offset)
+                    break
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if _record_time(record) is None:
+                    continue  # Not indexable; compaction drops it
+                when = self._last_time = max(record['time'], self._last_time)
+                for address in _addresses(record):
+                    index = self._device_index(address)
+                    # After a crash the device entries may already be there
+                    newest = None if rebuilding else index.last()
+                    if newest is None or newest[1] < offset:
+                        index.append(when, offset)
+                self.time_index.append(when, offset)
+
+    def _rebuild_indexes(self):
+        """Recreate every index from the log."""
+        logger.info("Rebuilding session history indexes")
+        self.time_index.path.unlink(missing_ok=True)
+        shutil.rmtree(self.devices_dir, ignore_errors=True)
+        self.devices_dir.mkdir(parents=True, exist_ok=True)
+        self._last_time = 0.0
+        self._index_tail(None)
+        self.time_index.path.touch()
+
+    def append(self, record):
+        """Store one transition record."""
+        line = (json.dumps(record, separators=(',', ':')) + '\n').encode()
+        with self._lock:
+            with open(self.log_path, 'ab') as f:
+                offset = f.tell()
+                f.write(line)
+            when = self._last_time = max(record['time'], self._last_time)
+            # The time index is written last: recovery resumes from its newest entry
+            for address in _addresses(record):
+                self._device_index(address).append(when, offset)
+            self.time_index.append(when, offset)
+            self._appends += 1
+            due = self.compact_every and self._appends >= self.compact_every
+        if due:
+            self._compact_soon()
+
+    def _read(self, offsets):
+        """Records at the given log offsets."""
+        with open(self.log_path, 'rb') as f:
+            for offset in offsets:
+                f.seek(offset)
+                try:
+                    yield json.loads(f.readline())
+                except ValueError:
+                    continue
+
+    def query(self, address=None, since=None, until=None):
+        """
+        Records in time order, optionally only those mentioning a device
+        and with since <= time < until. Only matching records are read.
+        """
+        with self._lock:
+            index = self._device_index(address) if address else self.time_index
+            # Materialize offsets under the lock so compaction can't move them mid-query
+            offsets = list(index.offsets(since, until))
+            return list(self._read(offsets))
+
+    def device_latencies(self, address, days=30, now=None):
+        """
+        Reconnect attempts for a device over the last `days` days.
+
+        Returns a list of (time, outcome, latency) from wake records, oldest first.
+        """
+        since = (now or time.time()) - days * 24 * 60 * 60
+        attempts = []
+        for record in self.query(address=address, since=since):
+            if record.get('event') != 'wake':
+                continue
+            for device in record.get('devices', []):
+                if device.get('address') == address:
+                    attempts.append((record['time'], device.get('outcome'), device.get('latency')))
+        return attempts
+
+    def compact(self):
+        """Rewrite the log without expired or unreadable records, then rebuild the indexes."""
+        try:
+            with self._lock:
+                cutoff = time.time() - self.retention if self.retention else None
+                tmp_path = self.log_path.with_name(self.log_path.name + '.compact')
+                kept = dropped = 0
+                # Streamed line by line into a new file; the log is never held in memory
+                with open(self.log_path, 'rb') as src, open(tmp_path, 'wb') as dst:
+                    for line in src:
+                        try:
+                            when = _record_time(json.loads(line))
+                        except ValueError:
+                            when = None
+                        expired = when is None or (cutoff is not None and when < cutoff)
+                        if expired or not line.endswith(b'\n'):
+                            dropped += 1
+                        else:
+                            dst.write(line)
+                            kept += 1
+                    dst.flush()
+                    os.fsync(dst.fileno())
+                if not dropped:
+                    tmp_path.unlink()
+                    return
+                # Without time.idx the next open rebuilds, so a crash below can't leave stale offsets
+                self.time_index.path.unlink(missing_ok=True)
+                os.replace(tmp_path, self.log_path)
+                self._rebuild_indexes()
+                logger.info("Compacted session history: dropped %d records, kept %d", dropped, kept)
+        except OSError as e:
+            logger.warning("Session history compaction failed: %s", e)
+        finally:
+            self._compacting = False
@@ -21,10 +21,34 @@ OPTIONS = {
     },
     'includes': [
         'rumps',
+        'async_subprocess',
+        'battery',
         'bluetooth_manager',
+        'blueutil_executor',
         'wifi_manager',
+        'wifi_rejoin',
         'sleep_watcher',
+        'sleep_pipeline',
+        'transition_scheduler',
+        'transitions',
         'config',
+        'state',
+        'write_behind',
+        'discovery',
+        'downloader',
+        'readiness',
+        'device_browser',
+        'device_menu',
+        'device_registry',
+        'device_stats',
+        'installer',
+        'logging_setup',
+        'metrics',
+        'radio_backend',
+        'session_store',
+        'simulator',
+        'startup_profiler',
+        'status_service',
         'version',
         'update_checker',
     ],
@@ -0,0 +1,467 @@
+"""
+Sleep/wake simulation under a virtual clock.
+
+Replays recorded or synthetic sleep/wake traces through the app's own
+transition handling (transitions.Transitions, with TransitionScheduler's
+TransitionQueue deciding what runs), against a radio backend (see
+radio_backend). With SimulatedRadios and the virtual clock, nothing waits
+on real time: the event loop jumps straight to the next timer, so hours
+of trace replay in milliseconds and thousands of cycles run per second.
+
+Only the dispatcher is the simulator's own: it runs transitions and their
+reconnects as tasks on one event loop where the app uses threads. Races
+the simulated radios observe show up as `race.*` counters:
+
+- race.radio_on_at_sleep: a radio was still on when the machine slept
+- race.connect_while_off: a connect was issued with Bluetooth off
+- race.power_off_during_connect: Bluetooth went off under an ongoing connect
+- race.stale_connect: a connect finished after Bluetooth was power-cycled under it
+"""
+import asyncio
+import json
+import logging
+import random
+import selectors
+import threading
+from collections import namedtuple
+from datetime import datetime
+from config import DEFAULT_CONFIG
+from device_stats import DeviceStats
+from metrics import Metrics
+from radio_backend import RadioBackend
+from state import StateStore
+from transition_scheduler import SLEEP, WAKE, TransitionQueue
+from transitions import Transitions
+from wifi_rejoin import WiFiRejoiner
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SLEEP_GRACE = 10  # Seconds between the sleep notification and the machine sleeping
+SETTLE_TIME = 120  # Seconds replayed after the last event so its transition can finish
+PAGE_TIMEOUT = 5  # Seconds a connect to an absent device takes to fail
+
+# Mean latencies in seconds; each operation draws from an exponential distribution
+DEFAULT_LATENCIES = {
+    'command': 0.03,  # One networksetup/blueutil invocation
+    'wifi_up': 0.5,  # WiFi power-on until the interface is up
+    'autojoin': 2.5,  # Interface up until macOS auto-joins the last network
+    'join': 2.0,  # Explicit network join
+    'bluetooth_ready': 1.0,  # Bluetooth power-on until the controller is ready
+}
+
+SimulatedDevice = namedtuple(
+    'SimulatedDevice', ['address', 'name', 'presence', 'connect_latency', 'failure_rate'],
+    defaults=(1.0, 1.5, 0.0)
+)
+SimulatedDevice.__doc__ = """
+A paired device: `presence` is the chance it is in range on a given wake,
+`connect_latency` the mean connect time and `failure_rate` the chance a
+connect to it fails.
+"""
+
+
+class VirtualClockLoop(asyncio.SelectorEventLoop):
+    """
+    Event loop with a virtual clock.
+
+    Whenever every task is waiting, time jumps to the next scheduled timer
+    instead of sleeping. There is no real I/O: nothing may wait on sockets,
+    subprocesses or threads on this loop.
+    """
+
+    def __init__(self):
+        self.now = 0.0
+        super().__init__(_VirtualSelector(self))
+        # Timers count as due within this much; it must stay above the float
+        # spacing of `now`, which reaches 1e-8 after a few years of trace
+        self._clock_resolution = 1e-6
+
+    def time(self):
+        return self.now
+
+
+class _VirtualSelector(selectors.DefaultSelector):
+    """Selector that advances the loop's virtual clock instead of blocking."""
+
+    def __init__(self, loop):
+        super().__init__()
+        self._loop = loop
+
+    def select(self, timeout=None):
+        if timeout is None:
+            # Nothing ready and no timers: every task waits for something that never comes
+            raise RuntimeError("Simulation deadlocked: all tasks are waiting with no timer pending")
+        self._loop.now += timeout
+        return []
+
+
+class SimulatedRadios(RadioBackend):
+    """
+    In-process WiFi and Bluetooth with random latencies and device presence.
+
+    Args:
+        devices: List of SimulatedDevice
+        ssid: Network joined before the first sleep
+        networks: Networks in range (defaults to just `ssid`)
+        preferred: Saved networks in preferred order (defaults to `networks`)
+        latencies: Overrides for DEFAULT_LATENCIES
+        autojoin_rate: Chance macOS auto-joins the last network after power-on
+        seed: Random seed, for reproducible runs
+        registry: Metrics receiving the race.* counters
+    """
+
+    def __init__(self, devices, ssid='Home', networks=None, preferred=None, latencies=None,
+                 autojoin_rate=0.9, seed=None, registry=None):
+        self.devices = {d.address: d for d in devices}
+        self.networks = set(networks or [ssid])
+        self.preferred = list(preferred or sorted(self.networks))
+        self.latencies = {**DEFAULT_LATENCIES, **(latencies or {})}
+        self.autojoin_rate = autojoin_rate
+        self.metrics = registry if registry is not None else Metrics()
+        self._rng = random.Random(seed)
+
+        self.wifi_on = True
+        self.ssid = self.last_ssid = ssid
+        self._wifi_up_at = 0.0
+        self._wifi_epoch = 0  # Bumped on every power change; stale work checks it
+
+        self.bluetooth_on = True
+        self._bluetooth_ready_at = 0.0
+        self._bluetooth_epoch = 0
+        self.present = set(self.devices)
+        self.connected = set(self.devices)  # All connected before the first sleep
+        self._connecting = set()
+
+    def _now(self):
+        return asyncio.get_running_loop().time()
+
+    def _draw(self, mean):
+        """A random latency with the given mean."""
+        return self._rng.expovariate(1 / mean) if mean > 0 else 0.0
+
+    async def _command(self):
+        """The cost of running one command-line tool."""
+        await asyncio.sleep(self._draw(self.latencies['command']))
+
+    async def power_state(self):
+        await self._command()
+        return self.wifi_on, self.bluetooth_on
+
+    async def set_wifi_power(self, on):
+        await self._command()
+        self.wifi_on = on
+        self._wifi_epoch += 1
+        if on:
+            self._wifi_up_at = self._now() + self._draw(self.latencies['wifi_up'])
+            if self.last_ssid in self.networks and self._rng.random() < self.autojoin_rate:
+                when = self._wifi_up_at + self._draw(self.latencies['autojoin'])
+                asyncio.get_running_loop().call_at(when, self._autojoin, self._wifi_epoch)
+        else:
+            self.ssid = None
+        return True
+
+    def _autojoin(self, epoch):
+        """macOS joining the last network on its own."""
+        if epoch == self._wifi_epoch and self.wifi_on and not self.ssid:
+            self.ssid = self.last_ssid
+
+    async def wifi_ready(self):
+        await self._command()
+        return self.wifi_on and self._now() >= self._wifi_up_at
+
+    async def current_network(self):
+        await self._command()
+        return self.ssid if self.wifi_on else None
+
+    async def preferred_networks(self):
+        await self._command()
+        return list(self.preferred)
+
+    async def join_network(self, ssid, timeout):
+        await self._command()
+        if not self.wifi_on or self._now() < self._wifi_up_at or ssid not in self.networks:
+            return False
+        epoch = self._wifi_epoch
+        latency = self._draw(self.latencies['join'])
+        await asyncio.sleep(min(latency, timeout))
+        if latency > timeout or epoch != self._wifi_epoch:
+            return False
+        self.ssid = self.last_ssid = ssid
+        return True
+
+    async def set_bluetooth_power(self, on):
+        await self._command()
+        self.bluetooth_on = on
+        self._bluetooth_epoch += 1
+        if on:
+            self._bluetooth_ready_at = self._now() + self._draw(self.latencies['bluetooth_ready'])
+            # Devices wander in and out of range while the machine sleeps
+            self.present = {a for a, d in self.devices.items() if self._rng.random() < d.presence}
+        else:
+            if self._connecting:
+                self.metrics.increment('race.power_off_during_connect', len(self._connecting))
+            self.connected.clear()
+        return True
+
+    async def bluetooth_ready(self):
+        await self._command()
+        return self.bluetooth_on and self._now() >= self._bluetooth_ready_at
+
+    async def paired_devices(self):
+        await self._command()
+        return [{'address': d.address, 'name': d.name} for d in self.devices.values()]
+
+    async def connected_devices(self):
+        await self._command()
+        return [{'address': a, 'name': self.devices[a].name} for a in sorted(self.connected)]
+
+    async def connect_device(self, address, timeout):
+        await self._command()
+        if not self.bluetooth_on:
+            self.metrics.increment('race.connect_while_off')
+            return False
+        device = self.devices.get(address)
+        epoch = self._bluetooth_epoch
+        self._connecting.add(address)
+        try:
+            if (device is None or address not in self.present
+                    or self._now() < self._bluetooth_ready_at):
+                await asyncio.sleep(min(PAGE_TIMEOUT, timeout))
+                return False
+            latency = self._draw(device.connect_latency)
+            await asyncio.sleep(min(latency, timeout))
+            if latency > timeout or self._rng.random() < device.failure_rate:
+                return False
+        finally:
+            self._connecting.discard(address)
+        if epoch != self._bluetooth_epoch:
+            self.metrics.increment('race.stale_connect')
+            return False
+        self.connected.add(address)
+        return True
+
+
+class Orchestrator:
+    """
+    Runs SleepWatchApp's sleep/wake handling (Transitions) on one event loop.
+
+    submit() and run() dispatch like TransitionScheduler, with the same
+    TransitionQueue: one transition at a time, the latest request wins, and
+    a new request cancels the background work (reconnects) of the current
+    transition. Learned timings and join history start empty and are kept
+    in memory, never in the user's state file.
+    """
+
+    def __init__(self, radios, config=None, registry=None):
+        self.radios = radios
+        self.config = {**DEFAULT_CONFIG, **(config or {})}
+        self.metrics = registry if registry is not None else Metrics()
+        self.store = StateStore(path=None)
+        self.transitions = Transitions(
+            radios, self.config, WiFiRejoiner(radios, store=self.store), DeviceStats(store=self.store),
+            store=self.store, registry=self.metrics
+        )
+        self._queue = TransitionQueue()
+        self._tasks = set()
+        self._wakeup = asyncio.Event()
+
+    def submit(self, event):
+        """Request a transition ('sleep' or 'wake'). Never blocks."""
+        if not self._queue.request(event):
+            return
+        for task in self._tasks:
+            task.cancel()
+        self._wakeup.set()
+
+    def _spawn(self, reconnect):
+        """Run background work for the current transition."""
+        self._queue.spawned = True
+        if self._queue.pending is not None:
+            # Already superseded: TransitionScheduler hands it a cancel event that is set
+            return
+        task = asyncio.get_running_loop().create_task(reconnect())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def run(self):
+        """Apply requested transitions one at a time (runs until cancelled)."""
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            if self._queue.pending is None:
+                continue
+            event = self._queue.next()
+            if event is None:
+                continue
+            try:
+                if event == SLEEP:
+                    await self.transitions.sleep()
+                else:
+                    await self.on_wake()
+            except Exception:
+                logger.exception("%s transition failed", event)
+                self.metrics.increment(f'transition.{event}.errors')
+            if self._queue.pending is not None:
+                self._wakeup.set()
+
+    async def on_wake(self):
+        """What SleepWatchApp.on_system_wake does with the radios."""
+        await self.transitions.power_on()
+        for _, reconnect in self.transitions.reconnects():
+            self._spawn(reconnect)
+
+    async def idle(self):
+        """Wait until no transition is pending and no background work runs."""
+        while self._queue.pending is not None or self._tasks:
+            await asyncio.sleep(1)
+
+
+async def _replay(trace, orchestrator, sleep_grace):
+    """Feed trace events to the orchestrator at their times."""
+    loop = asyncio.get_running_loop()
+    dispatcher = loop.create_task(orchestrator.run())
+    start = loop.time()
+    last_event = {'at': None}
+
+    async def check_asleep(at):
+        # The machine sleeps unless something woke it in the meantime
+        await asyncio.sleep(sleep_grace)
+        if last_event['at'] != at:
+            return
+        wifi_on, bluetooth_on = await orchestrator.radios.power_state()
+        if (wifi_on and orchestrator.config.get('wifi_enabled')) or \
+                (bluetooth_on and orchestrator.config.get('bluetooth_enabled')):
+            orchestrator.metrics.increment('race.radio_on_at_sleep')
+
+    checks = []
+    for offset, event in trace:
+        await asyncio.sleep(max(0, start + offset - loop.time()))
+        last_event['at'] = offset
+        orchestrator.submit(event)
+        orchestrator.metrics.increment(f'trace.{event}')
+        if event == SLEEP:
+            checks.append(loop.create_task(check_asleep(offset)))
+
+    await asyncio.sleep(SETTLE_TIME)
+    await asyncio.gather(*checks)
+    dispatcher.cancel()
+    for task in list(orchestrator._tasks):
+        task.cancel()
+    await asyncio.gather(dispatcher, *orchestrator._tasks, return_exceptions=True)
+
+
+def replay(trace, orchestrator_factory, virtual=True, sleep_grace=DEFAULT_SLEEP_GRACE):
+    """
+    Replay a trace and return the orchestrator's metrics snapshot.
+
+    Args:
+        trace: List of (seconds from start, 'sleep' or 'wake')
+        orchestrator_factory: Callable returning an Orchestrator; called on
+            the replay's event loop
+        virtual: Run under the virtual clock (False replays in real time,
+            e.g. against MacRadioBackend)
+        sleep_grace: Seconds after a sleep event at which radios must be off
+    """
+    loop = VirtualClockLoop() if virtual else asyncio.new_event_loop()
+
+    async def main():
+        orchestrator = orchestrator_factory()
+        await _replay(trace, orchestrator, sleep_grace)
+        return orchestrator.metrics.snapshot()
+
+    try:
+        return loop.run_until_complete(main())
+    finally:
+        loop.close()
+
+
+def synthetic_trace(cycles, seed=None, awake=8 * 60 * 60, asleep=4 * 60 * 60, flap_rate=0.05):
+    """
+    Generate sleep/wake cycles with random durations.
+
+    Args:
+        cycles: Number of sleep/wake pairs
+        awake, asleep: Mean seconds awake and asleep
+        flap_rate: Chance a cycle is a lid flap (woken again within a few seconds)
+    """
+    rng = random.Random(seed)
+    trace = []
+    now = 0.0
+    for _ in range(cycles):
+        now += rng.expovariate(1 / awake)
+        trace.append((now, SLEEP))
+        if rng.random() < flap_rate:
+            now += rng.uniform(0.1, 5)
+        else:
+            now += rng.expovariate(1 / asleep)
+        trace.append((now, WAKE))
+    return trace
+
+
+_LOG_EVENTS = {'System going to sleep': SLEEP, 'System waking up': WAKE}
+
+
+def _timestamp(value):
+    if isinstance(value, (int, float)):
+        return float(value)
+    return datetime.fromisoformat(value).timestamp()
+
+
+def load_trace(path):
+    """
+    Read a trace file: JSON lines of {"time": ..., "event": "sleep"|"wake"}
+    (time as epoch seconds or ISO 8601), or SleepWatch's own JSON log, whose
+    sleep/wake messages are picked out. Returns (offset, event) pairs.
+    """
+    events = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entry = json.loads(line)
+                event = entry.get('event') or _LOG_EVENTS.get(entry.get('message'))
+                if event in (SLEEP, WAKE):
+                    events.append((_timestamp(entry['time']), event))
+            except (ValueError, KeyError, TypeError):
+                continue
+    if not events:
+        return []
+    events.sort()
+    start = events[0][0]
+    return [(at - start, event) for at, event in events]
+
+
+class TraceEventSource:
+    """
+    Event source that replays a trace in real time, for driving the app
+    without closing the lid. Same interface as SleepWatcher.
+    """
+
+    def __init__(self, trace, on_sleep=None, on_wake=None, speed=1.0):
+        self.trace = trace
+        self.on_sleep = on_sleep
+        self.on_wake = on_wake
+        self.speed = speed
+        self._stopped = threading.Event()
+
+    def start(self):
+        """Start replaying on a background thread."""
+        self._stopped.clear()
+        threading.Thread(target=self._run, name='trace-replay', daemon=True).start()
+        logger.info("Replaying %d trace events", len(self.trace))
+
+    def _run(self):
+        elapsed = 0.0
+        for offset, event in self.trace:
+            if self._stopped.wait(max(0, offset - elapsed) / self.speed):
+                return
+            elapsed = offset
+            callback = self.on_sleep if event == SLEEP else self.on_wake
+            if callback:
+                callback()
+
+    def stop(self):
+        """Stop replaying."""
+        self._stopped.set()
@@ -0,0 +1,89 @@
+"""Deadline-bounded, parallel work done when the system is about to sleep."""
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SLEEP_DEADLINE = 5  # Seconds; macOS doesn't wait long before sleeping
+CAPTURE_SHARE = 0.5  # Fraction of the deadline a state capture may take before power-off goes ahead
+
+
+async def run_sleep_pipeline_async(chains, deadline=DEFAULT_SLEEP_DEADLINE):
+    """
+    Capture radio state and power radios off concurrently under a deadline.
+
+    Each chain captures its radio's state, then powers it off. Chains run in
+    parallel. Powering off matters more than capturing, so if a capture is
+    still running after its share of the deadline it is abandoned and the
+    radio is powered off anyway.
+
+    Args:
+        chains: List of (name, capture, power_off) - capture() is a coroutine
+            function returning the state to remember, power_off() one that
+            turns the radio off (None for a capture-only chain)
+        deadline: Seconds the whole critical path may take
+
+    Returns:
+        (captured, report) as of the deadline - captured maps chain name to
+        its captured state (None if the capture failed or missed its share
+        of the deadline); report is a list of dicts with 'step', 'duration'
+        (None if not finished), 'ok' and 'missed_deadline' per step. Chains
+        still running at the deadline are reported as missing it, but are
+        awaited before returning, so a radio is never still powering off
+        when the next transition starts.
+    """
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    deadline_at = start + deadline
+    capture_at = start + deadline * CAPTURE_SHARE
+    captured = {}
+    report = []
+
+    def add_step(step, duration, ok, missed):
+        report.append({'step': step, 'duration': duration, 'ok': ok, 'missed_deadline': missed})
+
+    async def run_chain(name, capture, power_off):
+        started = loop.time()
+        task = asyncio.ensure_future(capture())
+        done, _ = await asyncio.wait({task}, timeout=max(0, capture_at - started))
+        if not done:
+            task.cancel()
+            add_step(f'{name}.capture', None, False, True)
+        elif task.exception() is not None:
+            add_step(f'{name}.capture', None, False, False)
+            logger.error("Sleep capture failed for %s: %s", name, task.exception())
+        else:
+            captured[name] = task.result()
+            add_step(f'{name}.capture', loop.time() - started, True, False)
+
+        if power_off is None:
+            return
+        started = loop.time()
+        try:
+            ok = await power_off()
+            add_step(f'{name}.power_off', loop.time() - started, bool(ok), loop.time() > deadline_at)
+        except Exception as e:
+            add_step(f'{name}.power_off', None, False, False)
+            logger.error("Sleep power-off failed for %s: %s", name, e)
+
+    tasks = {asyncio.ensure_future(run_chain(*chain)): chain for chain in chains}
+    late = set()
+    if tasks:
+        _, late = await asyncio.wait(tasks, timeout=max(0, deadline_at - loop.time()))
+
+    # The returned report and state are frozen here
+    final_report = list(report)
+    final_captured = dict(captured)
+    for task in late:
+        name, _, power_off = tasks[task]
+        finished = {entry['step'] for entry in final_report}
+        steps = [f'{name}.capture'] + ([f'{name}.power_off'] if power_off else [])
+        for step in steps:
+            if step not in finished:
+                final_report.append({'step': step, 'duration': None, 'ok': False, 'missed_deadline': True})
+    for name, *_ in chains:
+        final_captured.setdefault(name, None)
+
+    if late:
+        await asyncio.wait(late)
+    return final_captured, final_report
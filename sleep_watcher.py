@@ -1,10 +1,17 @@
 """Sleep/wake event detection for macOS."""
-import threading
+import logging
 from Foundation import NSWorkspace, NSNotificationCenter
 
+logger = logging.getLogger(__name__)
+
 
 class SleepWatcher:
-    """Watches for system sleep and wake events using macOS NSWorkspace notifications."""
+    """
+    Watches for system sleep and wake events using macOS NSWorkspace notifications.
+
+    This is the app's default event source; any object built from on_sleep/on_wake
+    callbacks with start() and stop() can replace it (see simulator.TraceEventSource).
+    """
 
     def __init__(self, on_sleep=None, on_wake=None):
         """
@@ -13,6 +20,9 @@ class SleepWatcher:
         Args:
             on_sleep: Callback function to call when system goes to sleep
             on_wake: Callback function to call when system wakes up
+
+        Callbacks run on the notification thread and must return quickly
+        (e.g. TransitionScheduler.submit_sleep/submit_wake).
         """
         self.on_sleep = on_sleep
         self.on_wake = on_wake
@@ -47,7 +57,7 @@ class SleepWatcher:
             None
         )
 
-        print("SleepWatcher started")
+        logger.info("SleepWatcher started")
 
     def stop(self):
         """Stop watching for sleep/wake events."""
@@ -58,16 +68,14 @@ class SleepWatcher:
             self.notification_center.removeObserver_(self)
 
         self._running = False
-        print("SleepWatcher stopped")
+        logger.info("SleepWatcher stopped")
 
     def systemWillSleep_(self, notification):
         """Called by macOS when system is about to sleep."""
         if self.on_sleep and callable(self.on_sleep):
-            # Run callback in separate thread to not block notification
-            threading.Thread(target=self.on_sleep, daemon=True).start()
+            self.on_sleep()
 
     def systemDidWake_(self, notification):
         """Called by macOS when system wakes from sleep."""
         if self.on_wake and callable(self.on_wake):
-            # Run callback in separate thread to not block notification
-            threading.Thread(target=self.on_wake, daemon=True).start()
+            self.on_wake()
@@ -2,156 +2,123 @@
 """
 SleepWatch - Lightweight macOS menu bar app to manage WiFi and Bluetooth on sleep/wake.
 """
+from startup_profiler import profiler
 import rumps
+import asyncio
+import logging
 import threading
+import time
 import os
 import sys
-import subprocess
-from datetime import datetime
+from PyObjCTools import AppHelper
 from config import Config
+from async_subprocess import run_sync
 from bluetooth_manager import BluetoothManager
+from device_browser import DeviceBrowser
+from device_registry import DeviceRegistry
+from device_stats import DeviceStats
 from wifi_manager import WiFiManager
+from wifi_rejoin import WiFiRejoiner
 from sleep_watcher import SleepWatcher
+from status_service import StatusService
+from state import state
+from radio_backend import MacRadioBackend
+from transition_scheduler import TransitionScheduler
+from transitions import Transitions
 from version import __version__, GITHUB_RELEASES_URL
-from update_checker import check_for_updates
+from logging_setup import setup_logging, shutdown_logging, recent_events
+from metrics import metrics, MetricsExporter
+from battery import BatteryMonitor
+from session_store import SessionStore
+
+logger = logging.getLogger(__name__)
+
+profiler.mark('imports')
 
 
 class SleepWatchApp(rumps.App):
     """Main menu bar application."""
     
-    @staticmethod
-    def log_to_system(msg):
-        """Log a message to the system log."""
-        try:
-            # Print to stdout for development debugging
-            print(f"[SleepWatch] {msg}")
-            # Log to system log
-            result = os.system(f'logger -t SleepWatch "{msg}"')
-            if result != 0:
-                print(f"[SleepWatch] Warning: logger command failed with code {result}")
-        except Exception as e:
-            print(f"[SleepWatch] Error logging message: {e}")
-
-    def install_blueutil(self):
+    def install_blueutil(self, sender=None):
         """Install blueutil using Homebrew."""
-        # Check if Homebrew is installed first
-        if not BluetoothManager.is_brew_installed():
-            response = rumps.alert(
-                "Homebrew Required",
-                "blueutil requires Homebrew to install.\n\n"
-                "Terminal will open to install Homebrew first, then blueutil.\n\n"
-                "This may take a few minutes.",
-                ok="Install",
-                cancel="Cancel"
-            )
-            if response != 1:
-                return
-
-            # Open Terminal to install Homebrew first, then blueutil
-            script = '''
-tell application "Terminal"
-    activate
-    do script "echo 'Installing Homebrew...' && /bin/bash -c \\"$(curl -fsSL https://raw.githubusercontent.com/Homebrew/install/HEAD/install.sh)\\" && echo '\\nInstalling blueutil...' && brew install blueutil && echo '\\nInstallation complete! You can close this window.' && exit"
-end tell
-'''
-        else:
-            # Just install blueutil
-            response = rumps.alert(
-                "Install blueutil",
-                "Terminal will open to install blueutil.\n\n"
-                "The window will close automatically when done.",
-                ok="Install",
-                cancel="Cancel"
-            )
-            if response != 1:
-                return
-
-            script = '''
-tell application "Terminal"
-    activate
-    do script "echo 'Installing blueutil...' && brew install blueutil && echo '\\nInstallation complete! You can close this window.' && exit"
-end tell
-'''
-
-        try:
-            subprocess.run(['osascript', '-e', script], check=True)
-            rumps.notification(
-                "Installing blueutil",
-                "Terminal is open",
-                "Please wait for installation to complete, then restart SleepWatch."
-            )
-        except Exception as e:
-            rumps.alert("Error", f"Failed to open Terminal:\n{e}")
+        from installer import install_blueutil
+        install_blueutil()
+
+    def __init__(self, event_source=SleepWatcher):
+        """
+        Args:
+            event_source: Factory taking on_sleep/on_wake callbacks and returning an
+                object with start()/stop() that calls them (SleepWatcher, or
+                simulator.TraceEventSource to replay a trace)
+        """
+        self.event_source = event_source
 
-    def __init__(self):
         # Get path to icon file
         icon_path = os.path.join(os.path.dirname(__file__), 'icon.png')
 
         # Check if blueutil is installed - if not, prompt to install
-        if not BluetoothManager.is_blueutil_installed():
-            # Show dialog asking user to install
-            response = rumps.alert(
-                "blueutil Required",
-                "SleepWatch needs blueutil for Bluetooth features.\n\n"
-                "Terminal will open to install it via Homebrew.\n"
-                "This may take a few minutes.\n\n"
-                "The app will start after installation completes.",
-                ok="Install Now",
-                cancel="Skip (Limited Features)"
+        with profiler.phase('blueutil check'):
+            blueutil_installed = BluetoothManager.is_blueutil_installed()
+        if not blueutil_installed:
+            from installer import prompt_install_on_launch
+            prompt_install_on_launch()
+
+        # Use actual icon file for solid black rendering
+        with profiler.phase('app init'):
+            super(SleepWatchApp, self).__init__(
+                "SleepWatch",
+                icon=icon_path if os.path.exists(icon_path) else None,
+                template=True,
+                quit_button=None
             )
 
-            if response == 1:  # Install clicked
-                # Get app path for restart (check if running from app bundle)
-                if getattr(sys, 'frozen', False):
-                    # Running from py2app bundle
-                    app_path = os.path.abspath(os.path.join(os.path.dirname(sys.executable), '..', '..'))
-                elif os.path.exists('/Applications/SleepWatch.app'):
-                    app_path = '/Applications/SleepWatch.app'
-                else:
-                    app_path = '/Applications/SleepWatch.app'  # Default fallback
-
-                # Open Terminal with install command that restarts the app
-                if not BluetoothManager.is_brew_installed():
-                    script = f'''
-tell application "Terminal"
-    activate
-    set currentTab to do script "echo 'Installing Homebrew...' && /bin/bash -c \\"$(curl -fsSL https://raw.githubusercontent.com/Homebrew/install/HEAD/install.sh)\\" && echo '\\nInstalling blueutil...' && brew install blueutil && echo '\\nInstallation complete! Restarting SleepWatch...' && sleep 1 && open '{app_path}' && exit"
-end tell
-'''
-                else:
-                    script = f'''
-tell application "Terminal"
-    activate
-    set currentTab to do script "echo 'Installing blueutil...' && brew install blueutil && echo '\\nInstallation complete! Restarting SleepWatch...' && sleep 1 && open '{app_path}' && exit"
-end tell
-'''
-                try:
-                    subprocess.run(['osascript', '-e', script], check=True)
-                    # Quit this instance since we're restarting
-                    import time
-                    time.sleep(2)  # Give Terminal time to start
-                    rumps.quit_application()
-                except Exception as e:
-                    print(f"Error opening Terminal: {e}")
+        with profiler.phase('load state'):
+            self.config = Config()
+            self.bt_manager = BluetoothManager()
+            self.wifi_manager = WiFiManager()
+            self.device_registry = DeviceRegistry()
+            self.device_stats = DeviceStats()
+            self.radios = MacRadioBackend()
+            self.transitions = Transitions(
+                self.radios, self.config, WiFiRejoiner(self.radios), self.device_stats
+            )
+            self.status_service = StatusService(
+                on_update=lambda snapshot: AppHelper.callAfter(self._render_status, snapshot),
+                interval=self.config.get('status_refresh_interval', 60)
+            )
+            self.scheduler = TransitionScheduler(
+                on_sleep=self.on_system_sleep,
+                on_wake=self.on_system_wake
+            )
+            self.sleep_watcher = None
+            self.battery = BatteryMonitor()
+            self.history = SessionStore()
+            self.metrics_exporter = MetricsExporter(
+                metrics,
+                interval=self.config.get('metrics_interval', 60),
+                port=self.config.get('metrics_port')
+            )
 
-        # Use actual icon file for solid black rendering
-        super(SleepWatchApp, self).__init__(
-            "SleepWatch",
-            icon=icon_path if os.path.exists(icon_path) else None,
-            template=True,
-            quit_button=None
-        )
+        self.update_download = None  # Progress title while a release download runs
+
+        with profiler.phase('build menu'):
+            self._build_menu()
+
+        # Render from cached status and the device snapshot; nothing here runs a helper
+        with profiler.phase('first render'):
+            self.update_menu_state()
+            self.update_device_list()
 
-        self.config = Config()
-        self.bt_manager = BluetoothManager()
-        self.wifi_manager = WiFiManager()
-        self.sleep_watcher = None
+        # Keep the menu in sync with config changes, including edits made to the file directly
+        self.config.subscribe(
+            None, lambda key, old, new: AppHelper.callAfter(self._apply_config_change, key)
+        )
 
-        # Track state before sleep
-        self.devices_before_sleep = []
-        self.wifi_before_sleep = None
+        # Probes, observers and watchers start once the run loop is up and the icon is shown
+        AppHelper.callAfter(self._start_background_services)
 
-        # Build menu
+    def _build_menu(self):
+        """Create the menu items."""
         self.menu = [
             rumps.MenuItem("Status", callback=None),
             None,  # Separator
@@ -176,145 +143,234 @@ end tell
             rumps.MenuItem(f"Version {__version__}", callback=None),
             rumps.MenuItem("Check for Updates...", callback=self.check_updates),
             rumps.MenuItem("Refresh", callback=self.refresh_menu),
+            rumps.MenuItem("Show Recent Events...", callback=self.show_recent_events),
+            rumps.MenuItem("Battery Drain...", callback=self.show_battery_stats),
             rumps.MenuItem("Quit SleepWatch", callback=self.quit_app)
         ]
 
-        self.update_menu_state()
-        self.update_device_list()  # Populate device list on startup
-        self.start_sleep_watcher()
-
-        # Check for updates on startup (in background)
-        if self.config.get('check_updates_on_startup', True):
-            threading.Thread(target=self._check_updates_background, daemon=True).start()
+        self.device_browser = DeviceBrowser(
+            self.menu, "Favorite Devices", self.toggle_favorite, self.config.is_favorite
+        )
+        self.device_browser.build()
+
+    def _start_background_services(self):
+        """Start everything that can wait until the icon is visible (main thread)."""
+        profiler.mark('run loop start')
+        with profiler.phase('background start'):
+            self.start_sleep_watcher()
+            self._refresh_devices_in_background()
+            self.status_service.start()
+            self.config.start_watching()
+            self.metrics_exporter.start()
+
+            # Check for updates on startup (in background)
+            if self.config.get('check_updates_on_startup', True):
+                threading.Thread(target=self._check_updates_background, daemon=True).start()
+
+        if profiler.enabled:
+            within_budget = profiler.report()
+            sys.stdout.flush()
+            self.config.flush()
+            state.flush()
+            shutdown_logging()
+            # Profiling run: exit without entering the app, failing if over budget
+            os._exit(0 if within_budget else 1)
 
     def start_sleep_watcher(self):
         """Start watching for sleep/wake events."""
-        self.sleep_watcher = SleepWatcher(
-            on_sleep=self.on_system_sleep,
-            on_wake=self.on_system_wake
+        self.sleep_watcher = self.event_source(
+            on_sleep=self.scheduler.submit_sleep,
+            on_wake=self.scheduler.submit_wake
         )
         self.sleep_watcher.start()
 
     def on_system_sleep(self):
-        """Called when system is about to sleep."""
-        print(f"{datetime.now()}: System going to sleep")
-
-        # Save current state
-        if self.config.get('bluetooth_enabled'):
-            self.devices_before_sleep = self.bt_manager.get_connected_devices()
-
-        if self.config.get('wifi_enabled'):
-            self.wifi_before_sleep = self.wifi_manager.get_current_network()
-            if self.wifi_before_sleep:
-                self.config.set('last_wifi_network', self.wifi_before_sleep)
-
-        # Turn off radios
-        if self.config.get('wifi_enabled'):
-            self.wifi_manager.set_power(False)
-            print("WiFi disabled")
+        """Called (on the scheduler thread) when system is about to sleep."""
+        logger.info("System going to sleep")
+        slept_at = time.time()
+
+        # Capture state and turn off radios, each radio in parallel; the
+        # battery is sampled before power-off, while the machine is surely awake
+        battery = ('battery', lambda: asyncio.to_thread(self.battery.sample_at_sleep), None)
+        captured, report = run_sync(self.transitions.sleep(extra=[battery]))
+        # File the session under the radios that actually went off by the deadline
+        powered_off = {step['step'] for step in report if step['ok']}
+        self.battery.on_sleep(
+            captured['battery'],
+            wifi_off='wifi.power_off' in powered_off,
+            bluetooth_off='bluetooth.power_off' in powered_off
+        )
+        threading.Thread(target=self._persist_sleep_state, args=(captured,), daemon=True).start()
+
+        if 'bluetooth' in captured:
+            self.device_registry.invalidate()
+        self.status_service.refresh()
+        self.metrics_exporter.write_soon()
+        self._record_sleep(slept_at, captured, report)
+
+    def _record_sleep(self, slept_at, captured, report):
+        """Add the sleep transition to the session history."""
+        steps = {step['step']: step for step in report}
+        record = {
+            'event': 'sleep',
+            'time': slept_at,
+            'duration': round(time.time() - slept_at, 3),
+            'radios_off': {
+                radio: steps[f'{radio}.power_off']['ok']
+                for radio in ('wifi', 'bluetooth') if f'{radio}.power_off' in steps
+            },
+            'ssid': captured.get('wifi'),
+            'devices': [{'address': d['address'], 'name': d['name']} for d in captured.get('bluetooth') or []],
+        }
+        self._append_history(record)
+
+    def _append_history(self, record):
+        try:
+            self.history.append(record)
+        except OSError as e:
+            logger.warning("Failed to record session history: %s", e)
 
-        if self.config.get('bluetooth_enabled'):
-            self.bt_manager.set_power(False)
-            print("Bluetooth disabled")
+    def _persist_sleep_state(self, captured):
+        """Save non-critical sleep state (runs after the sleep pipeline)."""
+        if captured.get('wifi'):
+            self.config.set('last_wifi_network', captured['wifi'])
+        if captured.get('bluetooth'):
+            self.device_stats.mark_seen(d['address'] for d in captured['bluetooth'])
 
     def on_system_wake(self):
-        """Called when system wakes from sleep."""
-        print(f"{datetime.now()}: System waking up")
-
-        # Turn on WiFi
-        if self.config.get('wifi_enabled'):
-            self.wifi_manager.set_power(True)
-            print("WiFi enabled")
-
-            if self.config.get('auto_reconnect_wifi') and self.wifi_before_sleep:
-                threading.Thread(
-                    target=self._reconnect_wifi,
-                    args=(self.wifi_before_sleep,),
-                    daemon=True
-                ).start()
-
-        # Turn on Bluetooth and reconnect devices
-        if self.config.get('bluetooth_enabled'):
-            self.bt_manager.set_power(True)
-            print("Bluetooth enabled")
-
-            if self.config.get('auto_reconnect_bluetooth'):
-                threading.Thread(
-                    target=self._reconnect_bluetooth,
-                    daemon=True
-                ).start()
-
-    def _reconnect_wifi(self, ssid):
-        """Reconnect to WiFi network (runs in thread)."""
-        import time
-        time.sleep(2)  # Give WiFi time to initialize
-
-        if self.wifi_manager.connect_to_network(ssid):
-            print(f"Reconnected to WiFi: {ssid}")
+        """Called (on the scheduler thread) when system wakes from sleep."""
+        logger.info("System waking up")
+        woke_at = time.time()
+        # Close the battery session off the wake path; pmset takes a moment
+        session = self.battery.on_wake()
+        threading.Thread(target=self.battery.finish_session, args=(session,), daemon=True).start()
+        self.device_registry.invalidate()
+
+        # Turn both radios on at the same time
+        powered = run_sync(self.transitions.power_on())
+        self.status_service.refresh()
+
+        futures = {
+            name: self.scheduler.spawn(self._reconnect, reconnect)
+            for name, reconnect in self.transitions.reconnects()
+        }
+
+        record = {
+            'event': 'wake',
+            'time': woke_at,
+            'radios_on': powered,
+            'ssid_before': self.transitions.wifi_before_sleep,
+        }
+        if futures:
+            # Written once the reconnects finish (or are cancelled by the next sleep)
+            self.scheduler.spawn(self._record_wake, record, futures.get('wifi'), futures.get('bluetooth'))
         else:
-            print(f"Failed to reconnect to WiFi: {ssid}")
+            self._record_wake(record, None, None)
 
-    def _reconnect_bluetooth(self):
-        """Reconnect to Bluetooth devices (runs in thread)."""
-        import time
-        time.sleep(2)  # Give Bluetooth time to initialize
-
-        mode = self.config.get('reconnect_mode', 'favorites')
+    def _reconnect(self, reconnect, cancel=None):
+        """Run one of Transitions.reconnects() (on the scheduler pool; stops when cancel is set)."""
+        try:
+            report = run_sync(reconnect(), cancel=cancel)
+        except asyncio.CancelledError:
+            # Cancelled before it started
+            return None
+        self.status_service.refresh()
+        self.metrics_exporter.write_soon()
+        return report
+
+    def _record_wake(self, record, wifi, bluetooth, cancel=None):
+        """Add the wake transition and its reconnect results to the session history."""
+        wifi_report = self._future_result(wifi)
+        bluetooth_report = self._future_result(bluetooth)
+        if wifi_report:
+            record['ssid_after'] = wifi_report['joined']
+            record['wifi'] = {
+                'method': wifi_report['method'],
+                'time_to_associated': wifi_report['time_to_associated'],
+            }
+        record['devices'] = [
+            {key: result[key] for key in ('address', 'name', 'tier', 'outcome', 'latency')}
+            for result in bluetooth_report or []
+        ]
+        self._append_history(record)
 
-        if mode == 'favorites':
-            favorites = self.config.get('favorite_devices', [])
-            if favorites:
-                count = self.bt_manager.reconnect_favorites(favorites)
-                print(f"Reconnected {count}/{len(favorites)} favorite devices")
-        elif mode == 'last':
-            # Reconnect to devices that were connected before sleep
-            for device in self.devices_before_sleep:
-                address = device.get('address', '')
-                if address:
-                    self.bt_manager.connect_device(address)
-                    print(f"Reconnected to: {device.get('name', address)}")
+    @staticmethod
+    def _future_result(future):
+        """A reconnect's report, or None if it wasn't run or failed."""
+        if future is None:
+            return None
+        try:
+            return future.result()
+        except Exception:
+            return None
 
     @rumps.clicked("  Disable WiFi on Sleep")
     def toggle_wifi_control(self, sender):
         """Toggle WiFi control on/off."""
         self.config.toggle('wifi_enabled')
-        self.update_menu_state()
 
     @rumps.clicked("  Auto-reconnect WiFi")
     def toggle_wifi_reconnect(self, sender):
         """Toggle WiFi auto-reconnect."""
         self.config.toggle('auto_reconnect_wifi')
-        self.update_menu_state()
 
     @rumps.clicked("  Disable Bluetooth on Sleep")
     def toggle_bt_control(self, sender):
         """Toggle Bluetooth control on/off."""
         self.config.toggle('bluetooth_enabled')
-        self.update_menu_state()
 
     @rumps.clicked("  Auto-reconnect Bluetooth")
     def toggle_bt_reconnect(self, sender):
         """Toggle Bluetooth auto-reconnect."""
         self.config.toggle('auto_reconnect_bluetooth')
-        self.update_menu_state()
 
     @rumps.clicked("  Favorites Only")
     def set_mode_favorites(self, sender):
         """Set reconnect mode to favorites only."""
         self.config.set('reconnect_mode', 'favorites')
-        self.update_menu_state()
 
     @rumps.clicked("  Most Recent")
     def set_mode_recent(self, sender):
         """Set reconnect mode to most recent."""
         self.config.set('reconnect_mode', 'last')
-        self.update_menu_state()
 
     @rumps.clicked("Refresh")
     def refresh_menu(self, sender):
         """Refresh the menu and device list."""
         self.update_menu_state()
-        self.update_device_list()
+        self.status_service.refresh()
+        self.device_registry.invalidate()
+        self._refresh_devices_in_background()
+
+    def _refresh_devices_in_background(self):
+        """Re-read paired devices off the main thread, then redraw the device list."""
+        self.device_registry.refresh_async(
+            callback=lambda records: AppHelper.callAfter(self.update_device_list, records)
+        )
+
+    # Config keys shown as checkmarks, by menu item title
+    CONFIG_MENU_ITEMS = {
+        'wifi_enabled': "  Disable WiFi on Sleep",
+        'auto_reconnect_wifi': "  Auto-reconnect WiFi",
+        'bluetooth_enabled': "  Disable Bluetooth on Sleep",
+        'auto_reconnect_bluetooth': "  Auto-reconnect Bluetooth",
+    }
+
+    def _apply_config_change(self, key):
+        """Update only the menu items affected by a changed config key."""
+        if key in self.CONFIG_MENU_ITEMS:
+            title = self.CONFIG_MENU_ITEMS[key]
+            if title in self.menu:
+                self.menu[title].state = self.config.get(key, True)
+        elif key == 'reconnect_mode':
+            mode = self.config.get('reconnect_mode', 'favorites')
+            if "  Favorites Only" in self.menu:
+                self.menu["  Favorites Only"].state = (mode == 'favorites')
+                self.menu["  Most Recent"].state = (mode == 'last')
+        elif key == 'favorite_devices':
+            self.update_device_list()
+        elif key == 'status_refresh_interval':
+            self.status_service.interval = self.config.get(key, 60)
 
     def update_menu_state(self):
         """Update menu item states (checkmarks)."""
@@ -338,6 +394,8 @@ end tell
                 rumps.MenuItem(f"Version {__version__}", callback=None),
                 rumps.MenuItem("Check for Updates...", callback=self.check_updates),
                 rumps.MenuItem("Refresh", callback=self.refresh_menu),
+                rumps.MenuItem("Show Recent Events...", callback=self.show_recent_events),
+                rumps.MenuItem("Battery Drain...", callback=self.show_battery_stats),
                 rumps.MenuItem("Quit SleepWatch", callback=self.quit_app)
             ])
             # Update WiFi control states
@@ -360,98 +418,36 @@ end tell
 
         # Launch at login - can't check state without code signing, so we don't show a checkbox
 
-        # Update status
-        wifi_status = "On" if self.wifi_manager.get_power_state() else "Off"
-        bt_status = "On" if self.bt_manager.get_power_state() else "Off"
-        current_wifi = self.wifi_manager.get_current_network() or "Not connected"
-
-        self.menu["Status"].title = f"WiFi: {wifi_status} | BT: {bt_status} | {current_wifi}"
+        # Show the cached status now; the status service updates it when fresh data arrives
+        self._render_status(self.status_service.snapshot)
 
-    def update_device_list(self):
-        """Update the list of Bluetooth devices in menu."""
-        # Find the "Favorite Devices" section
-        favorite_index = None
-        for i, item in enumerate(self.menu):
-            if item and hasattr(item, 'title'):
-                # title is a method in rumps, need to call it
-                title = item.title() if callable(item.title) else item.title
-                if title == "Favorite Devices":
-                    favorite_index = i
-                    break
-
-        if favorite_index is None:
-            return
-
-        # Remove old device items (everything between "Favorite Devices" and "Bluetooth Reconnect Mode")
-        # Iterate through menu items directly instead of using integer indices
-        items_to_remove = []
-        found_favorite_devices = False
-
-        for item in self.menu:
-            if item and hasattr(item, 'title'):
-                title = item.title() if callable(item.title) else item.title
-                if title == "Favorite Devices":
-                    found_favorite_devices = True
-                    continue
-                # Stop when we reach the next fixed menu section
-                if found_favorite_devices and title == "Bluetooth Reconnect Mode":
-                    break
-
-            if found_favorite_devices:
-                # Only add items with valid titles (not separators or auto-generated names)
-                if item and hasattr(item, 'title'):
-                    title = item.title() if callable(item.title) else item.title
-                    # Skip auto-generated separator names
-                    if not title.startswith('Separatormenuitem'):
-                        items_to_remove.append(item)
-
-        for item in items_to_remove:
-            # title is a method in rumps, need to call it
-            title = item.title() if callable(item.title) else item.title
-            try:
-                del self.menu[title]
-            except KeyError:
-                # Item might have been deleted or title changed, skip it
-                # This can happen due to case differences in device names
-                pass
-
-        # Add device items - get recently connected devices first, then all paired
-        try:
-            devices = self.bt_manager.get_paired_devices()
-        except Exception:
-            device_item = rumps.MenuItem("  Error loading devices", callback=None)
-            self.menu.insert_after("Favorite Devices", device_item)
+    def _render_status(self, snapshot):
+        """Show a status snapshot in the Status item (main thread)."""
+        if "Status" not in self.menu:
             return
+        wifi_status = "On" if snapshot.wifi_power else "Off"
+        bt_status = "On" if snapshot.bt_power else "Off"
+        current_wifi = snapshot.ssid or "Not connected"
+        self.menu["Status"].title = f"WiFi: {wifi_status} | BT: {bt_status} | {current_wifi}"
 
-        connected_devices = [d for d in devices if d.get('connected', False)]
+    def update_device_list(self, devices=None):
+        """
+        Update the list of Bluetooth devices in menu.
 
-        # Sort: connected first, then by name
-        devices_sorted = sorted(devices, key=lambda d: (not d.get('connected', False), d.get('name', '')))
+        Devices are grouped into submenus that are filled in when opened
+        (see DeviceBrowser), so this stays cheap with hundreds of devices.
 
-        if not devices:
-            device_item = rumps.MenuItem("  No devices found", callback=None)
-            self.menu.insert_after("Favorite Devices", device_item)
-        else:
-            insert_after = "Favorite Devices"
-            for device in devices_sorted[:10]:  # Limit to 10 devices
-                name = device.get('name', 'Unknown')
-                address = device.get('address', '')
-                is_fav = self.config.is_favorite(address)
-                is_connected = device.get('connected', False)
-
-                # Show connection status and use checkmark for favorites
-                status_icon = "🟢 " if is_connected else ""
-
-                device_item = rumps.MenuItem(
-                    f"  {status_icon}{name}",
-                    callback=lambda sender, addr=address: self.toggle_favorite(addr)
-                )
-                # Set checkmark state for favorites
-                device_item.state = is_fav
+        Args:
+            devices: DeviceRecords to show; defaults to the registry's cached list
+        """
+        if devices is None:
+            try:
+                devices = self.device_registry.get_devices(allow_stale=True)
+            except Exception:
+                self.device_browser.set_devices([], message="Error loading devices")
+                return
 
-                self.menu.insert_after(insert_after, device_item)
-                # title is a method in rumps, need to call it
-                insert_after = device_item.title() if callable(device_item.title) else device_item.title
+        self.device_browser.set_devices(devices, message="No devices found")
 
     def toggle_favorite(self, device_address):
         """Toggle a device as favorite."""
@@ -460,38 +456,35 @@ end tell
         else:
             self.config.add_favorite(device_address)
 
-        self.update_device_list()
-
     def is_login_item(self):
         """Check if app is in login items."""
         try:
             import Foundation
             
             app_path = self._get_app_path()
-            self.log_to_system(f"Checking login item status for app at path: {app_path}")
+            logger.debug("Checking login item status for app at path: %s", app_path)
             
             if not app_path:
-                self.log_to_system("No app path found")
+                logger.debug("No app path found")
                 return False
                 
             # Use SMAppService to check login item status
             SMAppService = Foundation.NSClassFromString('SMAppService')
-            self.log_to_system(f"SMAppService class: {SMAppService}")
+            logger.debug("SMAppService class: %s", SMAppService)
             
             mainApp = SMAppService.mainAppService()
-            self.log_to_system(f"Main app service: {mainApp}")
+            logger.debug("Main app service: %s", mainApp)
             
             # Get status and debug info
             status = mainApp.status()
-            self.log_to_system(f"SMAppService status: {status}")
-            self.log_to_system(f"Status type: {type(status)}")
+            logger.debug("SMAppService status: %s (%s)", status, type(status))
             
             # Check if enabled (status == SMAppServiceStatusEnabled)
             enabled = (status == 1)  # 1 = SMAppServiceStatusEnabled
-            self.log_to_system(f"Login item enabled: {enabled}")
+            logger.info("Login item enabled: %s", enabled)
             return enabled
         except Exception as e:
-            print(f"Error checking login items: {e}")
+            logger.warning("Error checking login items: %s", e)
             return False
 
     def _get_app_path(self):
@@ -514,7 +507,7 @@ end tell
         """Open System Settings to configure launch at login."""
         import subprocess
 
-        self.log_to_system("Opening System Settings for Launch at Login")
+        logger.info("Opening System Settings for Launch at Login")
 
         app_path = self._get_app_path()
 
@@ -547,17 +540,19 @@ end tell
                     'open',
                     'x-apple.systempreferences:com.apple.LoginItems-Settings.extension'
                 ])
-                self.log_to_system("Opened System Settings")
+                logger.info("Opened System Settings")
             except Exception as e:
-                self.log_to_system(f"Error opening settings: {e}")
+                logger.error("Error opening settings: %s", e)
                 rumps.alert("Error", f"Failed to open System Settings:\n{e}")
 
     def _check_updates_background(self):
         """Check for updates in background and notify if available."""
-        import time
+        from update_checker import check_for_updates
         time.sleep(3)  # Wait a bit after startup
 
-        has_update, latest_version, download_url = check_for_updates()
+        has_update, latest_version, download_url = check_for_updates(
+            interval=self.config.get('update_check_interval', 21600)
+        )
 
         if has_update and latest_version:
             rumps.notification(
@@ -569,9 +564,29 @@ end tell
     @rumps.clicked("Check for Updates...")
     def check_updates(self, sender):
         """Check for updates manually."""
-        # Run directly on main thread since this is a manual check from menu
-        # Network calls are usually fast enough to not block UI
-        has_update, latest_version, download_url = check_for_updates()
+        # Answer from the cache at once; the network check runs in the background
+        # and only shows an alert if there was no cached answer or it changed
+        from update_checker import get_cached
+        has_update, latest_version, download_url, checked_at = get_cached()
+        threading.Thread(
+            target=self._check_updates_manual, args=(latest_version,), daemon=True
+        ).start()
+        if latest_version:
+            self._show_update_result(has_update, latest_version, download_url, checked_at)
+
+    def _check_updates_manual(self, cached_version):
+        """Refresh the update check for a manual check (background thread)."""
+        from update_checker import check_for_updates
+        has_update, latest_version, download_url = check_for_updates(force=True)
+        if cached_version is None or latest_version != cached_version:
+            AppHelper.callAfter(self._show_update_result, has_update, latest_version, download_url)
+
+    def _show_update_result(self, has_update, latest_version, download_url, checked_at=None):
+        """Show the outcome of an update check."""
+        checked = ""
+        if checked_at:
+            from datetime import datetime
+            checked = f"\n\nLast checked: {datetime.fromtimestamp(checked_at):%Y-%m-%d %H:%M}"
 
         if has_update and latest_version:
             response = rumps.alert(
@@ -579,14 +594,13 @@ end tell
                 f"A new version of SleepWatch is available!\n\n"
                 f"Current version: v{__version__}\n"
                 f"Latest version: v{latest_version}\n\n"
-                f"Would you like to download it?",
+                f"Would you like to download it?" + checked,
                 ok="Download",
                 cancel="Later"
             )
 
             if response == 1:  # Download clicked
-                import subprocess
-                subprocess.run(['open', download_url])
+                self._download_update(latest_version, download_url)
         elif latest_version is None:
             rumps.alert(
                 "Update Check Failed",
@@ -596,9 +610,79 @@ end tell
         else:
             rumps.alert(
                 "You're Up to Date!",
-                f"SleepWatch v{__version__} is the latest version."
+                f"SleepWatch v{__version__} is the latest version." + checked
             )
 
+    def _download_update(self, version, download_url):
+        """Download the release archive in the background, or open the page if there is none."""
+        from update_checker import get_cached_release
+        release = get_cached_release() or {}
+        if download_url == GITHUB_RELEASES_URL or not (release.get('sha256') or release.get('sha256_url')):
+            # No archive or no published checksum to verify it against: leave it to the browser
+            import subprocess
+            subprocess.run(['open', download_url])
+            return
+        if self.update_download is not None:
+            return  # Already downloading
+        self.update_download = f"Downloading v{version}..."
+        self._render_download_progress(None)
+        threading.Thread(
+            target=self._run_update_download, args=(version, download_url, release), daemon=True
+        ).start()
+
+    def _run_update_download(self, version, download_url, release):
+        """Stream, resume and verify the archive (background thread)."""
+        from downloader import Download, DownloadError, DOWNLOAD_DIR, fetch_published_sha256
+        dest = DOWNLOAD_DIR / download_url.rsplit('/', 1)[-1]
+        last = {'percent': None}
+
+        def on_progress(done, total):
+            percent = int(100 * done / total) if total else None
+            if percent != last['percent']:
+                last['percent'] = percent
+                AppHelper.callAfter(self._render_download_progress, percent)
+
+        try:
+            sha256 = release.get('sha256') or fetch_published_sha256(release['sha256_url'], dest.name)
+            path = Download(download_url, dest, sha256, on_progress=on_progress).run()
+        except (DownloadError, OSError) as e:
+            logger.error("Update download failed: %s", e)
+            AppHelper.callAfter(self._finish_update_download, version, download_url, None, str(e))
+        else:
+            AppHelper.callAfter(self._finish_update_download, version, download_url, path, None)
+
+    def _render_download_progress(self, percent):
+        """Show download progress in the Check for Updates item (main thread)."""
+        if self.update_download is None or "Check for Updates..." not in self.menu:
+            return
+        suffix = f" {percent}%" if percent is not None else ""
+        self.menu["Check for Updates..."].title = self.update_download + suffix
+
+    def _finish_update_download(self, version, download_url, path, error):
+        """Report the download outcome (main thread)."""
+        import subprocess
+        self.update_download = None
+        if "Check for Updates..." in self.menu:
+            self.menu["Check for Updates..."].title = "Check for Updates..."
+        if path:
+            response = rumps.alert(
+                f"SleepWatch v{version} Downloaded",
+                f"The update was downloaded and verified:\n\n{path}",
+                ok="Show in Finder",
+                cancel="Later"
+            )
+            if response == 1:
+                subprocess.run(['open', '-R', str(path)])
+        else:
+            response = rumps.alert(
+                "Download Failed",
+                f"{error}\n\nWould you like to download it in your browser instead?",
+                ok="Open Browser",
+                cancel="Cancel"
+            )
+            if response == 1:
+                subprocess.run(['open', download_url])
+
     @rumps.clicked("Hide Menu Bar Icon")
     def hide_icon(self, sender):
         """Hide the menu bar icon."""
@@ -637,18 +721,61 @@ end tell
             except Exception as e:
                 rumps.alert("Error", f"Failed to hide icon:\n{e}")
 
+    def show_recent_events(self, sender):
+        """Show the most recent log events."""
+        events = recent_events()
+        rumps.Window(
+            title="Recent Events",
+            message=f"Last {len(events)} events (full log: ~/Library/Logs/SleepWatch)",
+            default_text="\n".join(reversed(events)) or "No events yet",
+            ok="Close",
+            dimensions=(560, 320)
+        ).run()
+
+    def show_battery_stats(self, sender):
+        """Show battery drain while asleep, by which radios were turned off."""
+        from battery import ROLLING_WINDOW, OVERNIGHT_HOURS
+        stats = self.battery.stats()
+        if not stats:
+            message = "No sleep sessions on battery recorded yet."
+        else:
+            lines = []
+            for mode, entry in sorted(stats.items()):
+                lines.append(
+                    f"{mode}: {entry['median']:.2f}%/h, ~{entry['overnight']:.0f}% per "
+                    f"{OVERNIGHT_HOURS}h night ({entry['sessions']} sessions, {entry['hours']:.0f}h)"
+                )
+            message = "\n".join(lines)
+        rumps.alert(f"Battery Drain While Asleep (last {ROLLING_WINDOW // 86400} days)", message)
+
     @rumps.clicked("Quit SleepWatch")
     def quit_app(self, sender):
         """Quit the application."""
         if self.sleep_watcher:
             self.sleep_watcher.stop()
+        self.config.stop_watching()
+        self.status_service.stop()
+        self.metrics_exporter.stop()
+        self.scheduler.shutdown()
+        self.config.flush()
+        state.flush()
+        shutdown_logging()
         rumps.quit_application()
 
 
 def main():
     """Entry point for the application."""
+    with profiler.phase('logging'):
+        setup_logging()
+    event_source = SleepWatcher
+    trace_path = os.environ.get('SLEEPWATCH_REPLAY_TRACE')
+    if trace_path:
+        # Drive the app from a recorded trace instead of real sleep/wake (soak testing)
+        from simulator import TraceEventSource, load_trace
+        trace = load_trace(trace_path)
+        event_source = lambda on_sleep, on_wake: TraceEventSource(trace, on_sleep, on_wake)
     # Start the app - if blueutil is not installed, the menu will show an install option
-    app = SleepWatchApp()
+    app = SleepWatchApp(event_source=event_source)
     app.run()
 
 
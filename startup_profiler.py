@@ -0,0 +1,71 @@
+"""
+Startup phase timing.
+
+Import this module first so the clock starts before the other imports.
+Run with --profile-startup (or SLEEPWATCH_PROFILE_STARTUP=1) to print the
+time spent per phase once the menu bar icon is up, then quit with exit
+status 1 if startup took longer than the budget.
+"""
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+DEFAULT_BUDGET = 1.0  # Seconds from process start until the icon and menu are shown
+
+_process_start = time.perf_counter()
+
+
+class StartupProfiler:
+    """Records how long each named startup phase takes."""
+
+    def __init__(self, enabled=False, budget=DEFAULT_BUDGET):
+        self.enabled = enabled
+        self.budget = budget
+        self.phases = []  # (name, seconds) in order
+        self._last = _process_start
+
+    @contextmanager
+    def phase(self, name):
+        """Time the enclosed block as one phase."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, time.perf_counter() - start))
+            self._last = time.perf_counter()
+
+    def mark(self, name):
+        """Record the time since the previous phase or mark as a phase."""
+        now = time.perf_counter()
+        self.phases.append((name, now - self._last))
+        self._last = now
+
+    def elapsed(self):
+        """Seconds since the process started (as seen by this module)."""
+        return time.perf_counter() - _process_start
+
+    def report(self):
+        """Print the phase table. Returns True if startup was within budget."""
+        total = self.elapsed()
+        print("Startup profile:")
+        for name, seconds in self.phases:
+            print(f"  {name:<24} {seconds * 1000:8.1f} ms")
+        within = total <= self.budget
+        print(f"  {'total':<24} {total * 1000:8.1f} ms "
+              f"(budget {self.budget * 1000:.0f} ms: {'ok' if within else 'EXCEEDED'})")
+        return within
+
+
+def _from_environment():
+    """Build the profiler from the command line and environment."""
+    enabled = '--profile-startup' in sys.argv or os.environ.get('SLEEPWATCH_PROFILE_STARTUP') == '1'
+    try:
+        budget = float(os.environ.get('SLEEPWATCH_STARTUP_BUDGET', DEFAULT_BUDGET))
+    except ValueError:
+        budget = DEFAULT_BUDGET
+    return StartupProfiler(enabled=enabled, budget=budget)
+
+
+# Shared profiler for the app's startup
+profiler = _from_environment()
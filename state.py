@@ -0,0 +1,67 @@
+"""Persistent runtime state for SleepWatch (caches and learned values, not preferences)."""
+import copy
+import json
+import threading
+from pathlib import Path
+from write_behind import WriteBehindSaver
+
+STATE_FILE = Path.home() / '.sleepwatch_state.json'
+
+
+class StateStore:
+    """
+    Stores named sections of runtime state in a single JSON file.
+
+    Writes are coalesced and done atomically in the background (see
+    WriteBehindSaver), so set() is cheap enough for the sleep/wake paths.
+    With path=None the store is in memory only (used by the simulator).
+    """
+
+    def __init__(self, path=STATE_FILE):
+        self.path = Path(path) if path else None
+        self._lock = threading.Lock()
+        self.state = self._load_state()
+        self._saver = WriteBehindSaver(self.path, self._snapshot) if self.path else None
+
+    def _load_state(self):
+        """Load state from disk, starting empty if missing or unreadable."""
+        if self.path and self.path.exists():
+            try:
+                with open(self.path, 'r') as f:
+                    loaded = json.load(f)
+                    if isinstance(loaded, dict):
+                        return loaded
+            except (json.JSONDecodeError, IOError):
+                pass
+        return {}
+
+    def _snapshot(self):
+        """Copy of the state for the writer thread."""
+        with self._lock:
+            return copy.deepcopy(self.state)
+
+    def save(self):
+        """Schedule a write-behind save to disk."""
+        if self._saver:
+            self._saver.schedule()
+
+    def flush(self):
+        """Write any pending changes to disk now."""
+        if self._saver:
+            self._saver.flush()
+
+    def get(self, section, default=None):
+        """Get a copy of a state section (change it with set())."""
+        with self._lock:
+            return copy.deepcopy(self.state.get(section, default))
+
+    def set(self, section, value):
+        """Set a state section (a copy of value) and save."""
+        value = copy.deepcopy(value)
+        with self._lock:
+            self.state[section] = value
+        self.save()
+
+
+# Shared store used by caches and learned values
+state = StateStore()
@@ -0,0 +1,109 @@
+"""Background WiFi/Bluetooth status polling for the menu."""
+import asyncio
+import logging
+import threading
+import time
+from collections import namedtuple
+from async_subprocess import run_sync
+from bluetooth_manager import BluetoothManager, BluetoothError
+from wifi_manager import WiFiManager
+from state import state
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INTERVAL = 60  # Seconds between periodic status refreshes
+PROBE_TIMEOUT = 5  # Seconds allowed for each status command
+
+# Last known radio status; updated_at is a wall-clock timestamp (0 = never probed)
+StatusSnapshot = namedtuple('StatusSnapshot', ['wifi_power', 'bt_power', 'ssid', 'updated_at'])
+
+
+class StatusService:
+    """
+    Keeps a cached (wifi_power, bt_power, ssid) snapshot fresh in the background.
+
+    The menu always renders `snapshot` immediately (stale-while-revalidate);
+    the probes run on a worker thread every `interval` seconds or when
+    refresh() is called, and on_update(snapshot) is called when the result
+    differs from the cached one. The last snapshot is kept in the state file
+    so the first render after launch has real values.
+    """
+
+    def __init__(self, on_update=None, interval=DEFAULT_INTERVAL):
+        self.on_update = on_update
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+        self.snapshot = self._load_snapshot()
+
+    @staticmethod
+    def _load_snapshot():
+        """Load the last saved snapshot (all unknown if there is none)."""
+        try:
+            return StatusSnapshot(*state.get('status'))
+        except TypeError:
+            return StatusSnapshot(None, None, None, 0)
+
+    def start(self):
+        """Start the worker thread; the first refresh runs right away."""
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stopped.clear()
+            self._wakeup.set()
+            self._thread = threading.Thread(target=self._run, name='status', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stop the worker thread after its current refresh."""
+        self._stopped.set()
+        self._wakeup.set()
+
+    def refresh(self):
+        """Ask for a refresh soon. Calls made while one is running are coalesced."""
+        self._wakeup.set()
+
+    def _run(self):
+        """Refresh on every wakeup or interval, until stopped."""
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            if self._stopped.is_set():
+                break
+            self.refresh_now()
+
+    @staticmethod
+    async def _bt_power_async():
+        """Bluetooth power state, or None without blueutil."""
+        try:
+            return await BluetoothManager.get_power_state_async(timeout=PROBE_TIMEOUT)
+        except BluetoothError:
+            return None
+
+    @staticmethod
+    async def _probe_async():
+        """Run the three status commands concurrently."""
+        return await asyncio.gather(
+            WiFiManager.get_power_state_async(timeout=PROBE_TIMEOUT),
+            StatusService._bt_power_async(),
+            WiFiManager.get_current_network_async(timeout=PROBE_TIMEOUT)
+        )
+
+    def refresh_now(self):
+        """Probe the radios on the calling thread and publish the result if it changed."""
+        try:
+            wifi_power, bt_power, ssid = run_sync(self._probe_async())
+        except Exception as e:
+            logger.warning("Status refresh failed: %s", e)
+            return self.snapshot
+
+        previous = self.snapshot
+        snapshot = StatusSnapshot(wifi_power, bt_power, ssid, time.time())
+        self.snapshot = snapshot
+        if snapshot[:3] != previous[:3]:
+            state.set('status', list(snapshot))
+            if self.on_update:
+                self.on_update(snapshot)
+        return snapshot
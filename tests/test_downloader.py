@@ -0,0 +1,92 @@
+"""Download resume and verification against a local server."""
+import hashlib
+
+import pytest
+
+import downloader
+from downloader import Download, DownloadError
+from state import StateStore
+
+DATA = bytes(range(256)) * 1024  # 256 KiB
+ETAG = '"v1"'
+
+
+@pytest.fixture(autouse=True)
+def isolated(monkeypatch):
+    monkeypatch.setattr(downloader, 'state', StateStore(path=None))
+    monkeypatch.setattr(downloader, 'RETRY_DELAY', 0)
+
+
+def serve_file(data, etag=ETAG, drop_after=None):
+    """Route serving data with Range/If-Range support; the first full response stops after drop_after bytes."""
+    dropped = []
+
+    def route(handler):
+        start = 0
+        requested = handler.headers.get('Range')
+        if requested and handler.headers.get('If-Range', etag) == etag:
+            start = int(requested[len('bytes='):].rstrip('-'))
+        body = data[start:]
+        handler.send_response(206 if start else 200)
+        if start:
+            handler.send_header('Content-Range', f'bytes {start}-{len(data) - 1}/{len(data)}')
+        handler.send_header('Content-Length', str(len(body)))
+        handler.send_header('ETag', etag)
+        handler.end_headers()
+        if drop_after is not None and not dropped:
+            dropped.append(True)
+            handler.wfile.write(body[:drop_after])
+            handler.close_connection = True
+            return
+        handler.wfile.write(body)
+
+    return route
+
+
+def test_download_verifies_and_moves_into_place(server, tmp_path):
+    server.routes['/app.zip'] = serve_file(DATA)
+    dest = tmp_path / 'app.zip'
+
+    path = Download(server.url('/app.zip'), dest, hashlib.sha256(DATA).hexdigest()).run()
+
+    assert path == dest
+    assert dest.read_bytes() == DATA
+    assert not dest.with_name('app.zip.part').exists()
+
+
+def test_dropped_connection_resumes_with_range(server, tmp_path):
+    server.routes['/app.zip'] = serve_file(DATA, drop_after=100_000)
+    dest = tmp_path / 'app.zip'
+
+    Download(server.url('/app.zip'), dest, hashlib.sha256(DATA).hexdigest()).run()
+
+    assert dest.read_bytes() == DATA
+    first, resumed = server.requests
+    assert 'Range' not in first['headers']
+    assert resumed['headers']['Range'] == 'bytes=100000-'
+    assert resumed['headers']['If-Range'] == ETAG
+
+
+def test_changed_file_restarts_from_scratch(server, tmp_path):
+    dest = tmp_path / 'app.zip'
+    dest.with_name('app.zip.part').write_bytes(DATA[:1000])
+    url = server.url('/app.zip')
+    downloader.state.set('update_download', {'url': url, 'validators': {'etag': '"old"'}})
+    new = DATA[::-1]
+    server.routes['/app.zip'] = serve_file(new, etag='"v2"')
+
+    Download(url, dest, hashlib.sha256(new).hexdigest()).run()
+
+    assert dest.read_bytes() == new
+    assert server.requests[0]['headers']['If-Range'] == '"old"'
+
+
+def test_digest_mismatch_discards_the_file(server, tmp_path):
+    server.routes['/app.zip'] = serve_file(DATA)
+    dest = tmp_path / 'app.zip'
+
+    with pytest.raises(DownloadError, match='SHA-256 mismatch'):
+        Download(server.url('/app.zip'), dest, '0' * 64).run()
+
+    assert not dest.exists()
+    assert not dest.with_name('app.zip.part').exists()
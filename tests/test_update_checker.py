@@ -0,0 +1,87 @@
+"""Cached, conditional update checks against a local server."""
+import json
+import time
+
+import pytest
+
+import update_checker
+from state import StateStore
+from update_checker import DEFAULT_RETRY_AFTER, check_for_updates
+
+RELEASE = {
+    'tag_name': 'v99.0.0',
+    'assets': [{'name': 'SleepWatch.zip', 'browser_download_url': 'https://example.com/SleepWatch.zip'}],
+}
+EXPECTED = (True, '99.0.0', 'https://example.com/SleepWatch.zip')
+ETAG = '"r1"'
+
+
+@pytest.fixture(autouse=True)
+def isolated(monkeypatch):
+    monkeypatch.setattr(update_checker, 'state', StateStore(path=None))
+
+
+def send(handler, status, body=b'', headers=()):
+    handler.send_response(status)
+    for name, value in headers:
+        handler.send_header(name, value)
+    handler.send_header('Content-Length', str(len(body)))
+    handler.end_headers()
+    handler.wfile.write(body)
+
+
+def serve_release(handler):
+    """The release, or 304 when the client already has this ETag."""
+    if handler.headers.get('If-None-Match') == ETAG:
+        send(handler, 304, headers=[('ETag', ETAG)])
+    else:
+        send(handler, 200, json.dumps(RELEASE).encode(), headers=[('ETag', ETAG)])
+
+
+def rate_limited(retry_after):
+    def route(handler):
+        send(handler, 429, b'{}', headers=[('Retry-After', retry_after)])
+    return route
+
+
+def test_fresh_answer_is_served_from_cache(server):
+    server.routes['/releases/latest'] = serve_release
+    url = server.url('/releases/latest')
+
+    assert check_for_updates(url) == EXPECTED
+    assert check_for_updates(url) == EXPECTED
+    assert len(server.requests) == 1
+
+
+def test_revalidation_uses_etag_and_keeps_release_on_304(server):
+    server.routes['/releases/latest'] = serve_release
+    url = server.url('/releases/latest')
+    check_for_updates(url)
+    first_checked = update_checker.state.get('update_check')['checked_at']
+
+    assert check_for_updates(url, force=True) == EXPECTED
+
+    assert server.requests[1]['headers']['If-None-Match'] == ETAG
+    assert update_checker.state.get('update_check')['checked_at'] >= first_checked
+
+
+def test_rate_limit_backs_off_for_retry_after(server):
+    server.routes['/releases/latest'] = rate_limited('120')
+    url = server.url('/releases/latest')
+
+    assert check_for_updates(url) == (False, None, None)
+    retry_after = update_checker.state.get('update_check')['retry_after']
+    assert 110 < retry_after - time.time() <= 120
+
+    # No request is sent until the server's time is up, even when forced
+    check_for_updates(url, force=True)
+    assert len(server.requests) == 1
+
+
+def test_malformed_retry_after_uses_default_backoff(server):
+    server.routes['/releases/latest'] = rate_limited('soon')
+
+    check_for_updates(server.url('/releases/latest'))
+
+    retry_after = update_checker.state.get('update_check')['retry_after']
+    assert retry_after - time.time() == pytest.approx(DEFAULT_RETRY_AFTER, abs=10)
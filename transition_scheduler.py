@@ -0,0 +1,126 @@
+"""Serializes sleep/wake transitions and the background work they start."""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_WORKERS = 4  # Background tasks (reconnects) running at once
+
+SLEEP = 'sleep'
+WAKE = 'wake'
+
+
+class TransitionQueue:
+    """
+    Which transition to apply next (no locking; callers serialize access).
+
+    Only the latest requested state is kept, and a request for the state
+    last applied is dropped unless that transition started background work
+    (which the request cancels). Shared by TransitionScheduler and the
+    simulator.
+    """
+
+    def __init__(self):
+        self.pending = None
+        self.state = None  # Last state applied
+        self.spawned = False  # Whether the last transition started background work
+
+    def request(self, event):
+        """Note a request. Returns True if it supersedes the current transition."""
+        if event == self.pending:
+            return False
+        if self.pending is None and event == self.state:
+            # Already in this state and nothing else requested
+            return False
+        self.pending = event
+        return True
+
+    def next(self):
+        """Take the pending request: the transition to apply, or None if it is a no-op."""
+        event, self.pending = self.pending, None
+        if event is None or (event == self.state and not self.spawned):
+            # Flapped back to the current state and nothing was cancelled
+            return None
+        self.state = event
+        self.spawned = False
+        return event
+
+
+class TransitionScheduler:
+    """
+    Runs sleep/wake handlers one at a time on a single dispatcher thread.
+
+    Events that arrive while a transition is running are merged: only the
+    latest intended state is applied next, and a request for the state the
+    system is already in is dropped unless it cancelled work. Background
+    work started by a transition runs on a bounded pool and receives a
+    cancel event that is set as soon as another transition is requested.
+    """
+
+    def __init__(self, on_sleep, on_wake, max_workers=DEFAULT_MAX_WORKERS):
+        self.handlers = {SLEEP: on_sleep, WAKE: on_wake}
+        self._condition = threading.Condition()
+        self._queue = TransitionQueue()
+        self._cancel = threading.Event()
+        self._running = True
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='transition')
+        self._dispatcher = threading.Thread(target=self._dispatch, name='transitions', daemon=True)
+        self._dispatcher.start()
+
+    def submit(self, event):
+        """Request a transition ('sleep' or 'wake'). Never blocks."""
+        with self._condition:
+            if not self._queue.request(event):
+                return
+            # Whatever the last transition started is now obsolete
+            self._cancel.set()
+            self._condition.notify()
+
+    def submit_sleep(self):
+        """Request a sleep transition (SleepWatcher callback)."""
+        self.submit(SLEEP)
+
+    def submit_wake(self):
+        """Request a wake transition (SleepWatcher callback)."""
+        self.submit(WAKE)
+
+    def spawn(self, fn, *args):
+        """
+        Run background work for the current transition on the bounded pool.
+
+        fn is called as fn(*args, cancel=event) and should stop early once
+        the event is set.
+        """
+        with self._condition:
+            self._queue.spawned = True
+            cancel = self._cancel
+        return self._pool.submit(fn, *args, cancel=cancel)
+
+    def _dispatch(self):
+        """Apply requested transitions one at a time (dispatcher thread)."""
+        while True:
+            with self._condition:
+                while self._running and self._queue.pending is None:
+                    self._condition.wait()
+                if not self._running:
+                    return
+                event = self._queue.next()
+                if event is None:
+                    continue
+                self._cancel = threading.Event()
+
+            handler = self.handlers.get(event)
+            try:
+                if handler:
+                    handler()
+            except Exception:
+                logger.exception("%s transition failed", event)
+
+    def shutdown(self):
+        """Stop dispatching and cancel background work."""
+        with self._condition:
+            self._running = False
+            self._cancel.set()
+            self._condition.notify()
+        self._pool.shutdown(wait=False, cancel_futures=True)
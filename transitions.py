@@ -0,0 +1,203 @@
+"""
+The radio side of sleep/wake handling, on a RadioBackend.
+
+SleepWatchApp runs it against the real radios (MacRadioBackend) from its
+TransitionScheduler, and the simulator runs the very same code against
+SimulatedRadios under a virtual clock. This code, and everything it calls
+on the wake and sleep paths (readiness waits, the sleep pipeline, WiFi
+rejoin, reconnect lanes), times with the running event loop's clock and
+asyncio.sleep rather than time.monotonic/time.sleep, which is what lets
+the simulator swap in its clock; app concerns (menus, persistence,
+history) stay in the app.
+"""
+import asyncio
+import logging
+from bluetooth_manager import BluetoothManager
+from metrics import metrics
+from readiness import wait_until_ready_async, DEFAULT_TIMEOUT as READY_TIMEOUT
+from sleep_pipeline import run_sleep_pipeline_async, DEFAULT_SLEEP_DEADLINE
+from state import state
+from wifi_rejoin import DEFAULT_BUDGET
+
+logger = logging.getLogger(__name__)
+
+
+class Transitions:
+    """
+    Captures and powers off the radios on sleep; powers them on and
+    reconnects on wake.
+
+    Args:
+        radios: RadioBackend to drive
+        config: Config (or dict) with the app's settings
+        rejoiner: WiFiRejoiner on the same radios
+        device_stats: DeviceStats used to plan Bluetooth reconnects
+        store: StateStore for learned readiness timings
+        registry: Metrics receiving transition timings and outcomes
+    """
+
+    def __init__(self, radios, config, rejoiner, device_stats, store=state, registry=metrics):
+        self.radios = radios
+        self.config = config
+        self.rejoiner = rejoiner
+        self.device_stats = device_stats
+        self.store = store
+        self.metrics = registry
+        # State captured at the last sleep
+        self.wifi_before_sleep = None
+        self.devices_before_sleep = []
+
+    async def sleep(self, extra=()):
+        """
+        Capture state and power the enabled radios off, in parallel, within
+        the sleep deadline (see run_sleep_pipeline_async).
+
+        Args:
+            extra: More pipeline chains, e.g. capture-only ones
+
+        Returns:
+            (captured, report) from the pipeline
+        """
+        chains = []
+        if self.config.get('wifi_enabled'):
+            chains.append((
+                'wifi',
+                self.radios.current_network,
+                lambda: self.radios.set_wifi_power(False)
+            ))
+        if self.config.get('bluetooth_enabled'):
+            chains.append((
+                'bluetooth',
+                self.radios.connected_devices,
+                lambda: self.radios.set_bluetooth_power(False)
+            ))
+
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        captured, report = await run_sleep_pipeline_async(
+            chains + list(extra),
+            deadline=self.config.get('sleep_deadline', DEFAULT_SLEEP_DEADLINE)
+        )
+        self.metrics.observe('transition.sleep', loop.time() - started)
+
+        # Keep the previous state only when a capture didn't complete; a
+        # completed capture of None means WiFi wasn't on a network
+        captured_ok = {step['step'] for step in report if step['ok']}
+        if 'wifi.capture' in captured_ok:
+            self.wifi_before_sleep = captured['wifi']
+        if 'bluetooth.capture' in captured_ok:
+            self.devices_before_sleep = captured['bluetooth'] or []
+
+        for step in report:
+            duration = f"{step['duration']:.2f}s" if step['duration'] is not None else "-"
+            status = "missed deadline" if step['missed_deadline'] else ("ok" if step['ok'] else "failed")
+            logger.info("  %s: %s (%s)", step['step'], status, duration)
+            if step['duration'] is not None:
+                self.metrics.observe(f"sleep.{step['step']}", step['duration'])
+            if not step['ok']:
+                self.metrics.increment(f"sleep.{step['step']}.{status.replace(' ', '_')}")
+        return captured, report
+
+    async def power_on(self):
+        """Power on the enabled radios at the same time. Returns {'wifi': ok, 'bluetooth': ok}."""
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        radios = []
+        if self.config.get('wifi_enabled'):
+            radios.append(('wifi', self.radios.set_wifi_power(True)))
+        if self.config.get('bluetooth_enabled'):
+            radios.append(('bluetooth', self.radios.set_bluetooth_power(True)))
+
+        results = await asyncio.gather(*(call for _, call in radios), return_exceptions=True)
+        for (name, _), result in zip(radios, results):
+            if result is True:
+                logger.info("%s enabled", name)
+            else:
+                logger.warning("Failed to enable %s: %s", name, result)
+        self.metrics.observe('transition.wake.power_on', loop.time() - started)
+        return {name: result is True for (name, _), result in zip(radios, results)}
+
+    def reconnects(self):
+        """
+        Reconnects to run after power_on(), as (name, coroutine function)
+        pairs. Each returns its report, also when cancelled.
+        """
+        reconnects = []
+        if self.config.get('wifi_enabled') and self.config.get('auto_reconnect_wifi') and self.wifi_before_sleep:
+            ssid = self.wifi_before_sleep
+            reconnects.append(('wifi', lambda: self.reconnect_wifi(ssid)))
+        if self.config.get('bluetooth_enabled') and self.config.get('auto_reconnect_bluetooth'):
+            reconnects.append(('bluetooth', self.reconnect_bluetooth))
+        return reconnects
+
+    async def reconnect_wifi(self, ssid):
+        """Rejoin the network from before sleep (see WiFiRejoiner.rejoin_async)."""
+        report = self.rejoiner.new_report(ssid)
+        try:
+            await self.rejoiner.rejoin_async(
+                ssid, budget=self.config.get('wifi_rejoin_budget', DEFAULT_BUDGET), report=report
+            )
+        except asyncio.CancelledError:
+            logger.info("WiFi rejoin cancelled")
+
+        if report['associated']:
+            logger.info("Reconnected to WiFi: %s via %s in %.2fs",
+                        report['joined'], report['method'], report['time_to_associated'])
+            self.metrics.observe('transition.wake.wifi', report['time_to_associated'])
+        else:
+            logger.warning("Failed to reconnect to WiFi: %s", ssid)
+            self.metrics.increment('transition.wake.wifi.failures')
+        return report
+
+    async def reconnect_bluetooth(self):
+        """
+        Reconnect favorite or pre-sleep devices, per 'reconnect_mode'.
+
+        Returns the per-device report (see BluetoothManager.plan_results),
+        or None if there was nothing to reconnect.
+        """
+        results = []
+        try:
+            await wait_until_ready_async('bluetooth', self.radios.bluetooth_ready,
+                                         timeout=READY_TIMEOUT, store=self.store)
+
+            mode = self.config.get('reconnect_mode', 'favorites')
+            if mode == 'favorites':
+                favorites = self.config.get('favorite_devices', [])
+                if not favorites:
+                    return None
+                # Names set the priority tiers
+                names = {d['address']: d['name'] for d in await self.radios.paired_devices()}
+                devices = [{'address': address, 'name': names.get(address)} for address in favorites]
+            elif mode == 'last':
+                # Reconnect to devices that were connected before sleep
+                if not self.devices_before_sleep:
+                    return None
+                devices = list(self.devices_before_sleep)
+            else:
+                return None
+
+            results = BluetoothManager.plan_results(devices, self.device_stats.plan)
+            await BluetoothManager.reconnect_results_async(
+                results,
+                concurrency=self.config.get('reconnect_concurrency', 4),
+                deadline=self.config.get('reconnect_deadline', 30),
+                run_lane=self.radios.connect_lane
+            )
+        except asyncio.CancelledError:
+            for result in results:
+                if result['outcome'] == 'skipped' and not result['skip']:
+                    result['outcome'] = 'cancelled'
+            if not results:
+                return None
+
+        self.device_stats.record(results)
+        connected = [r for r in results if r['outcome'] == 'connected']
+        logger.info("Reconnected %d/%d Bluetooth devices", len(connected), len(results))
+        for result in results:
+            latency = f"{result['latency']:.2f}s" if result['latency'] is not None else "-"
+            logger.info("  %s: %s (%s)", result['name'], result['outcome'], latency)
+            self.metrics.increment(f"transition.wake.bluetooth.{result['outcome']}")
+            if result['outcome'] == 'connected':
+                self.metrics.observe('transition.wake.bluetooth.device', result['latency'])
+        return results
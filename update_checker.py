@@ -1,11 +1,27 @@
 """
 Auto-update checker for SleepWatch.
 Checks GitHub releases for new versions.
+
+The parsed release and the response's ETag/Last-Modified are kept in the
+state file. Checks within the check interval don't touch the network,
+later ones send a conditional request (a 304 costs no rate limit), and
+after a rate-limit response nothing is sent until the server says so.
 """
-import urllib.request
+import email.utils
 import json
+import logging
+import time
+import urllib.error
+import urllib.request
+from state import state
 from version import __version__, GITHUB_API_URL, GITHUB_RELEASES_URL
 
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHECK_INTERVAL = 6 * 60 * 60  # Seconds a cached answer is used without asking GitHub
+DEFAULT_RETRY_AFTER = 60 * 60  # Seconds to back off after a rate limit without a reset time
+REQUEST_TIMEOUT = 5
+
 
 def parse_version(version_string):
     """Parse version string to tuple of ints."""
@@ -17,45 +33,134 @@ def parse_version(version_string):
         return (0, 0, 0)
 
 
-def check_for_updates():
+def parse_release(data):
+    """Extract the version, .zip download URL and published SHA-256 from a GitHub release."""
+    latest_version = data.get('tag_name', '').lstrip('v')
+    assets = data.get('assets', [])
+    release = {'version': latest_version, 'download_url': None, 'sha256': None, 'sha256_url': None}
+
+    # Find the .zip asset
+    for asset in assets:
+        if asset.get('name', '').endswith('.zip'):
+            release['download_url'] = asset.get('browser_download_url')
+            release['size'] = asset.get('size')
+            # GitHub publishes a digest for every uploaded asset
+            digest = asset.get('digest') or ''
+            if digest.startswith('sha256:'):
+                release['sha256'] = digest[len('sha256:'):]
+            # A checksum file uploaded next to the archive, e.g. SleepWatch.zip.sha256
+            for sidecar in assets:
+                if sidecar.get('name') in (asset['name'] + '.sha256', 'SHA256SUMS'):
+                    release['sha256_url'] = sidecar.get('browser_download_url')
+                    break
+            break
+
+    if not release['download_url']:
+        # Fallback to releases page
+        release['download_url'] = GITHUB_RELEASES_URL
+
+    return release
+
+
+def _result(release):
+    """(has_update, latest_version, download_url) for a cached release."""
+    if not release or not release.get('version'):
+        return False, None, None
+    has_update = parse_version(release['version']) > parse_version(__version__)
+    return has_update, release['version'], release['download_url']
+
+
+def _retry_after(headers, now):
+    """When a rate-limited client may ask again (epoch seconds)."""
+    value = headers.get('Retry-After')
+    if value:
+        if value.strip().isdigit():
+            return now + int(value)
+        try:
+            return email.utils.parsedate_to_datetime(value).timestamp()
+        except (TypeError, ValueError):
+            # Malformed date: fall through to the rate-limit headers or the default
+            pass
+    reset = headers.get('X-RateLimit-Reset')
+    if headers.get('X-RateLimit-Remaining') == '0' and reset and reset.isdigit():
+        return float(reset)
+    return now + DEFAULT_RETRY_AFTER
+
+
+def get_cached():
     """
-    Check GitHub for updates.
-    Returns: (has_update, latest_version, download_url) or (False, None, None) on error
+    The last known answer without any network access.
+
+    Returns: (has_update, latest_version, download_url, checked_at) where
+    checked_at is the epoch time of the last successful check (None if never).
     """
-    try:
-        # Make request to GitHub API
-        req = urllib.request.Request(
-            GITHUB_API_URL,
-            headers={'User-Agent': 'SleepWatch'}
-        )
+    entry = state.get('update_check') or {}
+    return _result(entry.get('release')) + (entry.get('checked_at'),)
 
-        with urllib.request.urlopen(req, timeout=5) as response:
-            data = json.loads(response.read().decode())
 
-        latest_version = data.get('tag_name', '').lstrip('v')
-        download_url = None
+def get_cached_release():
+    """The cached release dict (see parse_release), or None."""
+    return (state.get('update_check') or {}).get('release')
 
-        # Find the .zip asset
-        for asset in data.get('assets', []):
-            if asset.get('name', '').endswith('.zip'):
-                download_url = asset.get('browser_download_url')
-                break
 
-        if not download_url:
-            # Fallback to releases page
-            download_url = GITHUB_RELEASES_URL
+def check_for_updates(url=GITHUB_API_URL, interval=DEFAULT_CHECK_INTERVAL, force=False):
+    """
+    Check GitHub for updates.
 
-        # Compare versions
-        current = parse_version(__version__)
-        latest = parse_version(latest_version)
+    Args:
+        url: Releases API URL (injectable for testing)
+        interval: Seconds a cached answer stays fresh
+        force: Ask the server even if the cached answer is fresh
 
-        has_update = latest > current
+    Returns: (has_update, latest_version, download_url); the cached answer
+    when the server can't be asked, or (False, None, None) if there is none
+    """
+    entry = dict(state.get('update_check') or {})
+    if entry.get('url') != url:
+        entry = {'url': url}
+    now = time.time()
+
+    if now < entry.get('retry_after', 0):
+        logger.info("Update check skipped: rate limited for %.0fs", entry['retry_after'] - now)
+        return _result(entry.get('release'))
+    if not force and entry.get('release') and now - entry.get('checked_at', 0) < interval:
+        return _result(entry['release'])
 
-        return has_update, latest_version, download_url
+    headers = {'User-Agent': 'SleepWatch', 'Accept': 'application/vnd.github+json'}
+    if entry.get('release'):
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
 
+    try:
+        req = urllib.request.Request(url, headers=headers)
+        with urllib.request.urlopen(req, timeout=REQUEST_TIMEOUT) as response:
+            data = json.loads(response.read().decode())
+            entry.update(
+                release=parse_release(data),
+                etag=response.headers.get('ETag'),
+                last_modified=response.headers.get('Last-Modified'),
+            )
+    except urllib.error.HTTPError as e:
+        if e.code == 304:
+            logger.info("Update check: release unchanged")
+        elif e.code in (403, 429):
+            entry['retry_after'] = _retry_after(e.headers, now)
+            logger.warning("Update check rate limited until %s", time.ctime(entry['retry_after']))
+            state.set('update_check', entry)
+            return _result(entry.get('release'))
+        else:
+            logger.warning("Update check failed: %s", e)
+            return _result(entry.get('release'))
     except Exception as e:
-        print(f"Update check failed: {e}")
-        return False, None, None
+        logger.warning("Update check failed: %s", e)
+        return _result(entry.get('release'))
+
+    entry['checked_at'] = now
+    entry.pop('retry_after', None)
+    state.set('update_check', entry)
+    return _result(entry['release'])
 
 
 def get_current_version():
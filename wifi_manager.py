@@ -1,85 +1,163 @@
 """WiFi network management."""
 import subprocess
 import re
+import discovery
+import readiness
+from async_subprocess import DEFAULT_TIMEOUT, run_command, run_sync
+from metrics import metrics
 
 
 class WiFiManager:
-    """Manages WiFi state and connections."""
+    """
+    Manages WiFi state and connections.
 
-    INTERFACE = 'en0'  # Default WiFi interface on most Macs
+    Every operation has an async variant (`*_async`) built on asyncio
+    subprocesses with a timeout; cancelling the awaiting task kills the
+    helper process. The synchronous methods are thin wrappers around them.
+    """
+
+    INTERFACE = None  # Detected on first use (see get_interface); set to override
+
+    @staticmethod
+    def get_interface():
+        """Get the WiFi interface name (e.g. 'en0'), detected once and cached."""
+        if WiFiManager.INTERFACE is None:
+            WiFiManager.INTERFACE = discovery.get_wifi_interface()
+        return WiFiManager.INTERFACE
 
     @staticmethod
-    def get_power_state():
+    @metrics.timed('wifi.get_power_state', failed=lambda on: on is None)
+    async def get_power_state_async(timeout=DEFAULT_TIMEOUT):
         """Get current WiFi power state (True = on, False = off)."""
         try:
-            result = subprocess.run(
-                ['networksetup', '-getairportpower', WiFiManager.INTERFACE],
-                capture_output=True,
-                text=True,
-                check=True
+            result = await run_command(
+                ['networksetup', '-getairportpower', WiFiManager.get_interface()],
+                timeout=timeout
             )
             # Output format: "Wi-Fi Power (en0): On" or "Wi-Fi Power (en0): Off"
             return 'On' in result.stdout
-        except subprocess.CalledProcessError:
+        except (subprocess.CalledProcessError, subprocess.TimeoutExpired, FileNotFoundError):
             return None
 
     @staticmethod
-    def set_power(state):
+    def get_power_state(timeout=DEFAULT_TIMEOUT):
+        """Get current WiFi power state (True = on, False = off)."""
+        return run_sync(WiFiManager.get_power_state_async(timeout))
+
+    @staticmethod
+    @metrics.timed('wifi.set_power', failed=lambda ok: not ok)
+    async def set_power_async(state, timeout=DEFAULT_TIMEOUT):
         """Set WiFi power state (True = on, False = off)."""
         try:
-            subprocess.run(
-                ['networksetup', '-setairportpower', WiFiManager.INTERFACE, 'on' if state else 'off'],
-                check=True,
-                capture_output=True
+            await run_command(
+                ['networksetup', '-setairportpower', WiFiManager.get_interface(), 'on' if state else 'off'],
+                timeout=timeout
             )
             return True
-        except subprocess.CalledProcessError:
+        except (subprocess.CalledProcessError, subprocess.TimeoutExpired, FileNotFoundError):
             return False
 
     @staticmethod
-    def get_current_network():
+    def set_power(state, timeout=DEFAULT_TIMEOUT):
+        """Set WiFi power state (True = on, False = off)."""
+        return run_sync(WiFiManager.set_power_async(state, timeout))
+
+    @staticmethod
+    @metrics.timed('wifi.is_interface_up')
+    async def is_interface_up_async(timeout=5):
+        """Check if the WiFi interface is up (controller ready)."""
+        try:
+            result = await run_command(['ifconfig', WiFiManager.get_interface()], timeout=timeout)
+            # Output format: "en0: flags=8863<UP,BROADCAST,...> mtu 1500"
+            return bool(re.search(r'<([^>]*,)?UP[,>]', result.stdout))
+        except (subprocess.CalledProcessError, subprocess.TimeoutExpired, FileNotFoundError):
+            return False
+
+    @staticmethod
+    def is_interface_up(timeout=5):
+        """Check if the WiFi interface is up (controller ready)."""
+        return run_sync(WiFiManager.is_interface_up_async(timeout))
+
+    @staticmethod
+    async def _is_ready_async():
+        """Readiness probe: powered on and interface up."""
+        return await WiFiManager.get_power_state_async() and await WiFiManager.is_interface_up_async()
+
+    @staticmethod
+    async def wait_until_ready_async(timeout=readiness.DEFAULT_TIMEOUT):
+        """Wait until WiFi is powered on and its interface is up. Returns True if ready."""
+        ready, _ = await readiness.wait_until_ready_async(
+            'wifi', WiFiManager._is_ready_async, timeout=timeout
+        )
+        return ready
+
+    @staticmethod
+    def wait_until_ready(timeout=readiness.DEFAULT_TIMEOUT, cancel=None):
+        """Wait until WiFi is powered on and its interface is up. Returns True if ready."""
+        ready, _ = readiness.wait_until_ready(
+            'wifi',
+            lambda: run_sync(WiFiManager._is_ready_async()),
+            timeout=timeout,
+            cancel=cancel
+        )
+        return ready
+
+    @staticmethod
+    @metrics.timed('wifi.get_current_network')
+    async def get_current_network_async(timeout=DEFAULT_TIMEOUT):
         """Get currently connected WiFi network name (SSID)."""
         try:
-            result = subprocess.run(
-                ['networksetup', '-getairportnetwork', WiFiManager.INTERFACE],
-                capture_output=True,
-                text=True,
-                check=True
+            result = await run_command(
+                ['networksetup', '-getairportnetwork', WiFiManager.get_interface()],
+                timeout=timeout
             )
             # Output format: "Current Wi-Fi Network: NetworkName"
             match = re.search(r'Current Wi-Fi Network: (.+)', result.stdout)
             if match:
                 return match.group(1).strip()
             return None
-        except subprocess.CalledProcessError:
+        except (subprocess.CalledProcessError, subprocess.TimeoutExpired, FileNotFoundError):
             return None
 
     @staticmethod
-    def connect_to_network(ssid):
+    def get_current_network(timeout=DEFAULT_TIMEOUT):
+        """Get currently connected WiFi network name (SSID)."""
+        return run_sync(WiFiManager.get_current_network_async(timeout))
+
+    @staticmethod
+    @metrics.timed('wifi.connect_to_network', failed=lambda ok: not ok)
+    async def connect_to_network_async(ssid, timeout=15):
         """Connect to a specific WiFi network."""
         try:
-            subprocess.run(
-                ['networksetup', '-setairportnetwork', WiFiManager.INTERFACE, ssid],
-                check=True,
-                capture_output=True,
-                timeout=15
+            await run_command(
+                ['networksetup', '-setairportnetwork', WiFiManager.get_interface(), ssid],
+                timeout=timeout
             )
             return True
-        except (subprocess.CalledProcessError, subprocess.TimeoutExpired):
+        except (subprocess.CalledProcessError, subprocess.TimeoutExpired, FileNotFoundError):
             return False
 
     @staticmethod
-    def get_preferred_networks():
+    def connect_to_network(ssid, timeout=15):
+        """Connect to a specific WiFi network."""
+        return run_sync(WiFiManager.connect_to_network_async(ssid, timeout))
+
+    @staticmethod
+    @metrics.timed('wifi.get_preferred_networks')
+    async def get_preferred_networks_async(timeout=DEFAULT_TIMEOUT):
         """Get list of preferred (saved) WiFi networks."""
         try:
-            result = subprocess.run(
-                ['networksetup', '-listpreferredwirelessnetworks', WiFiManager.INTERFACE],
-                capture_output=True,
-                text=True,
-                check=True
+            result = await run_command(
+                ['networksetup', '-listpreferredwirelessnetworks', WiFiManager.get_interface()],
+                timeout=timeout
             )
             # Skip the first line (header) and strip whitespace
             networks = [line.strip() for line in result.stdout.split('\n')[1:] if line.strip()]
             return networks
-        except subprocess.CalledProcessError:
+        except (subprocess.CalledProcessError, subprocess.TimeoutExpired, FileNotFoundError):
             return []
+
+    @staticmethod
+    def get_preferred_networks(timeout=DEFAULT_TIMEOUT):
+        """Get list of preferred (saved) WiFi networks."""
+        return run_sync(WiFiManager.get_preferred_networks_async(timeout))
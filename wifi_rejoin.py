@@ -0,0 +1,195 @@
+"""Fast WiFi rejoin after wake that lets macOS auto-join when it can."""
+import asyncio
+import copy
+import statistics
+import threading
+import time
+from radio_backend import MacRadioBackend
+from readiness import wait_until_ready_async
+from state import state
+
+HISTORY = 20  # Join times remembered
+MIN_SAMPLES = 3  # Samples needed before the auto-join window is learned
+DEFAULT_AUTOJOIN_WINDOW = 8  # Seconds to wait for auto-join before learning
+MIN_AUTOJOIN_WINDOW = 2
+MAX_AUTOJOIN_WINDOW = 15
+POLL_INTERVAL = 0.1  # First association poll interval
+MAX_POLL_INTERVAL = 1.0
+BACKOFF = 1.5
+DEFAULT_BUDGET = 30  # Seconds allowed for the whole rejoin, fallbacks included
+CONNECT_TIMEOUT = 15  # Longest single explicit connect
+MIN_ATTEMPT_TIME = 2  # Don't start a fallback attempt with less budget than this
+PREFERRED_TTL = 24 * 60 * 60  # Seconds before the preferred-network list is re-read
+
+
+class WiFiRejoiner:
+    """
+    Rejoins WiFi after wake.
+
+    macOS usually auto-joins the network on its own shortly after power-on,
+    so association is polled first and an explicit connect is only issued
+    if auto-join hasn't happened within a window learned from past wakes.
+    If the pre-sleep network can't be joined, other preferred networks are
+    tried, best past join record first, within one overall time budget.
+
+    Args:
+        radios: RadioBackend to drive (defaults to the real radios)
+        store: StateStore the join history is kept in
+    """
+
+    def __init__(self, radios=None, store=state):
+        self.radios = radios or MacRadioBackend()
+        self.store = store
+        self._lock = threading.Lock()
+        self.stats = store.get('wifi_rejoin') or {}
+        self.stats.setdefault('autojoin', [])
+        self.stats.setdefault('explicit', [])
+        self.stats.setdefault('networks', {})
+        self.stats.setdefault('last', None)
+
+    def _save(self):
+        """Persist join stats to the state file."""
+        with self._lock:
+            snapshot = copy.deepcopy(self.stats)
+        self.store.set('wifi_rejoin', snapshot)
+
+    def autojoin_window(self):
+        """Seconds to wait for auto-join before connecting explicitly."""
+        samples = sorted(self.stats.get('autojoin', []))
+        if len(samples) < MIN_SAMPLES:
+            return DEFAULT_AUTOJOIN_WINDOW
+        # 90th percentile of past auto-join times plus some slack
+        p90 = samples[int(0.9 * (len(samples) - 1))]
+        return max(MIN_AUTOJOIN_WINDOW, min(MAX_AUTOJOIN_WINDOW, p90 * 1.25 + 0.5))
+
+    async def preferred_networks_async(self, max_age=PREFERRED_TTL):
+        """Preferred networks, re-read from the radios only when the cached list is old."""
+        cached = self.store.get('wifi_preferred')
+        if cached and time.time() - cached.get('fetched_at', 0) < max_age:
+            return cached['networks']
+        networks = await self.radios.preferred_networks()
+        if networks:
+            self.store.set('wifi_preferred', {'networks': networks, 'fetched_at': time.time()})
+        return networks
+
+    def rank_networks(self, networks):
+        """
+        Order candidate networks by past join success, then join latency.
+
+        Networks with no history sit in the middle; ties keep macOS's
+        preferred order.
+        """
+        def sort_key(ssid):
+            history = self.stats['networks'].get(ssid, {})
+            outcomes = history.get('outcomes', [])
+            latencies = history.get('latencies', [])
+            rate = sum(outcomes) / len(outcomes) if outcomes else 0.5
+            latency = statistics.median(latencies) if latencies else CONNECT_TIMEOUT
+            return (-rate, latency)
+
+        return sorted(networks, key=sort_key)
+
+    async def wait_for_network(self, ssids, timeout):
+        """
+        Poll the current network with backoff until it is one of `ssids`.
+
+        Returns (ssid, seconds waited), or (None, None) if none appeared within timeout.
+        """
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        deadline = start + timeout
+        interval = POLL_INTERVAL
+        while True:
+            current = await self.radios.current_network()
+            if current in ssids:
+                return current, loop.time() - start
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return None, None
+            await asyncio.sleep(min(interval, remaining))
+            interval = min(interval * BACKOFF, MAX_POLL_INTERVAL)
+
+    def _record(self, method, ssid, elapsed):
+        """Remember a join attempt (elapsed is None for a failure)."""
+        with self._lock:
+            history = self.stats['networks'].setdefault(ssid, {'outcomes': [], 'latencies': []})
+            history['outcomes'] = (history['outcomes'] + [0 if elapsed is None else 1])[-HISTORY:]
+            if elapsed is not None:
+                history['latencies'] = (history['latencies'] + [round(elapsed, 3)])[-HISTORY:]
+                if method in ('autojoin', 'explicit'):
+                    self.stats[method] = (self.stats[method] + [round(elapsed, 3)])[-HISTORY:]
+
+    async def _connect(self, ssid, deadline):
+        """Explicitly join `ssid` within the loop-clock deadline. Returns seconds taken or None."""
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        timeout = min(CONNECT_TIMEOUT, deadline - start)
+        if await self.radios.join_network(ssid, timeout) \
+                and await self.radios.current_network() == ssid:
+            return loop.time() - start
+        return None
+
+    @staticmethod
+    def new_report(ssid):
+        """An empty rejoin report (see rejoin_async)."""
+        return {
+            'ssid': ssid,
+            'joined': None,
+            'associated': False,
+            'method': None,
+            'attempts': [],
+            'time_to_associated': None,
+        }
+
+    async def rejoin_async(self, ssid, budget=DEFAULT_BUDGET, report=None):
+        """
+        Rejoin `ssid` right after WiFi power-on, falling back to other preferred networks.
+
+        Cancel the calling task to stop early; the report passed in is
+        filled in place as far as it got.
+
+        Returns:
+            Report dict with 'ssid' (requested), 'joined' (network actually
+            joined or None), 'associated' (bool), 'method' ('autojoin',
+            'explicit', 'fallback' or None), 'attempts' (networks explicitly
+            tried) and 'time_to_associated' (seconds since the call, None if
+            never associated)
+        """
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        deadline = start + budget
+        report = report if report is not None else self.new_report(ssid)
+        try:
+            preferred = await self.preferred_networks_async()
+
+            # macOS may auto-join the old network or any other preferred one
+            window = min(self.autojoin_window(), budget)
+            joined, waited = await self.wait_for_network({ssid, *preferred}, window)
+            if joined:
+                report.update(joined=joined, method='autojoin')
+                self._record('autojoin', joined, waited)
+            else:
+                # Auto-join didn't happen in time - make sure the radio is up and force it
+                await wait_until_ready_async(
+                    'wifi', self.radios.wifi_ready, timeout=max(0, deadline - loop.time()), store=self.store
+                )
+                candidates = [ssid] + self.rank_networks([n for n in preferred if n != ssid])
+                for candidate in candidates:
+                    if deadline - loop.time() < MIN_ATTEMPT_TIME:
+                        break
+                    report['attempts'].append(candidate)
+                    elapsed = await self._connect(candidate, deadline)
+                    method = 'explicit' if candidate == ssid else 'fallback'
+                    self._record(method, candidate, elapsed)
+                    if elapsed is not None:
+                        report.update(joined=candidate, method=method)
+                        break
+
+            if report['joined']:
+                report['associated'] = True
+                report['time_to_associated'] = loop.time() - start
+        finally:
+            with self._lock:
+                self.stats['last'] = dict(report)
+            self._save()
+        return report
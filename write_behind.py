@@ -0,0 +1,105 @@
+"""Atomic, write-behind JSON persistence."""
+import atexit
+import json
+import logging
+import os
+import tempfile
+import threading
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DELAY = 0.5  # Seconds to wait for more changes before writing
+
+
+def atomic_write_bytes(path, data):
+    """
+    Write bytes so the file is either fully old or fully new.
+
+    Writes to a temp file in the same directory, fsyncs it, then renames
+    it over the target.
+    """
+    path = Path(path)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f'.{path.name}.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def atomic_write_json(path, data, indent=None):
+    """Write JSON atomically (see atomic_write_bytes)."""
+    atomic_write_bytes(path, json.dumps(data, indent=indent).encode())
+
+
+class WriteBehindSaver:
+    """
+    Coalesces bursts of changes into one atomic write on a background thread.
+
+    Call schedule() after every change; the file is written once, `delay`
+    seconds after the first unsaved change. flush() writes immediately and
+    is also run at interpreter exit.
+    """
+
+    def __init__(self, path, snapshot, delay=DEFAULT_DELAY, indent=None, on_written=None):
+        """
+        Args:
+            path: File to write
+            snapshot: Callable returning the data to write (called on the writer thread)
+            delay: Seconds to coalesce changes for
+            indent: JSON indent for the written file
+            on_written: Optional callable run after each successful write
+        """
+        self.path = Path(path)
+        self.snapshot = snapshot
+        self.delay = delay
+        self.indent = indent
+        self.on_written = on_written
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._timer = None
+        self._dirty = False
+        atexit.register(self.flush)
+
+    def schedule(self):
+        """Note a change; it will be written shortly."""
+        with self._lock:
+            self._dirty = True
+            if self._timer is None:
+                self._timer = threading.Timer(self.delay, self._write)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self):
+        """Write pending changes now."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+        self._write()
+
+    def _write(self):
+        """Write the current snapshot if anything changed."""
+        with self._write_lock:
+            with self._lock:
+                self._timer = None
+                if not self._dirty:
+                    return
+                self._dirty = False
+            try:
+                atomic_write_json(self.path, self.snapshot(), indent=self.indent)
+            except Exception as e:
+                # Keep the change pending so the next schedule()/flush() retries it
+                logger.error("Failed to save %s: %s", self.path, e)
+                with self._lock:
+                    self._dirty = True
+                return
+            if self.on_written:
+                self.on_written()